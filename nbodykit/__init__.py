@@ -10,6 +10,15 @@ _global_options = {}
 _global_options['global_cache_size'] = 1e8 # 100 MB
 _global_options['dask_chunk_size'] = 100000
 _global_options['paint_chunk_size'] = 1024 * 1024 * 8
+_global_options['hdf_pool_size'] = 16
+_global_options['csv_cache_size'] = 1e8 # 100 MB
+_global_options['io_threads'] = 4
+_global_options['mesh_chunk_size'] = 1024 * 1024 * 4
+_global_options['mpi_chunk_size'] = 1024 * 1024 * 256 # 256 MB
+_global_options['field_cache_size'] = 0
+_global_options['field_cache_dir'] = None
+_global_options['power_table_rtol'] = 1e-4
+_global_options['power_mesh_shells'] = False
 
 class CurrentMPIComm(object):
     """
@@ -113,6 +122,39 @@ class set_options(object):
     paint_chunk_size : int
         the number of objects to paint at the same time. This is independent
         from dask chunksize.
+    hdf_pool_size : int
+        the maximum number of HDF5 file handles kept open per process
+        when reading with :class:`~nbodykit.io.hdf.HDFFile`
+    csv_cache_size : float
+        the size in bytes of the in-memory cache of parsed blocks of
+        CSV files; default is 1e8
+    io_threads : int
+        the number of threads used to read or parse independent
+        blocks of data files concurrently
+    mesh_chunk_size : int
+        the maximum number of mesh cells per rank that are read or written
+        at the same time when saving or loading a mesh
+    mpi_chunk_size : int
+        the maximum number of bytes sent to or from the root in each
+        round of :func:`~nbodykit.utils.GatherArray` and
+        :func:`~nbodykit.utils.ScatterArray`; default is 256 MB
+    field_cache_size : float
+        the size in bytes of the cache of painted fields per process;
+        default is 0, which disables the cache
+    field_cache_dir : str, optional
+        if set, the cached fields are stored in this directory rather
+        than in memory
+    power_table_rtol : float
+        the relative accuracy of the tables of the power spectrum
+        objects in :mod:`nbodykit.cosmology` with ``tabulate=True``;
+        default is 1e-4
+    power_mesh_shells : bool
+        if ``True``, the Gaussian fields of :mod:`nbodykit.mockmaker` (and
+        :class:`~nbodykit.source.mesh.linear.LinearMesh` and
+        :class:`~nbodykit.source.catalog.lognormal.LogNormalCatalog`)
+        evaluate the power spectrum once on each integer shell of
+        :math:`|k|^2` of the mesh, rather than on each mode, if the box
+        is cubic; default is ``False``
     """
     def __init__(self, **kwargs):
         self.old = _global_options.copy()
@@ -138,6 +180,10 @@ class set_options(object):
         if self.updated_cache_size:
             GlobalCache.resize(_global_options['global_cache_size'])
 
+        # release the painted fields beyond the original size
+        from nbodykit.base.fieldcache import _field_cache
+        _field_cache.shrink()
+
 
 _logging_handler = None
 def setup_logging(log_level="info"):
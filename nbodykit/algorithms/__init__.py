@@ -2,6 +2,7 @@
 from .fftpower import FFTPower, ProjectedFFTPower
 from .fftcorr import FFTCorr
 from .convpower import ConvolvedFFTPower
+from .hodpipeline import HODPowerPipeline
 
 # grouping
 from .fof import FOF
@@ -21,6 +22,7 @@ __all__ = ['FFTPower',
            'ProjectedFFTPower',
            'FFTCorr',
            'ConvolvedFFTPower',
+           'HODPowerPipeline',
            'FOF',
            'FiberCollisions',
            'CylindricalGroups',
@@ -0,0 +1,362 @@
+import copy
+import time
+import numpy
+import logging
+
+from nbodykit.binned_statistic import BinnedStatistic
+from nbodykit.base.catalogmesh import CatalogMesh
+
+class HODPowerPipeline(object):
+    """
+    Compute the power spectrum multipoles of galaxies populated into
+    halos with a native HOD model, for many sets of model parameters.
+
+    Each call to :func:`run` populates the halos (see
+    :func:`nbodykit.hod.HODModel.populate`), paints the galaxies to a mesh,
+    and measures the multipoles of the power spectrum, as
+    :class:`~nbodykit.algorithms.fftpower.FFTPower` does for the
+    :class:`~nbodykit.source.catalog.halos.PopulatedHaloCatalog`. The mesh,
+    the Fourier-space field, and the binning of the Fourier modes (including
+    the window compensation and the Legendre weights) are allocated on the
+    first call and re-used by the following ones, and the random draws of
+    the model are shared by calls with the same seed.
+
+    Independent parameter sets can be computed concurrently on groups of
+    ranks with :func:`map`.
+
+    Parameters
+    ----------
+    halos : :class:`~nbodykit.source.catalog.halos.HaloCatalog`
+        the halos to populate
+    model : subclass or instance of :class:`~nbodykit.hod.HODModel`
+        the HOD model, which must have a native implementation
+    Nmesh : int, 3-vector
+        the number of cells per side of the mesh
+    BoxSize : float, 3-vector, optional
+        the size of the box; default is the 'BoxSize' of ``halos``
+    seed : int, optional
+        the random seed used when populating; default is a random seed
+    poles : list of int, optional
+        the multipole numbers to compute
+    los : array_like, optional
+        the line-of-sight direction, used to compute the multipoles and
+        to apply redshift-space distortions
+    rsd : bool, optional
+        whether to displace the galaxies to redshift space along ``los``
+    dk : float, optional
+        the spacing of the wavenumber bins; default is the fundamental mode
+    kmin : float, optional
+        the edge of the first wavenumber bin
+    window : str, optional
+        the name of the window used to paint the galaxies, one of 'cic',
+        'tsc', or 'pcs'; the power is compensated for the window
+
+    Examples
+    --------
+    >>> pipeline = HODPowerPipeline(halos, Zheng07Model, Nmesh=256, seed=42)
+    >>> poles = pipeline.run(alpha=0.9, logMmin=13.5)
+    >>> print(poles.attrs['timings'])
+
+    Compute many parameter sets, with 4 ranks for each:
+
+    >>> results = pipeline.map([{'alpha':a} for a in [0.8, 0.9, 1.0]], cpus_per_task=4)
+    """
+    logger = logging.getLogger('HODPowerPipeline')
+
+    def __init__(self, halos, model, Nmesh, BoxSize=None, seed=None, poles=[0, 2, 4],
+                    los=[0, 0, 1], rsd=True, dk=None, kmin=0., window='cic'):
+        from nbodykit.hod import HODModel
+
+        self.comm = halos.comm
+
+        if isinstance(model, type) and issubclass(model, HODModel):
+            model = model()
+        if not isinstance(model, HODModel) or model.defaults is None:
+            raise TypeError("HODPowerPipeline requires a HODModel with a native implementation")
+
+        # check los
+        if numpy.isscalar(los) or len(los) != 3:
+            raise ValueError("line-of-sight ``los`` should be vector with length 3")
+        if not numpy.allclose(numpy.einsum('i,i', los, los), 1.0, rtol=1e-5):
+            raise ValueError("line-of-sight ``los`` must be a unit vector")
+
+        if window not in _compensation:
+            raise ValueError("compensation for window %s is not defined" % window)
+
+        # set the seed randomly if it is None
+        if seed is None:
+            if self.comm.rank == 0:
+                seed = numpy.random.randint(0, 4294967295)
+            seed = self.comm.bcast(seed)
+
+        model.load_halos(halos, BoxSize=BoxSize)
+        self.model = model
+
+        z = halos.attrs['redshift']
+        BoxSize = model.halos['BoxSize']
+
+        self.attrs = {}
+        self.attrs['Nmesh'] = numpy.ones(3, dtype='i8') * Nmesh
+        self.attrs['BoxSize'] = BoxSize.copy()
+        self.attrs['seed'] = seed
+        self.attrs['poles'] = list(poles)
+        self.attrs['los'] = list(los)
+        self.attrs['rsd'] = rsd
+        self.attrs['rsd_factor'] = (1+z) / (100.*halos.cosmo.efunc(z))
+        self.attrs['dk'] = 2 * numpy.pi / BoxSize.min() if dk is None else dk
+        self.attrs['kmin'] = kmin
+        self.attrs['window'] = window
+        self.attrs['volume'] = BoxSize.prod()
+
+        self.pm = None
+
+    def _allocate(self):
+        """
+        Internal function to allocate the mesh and the Fourier-space field,
+        and to compute the binning of the local Fourier modes.
+
+        The binning stores, for each local mode in the wavenumber bins,
+        its bin and its weight in each multipole, which includes the
+        Hermitian symmetry, the Legendre polynomial, the squared window
+        compensation, and the volume.
+        """
+        from pmesh.pm import ParticleMesh
+        from pmesh import window
+        from scipy.special import legendre
+        from nbodykit.base.mesh import _apply_fused
+
+        attrs = self.attrs
+        self.pm = ParticleMesh(BoxSize=attrs['BoxSize'], Nmesh=attrs['Nmesh'], dtype='f8', comm=self.comm)
+        self.resampler = window.methods[attrs['window']]
+        self.real = self.pm.create(mode='real')
+        self.complex = self.pm.create(mode='complex')
+
+        # the squared compensation of the window, times the volume
+        comp = self.pm.create(mode='complex')
+        comp[...] = 1.
+        _apply_fused(comp, [(_compensation[attrs['window']], 'circular')])
+        norm = abs(comp.value)**2 * attrs['volume']
+
+        # binning in k out to the minimum nyquist frequency
+        dk, kmin = attrs['dk'], attrs['kmin']
+        kedges = numpy.arange(kmin, numpy.pi*self.pm.Nmesh.min()/self.pm.BoxSize.max() + dk/2, dk)
+        Nk = len(kedges) - 1
+
+        # the wavenumber, mu, and hermitian weights of the local modes
+        x = self.complex.x
+        shape = self.complex.value.shape
+        k2 = numpy.broadcast_to(sum(xx**2 for xx in x), shape).ravel()
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            mu = numpy.broadcast_to(sum(xx*l for xx, l in zip(x, attrs['los'])), shape).ravel() / k2**0.5
+        mu[k2 == 0] = 0.
+        nonsingular = numpy.broadcast_to(x[-1] > 0., shape).ravel()
+        hermitian = numpy.where(nonsingular, 2., 1.)
+
+        # the modes in the wavenumber bins
+        dig = numpy.digitize(k2, kedges**2) - 1
+        valid = (dig >= 0) & (dig < Nk)
+        self._modes = numpy.flatnonzero(valid)
+        self._bins = dig[valid]
+
+        # the number of modes and mean wavenumber of each bin
+        N = numpy.bincount(self._bins, weights=hermitian[valid], minlength=Nk)
+        ksum = numpy.bincount(self._bins, weights=(hermitian * k2**0.5)[valid], minlength=Nk)
+        N = self.comm.allreduce(N)
+        ksum = self.comm.allreduce(ksum)
+
+        # the weights of each mode in the multipoles
+        # NOTE: odd multipoles only receive the real part of the power
+        # from the modes in the zero and Nyquist planes
+        weights = numpy.empty((len(attrs['poles']), len(self._modes)))
+        for i, ell in enumerate(attrs['poles']):
+            w = (2.*ell + 1.) * legendre(ell)(mu[valid]) * norm.ravel()[valid]
+            w *= hermitian[valid] if ell % 2 == 0 else (~nonsingular[valid])
+            weights[i] = w
+        weights[:, k2[valid] == 0] = 0. # the zero mode is cleared
+        self._weights = weights
+
+        self.edges = kedges
+        with numpy.errstate(invalid='ignore'):
+            self._k = ksum / N
+        self._N = N
+
+    def run(self, seed=None, **params):
+        """
+        Populate the halos with the model parameters ``params``, and
+        return the multipoles of the power spectrum of the galaxies.
+
+        This is a collective operation.
+
+        Parameters
+        ----------
+        seed : int, optional
+            the random seed; default is the seed of the pipeline
+        **params :
+            key/value pairs specifying the model parameters to use; the
+            parameters persist in later calls
+
+        Returns
+        -------
+        poles : :class:`~nbodykit.binned_statistic.BinnedStatistic`
+            the multipoles, with the same variables as the ``poles`` of
+            :class:`~nbodykit.algorithms.fftpower.FFTPower`; the ``timings``
+            entry of its ``attrs`` holds the wall-clock time in seconds
+            of each stage of the computation
+        """
+        model = self.model
+        missing = set(params) - set(model.param_dict)
+        if len(missing):
+            raise ValueError("invalid halo model parameter names: %s" % str(missing))
+        model.param_dict.update(params)
+        if seed is None:
+            seed = self.attrs['seed']
+
+        timings = {}
+        t0 = time.time()
+        if self.pm is None:
+            self._allocate()
+        timings['allocate'] = time.time() - t0
+
+        # populate the local halos
+        t0 = time.time()
+        data = model.populate(seed)
+        pos = numpy.stack([data['x'], data['y'], data['z']], axis=-1)
+        if self.attrs['rsd']:
+            los = numpy.array(self.attrs['los'])
+            vel = numpy.stack([data['vx'], data['vy'], data['vz']], axis=-1)
+            pos += numpy.outer(vel.dot(los) * self.attrs['rsd_factor'], los)
+            pos %= self.attrs['BoxSize']
+        timings['populate'] = time.time() - t0
+
+        # paint the galaxies to the mesh, normalized as 1 + delta
+        t0 = time.time()
+        N = self.comm.allreduce(len(pos))
+        if N == 0:
+            raise ValueError("no particles in catalog after populating halo catalog")
+
+        self.real[...] = 0
+        layout = self.pm.decompose(pos, smoothing=0.5 * self.resampler.support)
+        self.pm.paint(layout.exchange(pos), mass=1.0, resampler=self.resampler, hold=True, out=self.real)
+        self.real[...] *= numpy.prod(self.pm.Nmesh) / N
+        timings['paint'] = time.time() - t0
+
+        t0 = time.time()
+        self.real.r2c(out=self.complex)
+        timings['fft'] = time.time() - t0
+
+        # bin the power of the modes
+        t0 = time.time()
+        c = self.complex.value.ravel()[self._modes]
+        power = c.real**2 + c.imag**2
+        Nk = len(self._N)
+        ysum = numpy.array([numpy.bincount(self._bins, weights=power*w, minlength=Nk) for w in self._weights])
+        ysum = self.comm.allreduce(ysum)
+        timings['bin'] = time.time() - t0
+
+        # the multipoles as a structured array
+        cols = ['k'] + ['power_%d' %l for l in self.attrs['poles']] + ['modes']
+        dtype = [('k', 'f8')] + [(col, 'c16') for col in cols[1:-1]] + [('modes', 'i8')]
+        poles = numpy.empty(Nk, dtype=dtype)
+        poles['k'] = self._k
+        with numpy.errstate(invalid='ignore'):
+            for col, y in zip(cols[1:-1], ysum):
+                poles[col] = y / self._N
+        poles['modes'] = self._N
+
+        attrs = dict(self.attrs)
+        attrs.update(model.param_dict)
+        attrs.update({'seed':seed, 'N1':N, 'N2':N, 'shotnoise':attrs['volume'] / N, 'timings':timings})
+
+        if self.comm.rank == 0:
+            args = (N, ', '.join('%s: %.3f s' %(k, v) for k, v in sorted(timings.items())))
+            self.logger.info("measured the multipoles of %d galaxies; %s" % args)
+
+        return BinnedStatistic(['k'], [self.edges], poles, fields_to_sum=['modes'], **attrs)
+
+    def map(self, params, cpus_per_task=1, use_all_cpus=True):
+        """
+        Compute the multipoles for each set of model parameters in
+        ``params``, running independent parameter sets concurrently.
+
+        The ranks are divided in groups of ``cpus_per_task`` ranks with
+        a :class:`~nbodykit.batch.TaskManager`. The halos are sent to
+        each group, which allocates its mesh once and computes the
+        parameter sets it is assigned with :func:`run`. Each parameter
+        set starts from the current parameters of the model.
+
+        This is a collective operation; with a single rank, the parameter
+        sets are computed in turn.
+
+        Parameters
+        ----------
+        params : list of dict
+            the sets of model parameters; each dict can also hold the 'seed'
+        cpus_per_task : int, optional
+            the number of ranks computing each parameter set
+        use_all_cpus : bool, optional
+            whether to use all of the ranks, even if ``cpus_per_task`` does
+            not divide the number of available ranks evenly
+
+        Returns
+        -------
+        results : list of :class:`~nbodykit.binned_statistic.BinnedStatistic`
+            the multipoles of each parameter set, on all ranks
+        """
+        from nbodykit.batch import TaskManager
+
+        defaults = dict(self.model.param_dict)
+
+        def compute(pipeline, p):
+            pipeline.model.param_dict = dict(defaults)
+            return pipeline.run(**p)
+
+        if self.comm.size == 1:
+            results = [compute(self, p) for p in params]
+            self.model.param_dict = defaults
+            return results
+
+        with TaskManager(cpus_per_task, comm=self.comm, use_all_cpus=use_all_cpus) as manager:
+
+            halos = _scatter_halos(self.model.halos, manager)
+            pipeline = None
+            if manager.is_worker():
+                pipeline = copy.copy(self)
+                pipeline.comm = manager.comm
+                pipeline.model = copy.copy(self.model)
+                pipeline.model.halos = halos
+                pipeline.model._draws = None
+                pipeline.pm = None
+
+            results = manager.map(lambda p: compute(pipeline, p), list(params))
+
+        return results
+
+def _scatter_halos(halos, manager):
+    """
+    Internal function to send the local ``halos`` of each rank to one rank
+    of each group of workers of the :class:`~nbodykit.batch.TaskManager`
+    ``manager``, returning the halos received by this rank.
+    """
+    basecomm, comm = manager.basecomm, manager.comm
+
+    # the group (by its first rank) and the rank in the group of all ranks
+    leader = comm.bcast(basecomm.rank)
+    groups = basecomm.allgather((leader, comm.rank, comm.size, manager.is_worker()))
+
+    # send to the rank with the same index, modulo the group size, of each group
+    send = [None] * basecomm.size
+    for dest, (leader, rank, size, worker) in enumerate(groups):
+        if worker and basecomm.rank % size == rank:
+            send[dest] = dict((col, halos[col]) for col in halos if col != 'BoxSize')
+    recv = [h for h in basecomm.alltoall(send) if h is not None]
+
+    if not len(recv):
+        return None
+    toret = dict((col, numpy.concatenate([h[col] for h in recv], axis=0)) for col in recv[0])
+    toret['BoxSize'] = halos['BoxSize']
+    return toret
+
+# the compensation of the windows, for painting without interlacing
+_compensation = {'cic' : CatalogMesh.CompensateCICShotnoise,
+                 'tsc' : CatalogMesh.CompensateTSCShotnoise,
+                 'pcs' : CatalogMesh.CompensatePCSShotnoise}
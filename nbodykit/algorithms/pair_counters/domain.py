@@ -279,6 +279,7 @@ def get_cartesian(comm, pos, cosmo=None):
     If ``cosmo`` is not provided, return coordinates on the unit sphere.
     """
     from nbodykit.utils import get_data_bounds
+    from nbodykit.cosmology.background import get_background_table
 
     # get RA,DEC in degrees
     ra, dec = numpy.deg2rad(pos[:,0]), numpy.deg2rad(pos[:,1])
@@ -292,7 +293,7 @@ def get_cartesian(comm, pos, cosmo=None):
     # multiply by comoving distance?
     if cosmo is not None:
         assert pos.shape[-1] == 3
-        rdist = cosmo.comoving_distance(pos[:,2]) # in Mpc/h
+        rdist = get_background_table(cosmo).comoving_distance(pos[:,2]) # in Mpc/h
         cpos = rdist[:,None] * cpos
     else:
         rdist = None
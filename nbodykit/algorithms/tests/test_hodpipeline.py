@@ -0,0 +1,59 @@
+from runtests.mpi import MPITest
+from nbodykit.lab import *
+from nbodykit import setup_logging
+from numpy.testing import assert_allclose, assert_array_equal
+import pytest
+
+setup_logging()
+
+@MPITest([1, 4])
+def test_fftpower(comm):
+
+    CurrentMPIComm.set(comm)
+    source = UniformCatalog(nbar=4e-5, BoxSize=500., seed=42)
+    source['Mass'] = 10**source.rng.uniform(12, 15, size=source.size)
+    halos = HaloCatalog(source, cosmo=cosmology.Planck15, redshift=0.55)
+
+    pipeline = HODPowerPipeline(halos, Zheng07Model, Nmesh=32, seed=42, kmin=0.01)
+    poles = pipeline.run(alpha=1.2)
+
+    # same result as populating and running FFTPower
+    hod = halos.populate(Zheng07Model, seed=42, alpha=1.2)
+    hod['Position'] = (hod['Position'] + hod['VelocityOffset'] * [0, 0, 1]) % 500.
+    r = FFTPower(hod, mode='1d', Nmesh=32, poles=[0, 2, 4], kmin=0.01)
+
+    assert_array_equal(poles['modes'], r.poles['modes'])
+    assert_allclose(poles['k'], r.poles['k'])
+    for ell in [0, 2, 4]:
+        assert_allclose(poles['power_%d' %ell].real, r.poles['power_%d' %ell].real, rtol=1e-6, atol=1e-6)
+    assert_allclose(poles.attrs['shotnoise'], r.attrs['shotnoise'])
+
+    # the second run re-uses the mesh
+    pm = pipeline.pm
+    poles2 = pipeline.run(alpha=1.2)
+    assert pipeline.pm is pm
+    assert_allclose(poles2['power_0'], poles['power_0'])
+    assert set(poles2.attrs['timings']) == set(['allocate', 'populate', 'paint', 'fft', 'bin'])
+
+    # bad params
+    with pytest.raises(ValueError):
+        pipeline.run(bad_param_name=1.0)
+
+@MPITest([1, 4])
+def test_map(comm):
+
+    CurrentMPIComm.set(comm)
+    source = UniformCatalog(nbar=4e-5, BoxSize=500., seed=42)
+    source['Mass'] = 10**source.rng.uniform(12, 15, size=source.size)
+    halos = HaloCatalog(source, cosmo=cosmology.Planck15, redshift=0.55)
+
+    pipeline = HODPowerPipeline(halos, Zheng07Model, Nmesh=32, seed=42)
+    params = [{'alpha':0.9}, {'logMmin':12.5}, {'alpha':1.1, 'seed':84}]
+    results = pipeline.map(params, cpus_per_task=1)
+
+    # same results as running in turn on all ranks
+    for p, poles in zip(params, results):
+        pipeline.model.param_dict.update(Zheng07Model.defaults)
+        ref = pipeline.run(**p)
+        assert_allclose(poles['power_0'].real, ref['power_0'].real, rtol=1e-6)
+        assert poles.attrs['N1'] == ref.attrs['N1']
@@ -1,7 +1,8 @@
 from runtests.mpi import MPITest
 from nbodykit.lab import *
-from nbodykit import setup_logging
+from nbodykit import setup_logging, set_options
 from numpy.testing import assert_allclose, assert_array_equal
+import numpy
 
 # debug logging
 setup_logging("debug")
@@ -78,3 +79,71 @@ def test_weighted(comm):
     
 
 
+
+@MPITest([1, 4])
+def test_stream(comm):
+
+    N = 10000
+    FSKY = 1.0
+
+    CurrentMPIComm.set(comm)
+    cosmo = cosmology.Planck15
+
+    # create the source, with small blocks
+    with set_options(dask_chunk_size=1000):
+        source = RandomCatalog(N, seed=42)
+        source['z'] = source.rng.normal(loc=0.5, scale=0.1, size=source.size)
+        source['weight'] = source.rng.uniform(0, high=1., size=source.size)
+
+    # same result reading block by block; the counts are exact
+    # up to the split of the fine bins at the edges
+    r1 = RedshiftHistogram(source, FSKY, cosmo, redshift='z', weight='weight')
+    r2 = RedshiftHistogram(source, FSKY, cosmo, redshift='z', weight='weight', stream=True)
+
+    assert_allclose(r1.bin_edges, r2.bin_edges)
+    assert_allclose((r1.nbar*r1.dV).sum(), (r2.nbar*r2.dV).sum())
+    assert_allclose(r1.nbar*r1.dV, r2.nbar*r2.dV, atol=2.)
+
+    # with explicit bins, the counts are exact
+    r3 = RedshiftHistogram(source, FSKY, cosmo, bins=r1.bin_edges, redshift='z', weight='weight', stream=True)
+    assert_allclose(r1.nbar, r3.nbar)
+
+    # the bins and the counts come from a single pass over the redshifts
+    nblocks = []
+    def count(z):
+        if len(z): nblocks.append(len(z))
+        return z
+    source['z2'] = source['z'].map_blocks(count, dtype='f8')
+    for bins in [None, 'fd', 10]:
+        nblocks[:] = []
+        r = RedshiftHistogram(source, FSKY, cosmo, bins=bins, redshift='z2', stream=True)
+        assert sum(nblocks) == source.size
+
+    # the spline of n(z) evaluated lazily on the column
+    nz = r2.nofz(source['z'])
+    assert_allclose(nz.compute(), r2.nofz(source['z'].compute()))
+    assert_allclose(r2.nofz(r2.bin_centers), r2.nbar)
+
+@MPITest([1, 4])
+def test_fd_bins(comm):
+
+    N = 10000
+    FSKY = 1.0
+
+    CurrentMPIComm.set(comm)
+    cosmo = cosmology.Planck15
+
+    # create the source
+    source = RandomCatalog(N, seed=42)
+    source['z'] = source.rng.normal(loc=0.5, scale=0.1, size=source.size)
+
+    # Freedman-Diaconis bin width from the interquartile range
+    r = RedshiftHistogram(source, FSKY, cosmo, redshift='z', bins='fd', stream=True)
+    z = numpy.concatenate(comm.allgather(source['z'].compute()))
+    q1, q3 = numpy.percentile(z, [25, 75])
+    assert_allclose(r.bin_edges[1] - r.bin_edges[0], 2 * (q3 - q1) / N**(1./3), rtol=1e-2)
+
+    # equally spaced bins
+    r = RedshiftHistogram(source, FSKY, cosmo, redshift='z', bins=10, stream=True)
+    assert len(r.bin_edges) == 11
+    assert_allclose(r.bin_edges[[0, -1]], [z.min(), z.max()])
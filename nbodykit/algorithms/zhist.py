@@ -4,6 +4,7 @@ from mpi4py import MPI
 
 from nbodykit import CurrentMPIComm
 from nbodykit.transform import ConstantArray
+from six import string_types
 
 class RedshiftHistogram(object):
     """
@@ -13,6 +14,16 @@ class RedshiftHistogram(object):
     Results are computed when the object is inititalized. See the documenation
     of :func:`~RedshiftHistogram.run` for the attributes storing the results.
 
+    With ``stream=True``, the redshift and weight columns are read one dask
+    block at a time, and the histogram is accumulated block by block, such
+    that the memory use does not depend on the size of the catalog. If the
+    bins are determined from the data, they are computed from statistics
+    accumulated in the same pass: the exact moments and range of the
+    redshifts, and a :class:`QuantileSketch` of their distribution. The
+    counts are accumulated in a :class:`FineHistogram` during the pass,
+    and rebinned to the chosen bins, such that the counts of the bins are
+    exact, up to the split of a single fine bin at each edge.
+
     .. note::
         The units of the number density are :math:`(\mathrm{Mpc}/h)^{-3}`
 
@@ -26,20 +37,25 @@ class RedshiftHistogram(object):
     cosmo : :class:`nbodykit.cosmology.core.Cosmology`
         the cosmological parameters, which are used to compute the volume
         from redshift shells when normalizing :math:`n(z)`
-    bins : int or sequence of scalars, optional
+    bins : int, str, or sequence of scalars, optional
         If `bins` is an int, it defines the number of equal-width
         bins in the given range. If `bins` is a sequence, it defines the bin
         edges, including the rightmost edge, allowing for non-uniform bin widths.
-        If not provided, Scott's rule is used to estimate the optimal bin width
-        from the input data (default)
+        If `bins` is 'fd', the Freedman-Diaconis rule is used to estimate
+        the optimal bin width from the interquartile range of the data.
+        If not provided, or 'scott', Scott's rule is used to estimate the
+        optimal bin width from the input data (default)
     redshift : str, optional
         the name of the column specifying the redshift data
     weight : str, optional
         the name of the column specifying weights to use when histogramming the data
+    stream : bool, optional
+        if ``True``, read the columns block by block, rather than computing
+        the full columns at once
     """
     logger = logging.getLogger('RedshiftHistogram')
 
-    def __init__(self, source, fsky, cosmo, bins=None, redshift='Redshift', weight=None):
+    def __init__(self, source, fsky, cosmo, bins=None, redshift='Redshift', weight=None, stream=False):
 
         # input columns need to be there
         for col in [redshift, weight]:
@@ -47,35 +63,70 @@ class RedshiftHistogram(object):
                 raise ValueError("'%s' column missing from input source in RedshiftHistogram" %col)
 
         self.comm = source.comm
-
-        # using Scott's rule for binning
-        if bins is None:
-            h, bins = scotts_bin_width(source.compute(source[redshift]), self.comm)
-            if self.comm.rank == 0:
-                self.logger.info("using Scott's rule to determine optimal binning; h = %.2e, N_bins = %d" %(h, len(bins)-1))
-
-        # equally spaced bins from min to max val
-        elif numpy.isscalar(bins):
-            if self.comm.rank == 0:
-                self.logger.info("computing %d equally spaced bins" %bins)
-            z = source.compute(source[redshift])
-            maxval = comm.allreduce(z.max(), op=MPI.MAX)
-            minval = comm.allreduce(z.min(), op=MPI.MIN)
-            bins = linspace(minval, maxval, bins + 1, endpoint=True)
-
         self.source = source
         self.cosmo  = cosmo
 
         self.attrs = {}
-        self.attrs['edges'] = bins
         self.attrs['fsky'] = fsky
         self.attrs['redshift'] = redshift
         self.attrs['weight'] = weight
         self.attrs['cosmo'] = dict(cosmo)
+        self.attrs['stream'] = stream
+
+        if isinstance(bins, string_types) and bins not in ['scott', 'fd']:
+            raise ValueError("'bins' should be 'scott', 'fd', an integer, or the bin edges")
+        if bins is not None and not isinstance(bins, string_types) and not numpy.isscalar(bins):
+            bins = numpy.asarray(bins, dtype='f8')
+        self._bins = bins
 
         # and run
         self.run()
 
+    def _blocks(self, *columns):
+        """
+        Internal generator that yields the local data of the ``columns``
+        of the source, either all at once, or one dask block at a time
+        if ``stream`` is ``True``.
+        """
+        if not self.attrs['stream']:
+            yield self.source.compute(*columns)
+            return
+
+        for start, data in self.source.compute_chunks(*columns):
+            yield data
+
+    def _find_bins(self, bins, stats, sketch):
+        """
+        Internal function to return the bin edges, given the name of the
+        rule or the number of bins, from the moments and range ``stats``,
+        and the :class:`QuantileSketch` ``sketch`` of the redshifts on
+        all ranks.
+        """
+        if stats.N == 0:
+            raise ValueError("no objects to histogram in RedshiftHistogram")
+
+        # equally spaced bins from min to max val
+        if numpy.isscalar(bins) and not isinstance(bins, string_types):
+            if self.comm.rank == 0:
+                self.logger.info("computing %d equally spaced bins" %bins)
+            return numpy.linspace(stats.min, stats.max, bins + 1, endpoint=True)
+
+        # using Scott's rule for binning
+        if bins is None or bins == 'scott':
+            h, edges = _bin_edges(stats.std * (24. * numpy.sqrt(numpy.pi) / stats.N) ** (1. / 3),
+                                    stats.min, stats.max)
+            if self.comm.rank == 0:
+                self.logger.info("using Scott's rule to determine optimal binning; h = %.2e, N_bins = %d" %(h, len(edges)-1))
+
+        # using the Freedman-Diaconis rule
+        elif bins == 'fd':
+            q1, q3 = sketch.quantile([0.25, 0.75])
+            h, edges = _bin_edges(2. * (q3 - q1) / stats.N ** (1. / 3), stats.min, stats.max)
+            if self.comm.rank == 0:
+                self.logger.info("using Freedman-Diaconis rule to determine optimal binning; h = %.2e, N_bins = %d" %(h, len(edges)-1))
+
+        return edges
+
     def run(self):
         """
         Run the algorithm, which computes the histogram. This function
@@ -86,6 +137,7 @@ class RedshiftHistogram(object):
         - :attr:`bin_centers`
         - :attr:`dV`
         - :attr:`nbar`
+        - :attr:`nofz`
 
         .. note::
             All ranks store the same result attributes.
@@ -101,9 +153,11 @@ class RedshiftHistogram(object):
         nbar : array_like
             the values of the redshift histogram, normalized to
             number density (in units of :math:`(\mathrm{Mpc}/h)^{-3}`)
+        nofz : :class:`NZSpline`
+            the spline of :attr:`nbar` as a function of redshift, which
+            can be evaluated on a column, e.g., to add the ``NZ`` column
+            of a :class:`~nbodykit.source.catalog.fkp.FKPCatalog`
         """
-        edges = self.attrs['edges']
-
         # get the columns
         redshift = self.source[self.attrs['redshift']]
         if self.attrs['weight'] is not None:
@@ -113,29 +167,52 @@ class RedshiftHistogram(object):
         else:
             weight = ConstantArray(1.0, self.source.size)
 
-        # compute the numpy arrays from dask
-        redshift, weight = self.source.compute(redshift, weight)
-
-        # do the bin count, using the specified weight values
-        dig = numpy.searchsorted(edges, redshift, "right")
-        N = numpy.bincount(dig, weights=weight, minlength=len(edges)+1)[1:-1]
+        # the bins, and the weighted counts, from a single pass
+        bins = self._bins
+        if isinstance(bins, numpy.ndarray):
+            edges = bins
+            N = numpy.zeros(len(edges) - 1)
+            for z, w in self._blocks(redshift, weight):
+                N += _bincount(edges, z, w)
+            N = self.comm.allreduce(N)
+
+        elif not self.attrs['stream']:
+            z, w = self.source.compute(redshift, weight)
+            stats, sketch = RunningStatistics(), QuantileSketch()
+            stats.update(z)
+            if bins == 'fd':
+                sketch.update(z)
+            edges = self._find_bins(bins, stats.allreduce(self.comm), sketch.allreduce(self.comm))
+            N = self.comm.allreduce(_bincount(edges, z, w))
 
-        # now sum across all ranks
-        N = self.comm.allreduce(N)
+        else:
+            stats, sketch, hist = RunningStatistics(), QuantileSketch(), FineHistogram()
+            for z, w in self._blocks(redshift, weight):
+                stats.update(z)
+                if bins == 'fd':
+                    sketch.update(z)
+                hist.update(z, w)
+            stats = stats.allreduce(self.comm)
+            edges = self._find_bins(bins, stats, sketch.allreduce(self.comm))
+            N = hist.allreduce(self.comm).rebin(edges, stats.min, stats.max)
 
         # compute the volume
         if self.comm.rank == 0:
             self.logger.info("using cosmology %s to compute volume in units of (Mpc/h)^3" %str(self.cosmo))
             self.logger.info("sky fraction used in volume calculation: %.4f" %self.attrs['fsky'])
-        R_hi = self.cosmo.comoving_distance(edges[1:]) # in Mpc/h
-        R_lo = self.cosmo.comoving_distance(edges[:-1]) # in Mpc/h
+        from nbodykit.cosmology.background import get_background_table
+        table = get_background_table(self.cosmo)
+        R_hi = table.comoving_distance(edges[1:]) # in Mpc/h
+        R_lo = table.comoving_distance(edges[:-1]) # in Mpc/h
         dV   = (4./3.)*numpy.pi*(R_hi**3 - R_lo**3) * self.attrs['fsky']
 
         # store the results
+        self.attrs['edges'] = edges
         self.bin_edges   = edges
         self.bin_centers = 0.5*(edges[:-1] + edges[1:])
         self.dV          = dV
         self.nbar        = 1.*N/dV
+        self.nofz        = NZSpline(edges, self.nbar)
 
     def __getstate__(self):
         state = dict(
@@ -148,6 +225,7 @@ class RedshiftHistogram(object):
 
     def __setstate__(self, state):
         self.__dict__.update(state)
+        self.nofz = NZSpline(self.bin_edges, self.nbar)
 
     def save(self, output):
         """
@@ -225,8 +303,388 @@ def scotts_bin_width(data, comm):
     dx = sigma * (24. * numpy.sqrt(numpy.pi) / csize) ** (1. / 3)
     maxval = comm.allreduce(data.max(), op=MPI.MAX)
     minval = comm.allreduce(data.min(), op=MPI.MIN)
+    return _bin_edges(dx, minval, maxval)
+
+def _bincount(edges, z, w):
+    """
+    Internal function to return the sum of the weights ``w`` of the
+    redshifts ``z`` in each bin of edges ``edges``.
+    """
+    dig = numpy.searchsorted(edges, z, "right")
+    return numpy.bincount(dig, weights=w, minlength=len(edges)+1)[1:-1]
+
+def _bin_edges(dx, minval, maxval):
+    """
+    Internal function to return the bin spacing ``dx`` and the edges
+    of the bins of width ``dx`` covering ``minval`` to ``maxval``.
+    """
+    if not dx > 0:
+        return dx, numpy.array([minval, maxval])
 
     Nbins = numpy.ceil((maxval - minval) * 1. / dx)
     Nbins = max(1, Nbins)
     edges = minval + dx * numpy.arange(Nbins + 1)
     return dx, edges
+
+class RunningStatistics(object):
+    """
+    The size, mean, variance, and range of data that are
+    accumulated block by block.
+
+    The moments of the blocks are combined using the pairwise update
+    of `Chan et al. 1979 <http://i.stanford.edu/pub/cstr/reports/cs/tr/79/773/CS-TR-79-773.pdf>`_,
+    which is numerically stable.
+    """
+    def __init__(self, N=0, mean=0., M2=0., min=numpy.inf, max=-numpy.inf):
+        self.N = N
+        self.mean = mean
+        self.M2 = M2
+        self.min = min
+        self.max = max
+
+    @property
+    def std(self):
+        """
+        The standard deviation of the data.
+        """
+        return (self.M2 / self.N)**0.5 if self.N else numpy.nan
+
+    def update(self, data):
+        """
+        Add the array ``data`` to the statistics.
+        """
+        if len(data):
+            mean = data.mean()
+            other = RunningStatistics(len(data), mean, ((data - mean)**2).sum(), data.min(), data.max())
+            self.merge(other)
+
+    def merge(self, other):
+        """
+        Add the statistics ``other`` of another set of data.
+        """
+        N = self.N + other.N
+        if N == 0: return
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * other.N / N
+        self.M2 = self.M2 + other.M2 + delta**2 * self.N * other.N / N
+        self.N = N
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def allreduce(self, comm):
+        """
+        Return the statistics of the data on all ranks of ``comm``.
+
+        This is a collective operation.
+        """
+        toret = RunningStatistics()
+        for stats in comm.allgather(self):
+            toret.merge(stats)
+        return toret
+
+class QuantileSketch(object):
+    """
+    A summary of the distribution of weighted data, from which the
+    quantiles of the data can be estimated, which is accumulated block
+    by block, and merged across ranks.
+
+    The summary holds at most ``2 * size`` weighted centroids. When full,
+    it is compressed by merging the sorted centroids into ``size`` groups
+    of equal weight, such that the error on the rank of the quantiles is
+    of order ``1 / size``.
+
+    Parameters
+    ----------
+    size : int, optional
+        the number of centroids after compression
+    """
+    def __init__(self, size=1000):
+        self.size = size
+        self.values = numpy.empty(0)
+        self.weights = numpy.empty(0)
+
+    def update(self, values, weights=None):
+        """
+        Add the data ``values``, with weights ``weights`` (default is 1).
+        """
+        values = numpy.asarray(values, dtype='f8').ravel()
+        if weights is None:
+            weights = numpy.ones(len(values))
+        weights = numpy.broadcast_to(numpy.asarray(weights, dtype='f8'), values.shape)
+
+        self.values = numpy.concatenate([self.values, values])
+        self.weights = numpy.concatenate([self.weights, weights])
+        if len(self.values) > 2 * self.size:
+            self._compress()
+
+    def _compress(self):
+        """
+        Internal function to merge the centroids into ``size`` groups of
+        equal weight, each represented by its weighted mean.
+        """
+        order = numpy.argsort(self.values, kind='mergesort')
+        values, weights = self.values[order], self.weights[order]
+        cumweight = numpy.cumsum(weights) - weights
+        total = weights.sum()
+        if not total > 0:
+            return
+
+        group = numpy.minimum((cumweight / total * self.size).astype('i8'), self.size - 1)
+        W = numpy.bincount(group, weights=weights, minlength=self.size)
+        V = numpy.bincount(group, weights=weights * values, minlength=self.size)
+        valid = W > 0
+        self.values, self.weights = V[valid] / W[valid], W[valid]
+
+    def allreduce(self, comm):
+        """
+        Return the sketch of the data on all ranks of ``comm``.
+
+        This is a collective operation.
+        """
+        toret = QuantileSketch(self.size)
+        for sketch in comm.allgather(self):
+            toret.update(sketch.values, sketch.weights)
+        return toret
+
+    def quantile(self, q):
+        """
+        Return the estimated quantiles ``q``, between 0 and 1, of the data.
+        """
+        order = numpy.argsort(self.values, kind='mergesort')
+        values, weights = self.values[order], self.weights[order]
+        if not len(values):
+            return numpy.nan * numpy.asarray(q)
+
+        # the centroids are at the middle of their cumulative weight
+        mid = numpy.cumsum(weights) - 0.5 * weights
+        return numpy.interp(numpy.asarray(q) * weights.sum(), mid, values)
+
+class FineHistogram(object):
+    """
+    A histogram of weighted data on a fine, uniform grid, which is
+    accumulated block by block, and merged across ranks, without knowing
+    the range of the data in advance.
+
+    The bins have a width of a power of two, and the width is doubled,
+    by merging pairs of bins, whenever the range of the data needs more
+    than ``size`` bins. The histogram can then be rebinned to coarser bins
+    chosen from the data, splitting the weight of the fine bins that
+    straddle an edge linearly.
+
+    Parameters
+    ----------
+    size : int, optional
+        the maximum number of bins
+    """
+    def __init__(self, size=2**16):
+        self.size = size
+        self.width = None
+        self.start = 0
+        self.counts = numpy.zeros(0)
+
+    def _coarsen(self, factor):
+        """
+        Internal function to widen the bins by the power of two ``factor``.
+        """
+        if factor == 1: return
+        index = (self.start + numpy.arange(len(self.counts))) // factor
+        self.counts = numpy.bincount(index - index[0], weights=self.counts) if len(index) else self.counts
+        self.start = self.start // factor
+        self.width = self.width * factor
+
+    def update(self, values, weights=None):
+        """
+        Add the data ``values``, with weights ``weights`` (default is 1).
+        """
+        values = numpy.asarray(values, dtype='f8').ravel()
+        if not len(values):
+            return
+        if weights is None:
+            weights = numpy.ones(len(values))
+        weights = numpy.broadcast_to(numpy.asarray(weights, dtype='f8'), values.shape)
+
+        # the first width, a power of two, from the range of the first values
+        if self.width is None:
+            lo, hi = values.min(), values.max()
+            scale = (hi - lo) / self.size or abs(lo) / self.size or 1.
+            self.width = 2. ** numpy.ceil(numpy.log2(scale))
+            self.start = int(numpy.floor(lo / self.width))
+
+        # widen the bins until the data fits
+        while True:
+            index = numpy.floor(values / self.width).astype('i8')
+            lo = min(index.min(), self.start)
+            hi = max(index.max() + 1, self.start + len(self.counts))
+            if hi - lo <= self.size: break
+            self._coarsen(2)
+
+        counts = numpy.zeros(hi - lo)
+        counts[self.start - lo:self.start - lo + len(self.counts)] = self.counts
+        counts += numpy.bincount(index - lo, weights=weights, minlength=hi - lo)
+        self.start, self.counts = lo, counts
+
+    def allreduce(self, comm):
+        """
+        Return the histogram of the data on all ranks of ``comm``.
+
+        This is a collective operation.
+        """
+        import copy
+        hists = [copy.copy(h) for h in comm.allgather(self) if h.width is not None]
+        toret = FineHistogram(self.size)
+        if not len(hists):
+            return toret
+
+        # the widest bins on all ranks
+        toret.width = max(h.width for h in hists)
+        lo, hi = None, None
+        for h in hists:
+            h._coarsen(int(round(toret.width / h.width)))
+            lo = h.start if lo is None else min(lo, h.start)
+            hi = h.start + len(h.counts) if hi is None else max(hi, h.start + len(h.counts))
+        toret.start = lo
+        toret.counts = numpy.zeros(hi - lo)
+        for h in hists:
+            toret.counts[h.start - lo:h.start - lo + len(h.counts)] += h.counts
+
+        # and back below the maximum number of bins
+        while len(toret.counts) > toret.size:
+            toret._coarsen(2)
+        return toret
+
+    def rebin(self, edges, minval, maxval):
+        """
+        Return the sum of the weights in each bin of edges ``edges``, given
+        the minimum ``minval`` and maximum ``maxval`` of the data, which
+        bound the fine bins at either end.
+        """
+        if not len(self.counts):
+            return numpy.zeros(len(edges) - 1)
+
+        # the cumulative weight at the edges of the fine bins, within the data range
+        x = (self.start + numpy.arange(len(self.counts) + 1)) * self.width
+        x[0], x[-1] = minval, maxval
+        y = numpy.concatenate([[0.], numpy.cumsum(self.counts)])
+        return numpy.diff(numpy.interp(edges, x, y))
+
+class NZSpline(object):
+    r"""
+    A cubic spline of the number density :math:`n(z)` at the centers of
+    redshift bins, which vanishes outside of the edges of the bins.
+
+    The spline can be evaluated on numpy arrays or dask arrays; dask arrays
+    are evaluated lazily, block by block, such that the ``NZ`` column of
+    a :class:`~nbodykit.source.catalog.fkp.FKPCatalog` can be added with:
+
+    >>> fkp['randoms']['NZ'] = zhist.nofz(fkp['randoms']['Redshift'])
+
+    Parameters
+    ----------
+    edges : array_like
+        the edges of the redshift bins
+    nbar : array_like
+        the number density in each bin
+    """
+    def __init__(self, edges, nbar):
+        from scipy.interpolate import InterpolatedUnivariateSpline as spline
+
+        self.edges = numpy.asarray(edges, dtype='f8')
+        self.nbar = numpy.asarray(nbar, dtype='f8')
+
+        centers = 0.5 * (self.edges[1:] + self.edges[:-1])
+        if len(centers) > 1:
+            self._spline = spline(centers, self.nbar, k=min(3, len(centers) - 1))
+        else:
+            self._spline = lambda z: numpy.ones_like(z) * self.nbar[0]
+
+    def _evaluate(self, z):
+        """
+        Internal function to evaluate the spline on the numpy array ``z``.
+        """
+        z = numpy.asarray(z, dtype='f8')
+        toret = numpy.zeros(z.shape)
+        valid = (z >= self.edges[0]) & (z <= self.edges[-1])
+        toret[valid] = self._spline(z[valid])
+        return toret
+
+    def __call__(self, z):
+        """
+        Return :math:`n(z)` at the redshifts ``z``.
+        """
+        import dask.array as da
+        if isinstance(z, da.Array):
+            return z.map_blocks(self._evaluate, dtype='f8')
+        return self._evaluate(z)
+
+    def tabulate(self, size=8192):
+        """
+        Return the :class:`NZTable` of the spline on ``size`` equally spaced
+        redshifts between the first and last edges.
+        """
+        if size < 2:
+            raise ValueError("the table should have at least 2 redshifts")
+        z = numpy.linspace(self.edges[0], self.edges[-1], size)
+        return NZTable(self.edges[0], z[1] - z[0], self._evaluate(z))
+
+class NZTable(object):
+    r"""
+    A table of the number density :math:`n(z)` on equally spaced redshifts,
+    which is linearly interpolated, and vanishes outside of the table.
+
+    As the redshifts are equally spaced, the lookup does not need a search,
+    and the table only holds an array of values, such that it is cheap to
+    evaluate on large catalogs and to send to other processes.
+
+    Parameters
+    ----------
+    zmin : float
+        the first redshift of the table
+    dz : float
+        the spacing of the redshifts
+    values : array_like
+        the number density at the redshifts ``zmin + dz * i``
+    """
+    def __init__(self, zmin, dz, values):
+        self.zmin = zmin
+        self.dz = dz
+        self.values = numpy.asarray(values, dtype='f8')
+
+    @property
+    def zmax(self):
+        """
+        The last redshift of the table.
+        """
+        return self.zmin + self.dz * (len(self.values) - 1)
+
+    def __mul__(self, factor):
+        return NZTable(self.zmin, self.dz, self.values * factor)
+
+    __rmul__ = __mul__
+
+    def _evaluate(self, z):
+        """
+        Internal function to interpolate the table at the numpy array ``z``.
+        """
+        z = numpy.asarray(z, dtype='f8')
+        x = (z - self.zmin) / self.dz
+        with numpy.errstate(invalid='ignore'):
+            valid = (x >= 0) & (x <= len(self.values) - 1)
+
+        # the index of the interval, and the position in the interval
+        i = numpy.where(valid, numpy.floor(x), 0).astype('intp')
+        i = numpy.minimum(i, max(len(self.values) - 2, 0))
+        t = numpy.where(valid, x - i, 0.)
+
+        toret = self.values[i] * (1 - t)
+        if len(self.values) > 1:
+            toret += self.values[i + 1] * t
+        return numpy.where(valid, toret, 0.)
+
+    def __call__(self, z):
+        """
+        Return :math:`n(z)` at the redshifts ``z``.
+        """
+        import dask.array as da
+        if isinstance(z, da.Array):
+            return z.map_blocks(self._evaluate, dtype='f8')
+        return self._evaluate(z)
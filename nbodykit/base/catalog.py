@@ -7,7 +7,9 @@ import logging
 import warnings
 import abc
 import inspect
+import uuid
 import dask.array as da
+from mpi4py import MPI
 
 class ColumnAccessor(da.Array):
     """
@@ -32,8 +34,18 @@ class ColumnAccessor(da.Array):
     is_default : bool, optional
         whether this column is a default column; default columns are not
         serialized to disk, as they are automatically available as columns
+    column_name : str, optional
+        the name of the catalog column, if this is an unmodified column
+
+    Notes
+    -----
+    Comparing an unmodified column to a scalar (with ``<``, ``<=``, ``>``
+    or ``>=``), and combining such comparisons with ``&``, records
+    the range predicate in the ``predicate`` attribute of the result. Catalogs
+    reading from disk can use this to avoid reading data that cannot match
+    the selection.
     """
-    def __new__(cls, catalog, daskarray, is_default=False):
+    def __new__(cls, catalog, daskarray, is_default=False, column_name=None):
         self = da.Array.__new__(ColumnAccessor,
                 daskarray.dask,
                 daskarray.name,
@@ -42,9 +54,44 @@ class ColumnAccessor(da.Array):
                 daskarray.shape)
         self.catalog = catalog
         self.is_default = is_default
+        self.column_name = column_name
+        self.predicate = None
         self.attrs = {}
         return self
 
+    def __lt__(self, other):
+        return self._compare('<', da.Array.__lt__(self, other), other)
+
+    def __le__(self, other):
+        return self._compare('<=', da.Array.__le__(self, other), other)
+
+    def __gt__(self, other):
+        return self._compare('>', da.Array.__gt__(self, other), other)
+
+    def __ge__(self, other):
+        return self._compare('>=', da.Array.__ge__(self, other), other)
+
+    def __and__(self, other):
+        toret = ColumnAccessor(self.catalog, da.Array.__and__(self, other))
+
+        # the intersection of two range predicates on the same catalog
+        if self.predicate and getattr(other, 'predicate', None):
+            if other.catalog is self.catalog:
+                toret.predicate = self.predicate + other.predicate
+        return toret
+
+    def _compare(self, op, result, other):
+        """
+        Internal function to return the result of a comparison, recording
+        the range predicate if ``self`` is an unmodified column and
+        ``other`` is a real scalar.
+        """
+        toret = ColumnAccessor(self.catalog, result)
+        if self.column_name is not None and numpy.isscalar(other) and numpy.isrealobj(other):
+            if not isinstance(other, (string_types, bool, numpy.bool_)):
+                toret.predicate = ((self.column_name, op, other),)
+        return toret
+
     def __getitem__(self, key):
 
         # compute dask index b/c they are not fully supported
@@ -213,6 +260,10 @@ class CatalogSourceBase(object):
         # stores memory owner
         obj.base = None
 
+        # the identity and version of the columns, used to cache painted fields
+        obj._uid = uuid.uuid4().hex
+        obj._version = 0
+
         return obj
 
     def __finalize__(self, other):
@@ -238,7 +289,7 @@ class CatalogSourceBase(object):
         if isinstance(other, CatalogSourceBase):
             d = other.__dict__.copy()
             nocopy = ['base', '_overrides', '_hardcolumns', '_defaults', 'comm',
-                      '_size', '_csize']
+                      '_size', '_csize', '_uid', '_version']
             for key in d:
                 if key not in nocopy:
                     self.__dict__[key] = d[key]
@@ -286,8 +337,9 @@ class CatalogSourceBase(object):
         if self.comm.allreduce(size) == self.csize:
            return self.base if self.base is not None else self
 
-        # initialize subset Source of right size
-        subset_data = {col:self[col][index] for col in self}
+        # initialize subset Source of right size, reading only the selected rows
+        rows = numpy.flatnonzero(index)
+        subset_data = {col:self.get_column_rows(col, rows) for col in self}
         cls = self.__class__ if self.base is None else self.base.__class__
         toret = cls._from_columns(size, self.comm, **subset_data)
 
@@ -296,6 +348,35 @@ class CatalogSourceBase(object):
 
         return toret
 
+    def get_column_rows(self, col, rows):
+        """
+        Return the local rows ``rows`` of the column ``col`` as a dask array.
+
+        Sources that can read a subset of rows more efficiently than the
+        full column, e.g., from disk, can override this method. The default
+        indexes the full column, and merges the resulting small chunks up
+        to the ``dask_chunk_size`` global option.
+
+        Parameters
+        ----------
+        col : str
+            the name of the column
+        rows : array_like
+            the sorted, local indices of the rows to return
+
+        Returns
+        -------
+        :class:`dask.array.Array` :
+            the column data in the selected rows
+        """
+        data = self[col].as_daskarray()[rows]
+
+        # merge small chunks, e.g., after a sparse selection
+        chunksize = _global_options['dask_chunk_size']
+        if data.numblocks[0] > 1 and max(data.chunks[0]) < chunksize:
+            data = data.rechunk({0: chunksize})
+        return data
+
     def __getitem__(self, sel):
         """
         The following types of indexing are supported:
@@ -369,7 +450,7 @@ class CatalogSourceBase(object):
                             "try adding column via `source[column] = data`")
 
         # return a ColumnAccessor for pretty prints
-        return ColumnAccessor(memowner, r, is_default=is_default)
+        return ColumnAccessor(memowner, r, is_default=is_default, column_name=sel)
 
     def __setitem__(self, col, value):
         """
@@ -383,6 +464,7 @@ class CatalogSourceBase(object):
         if self.base is not None: return self.base.__setitem__(col, value)
 
         self._overrides[col] = self.make_column(value)
+        self._modified()
 
     def __delitem__(self, col):
         """
@@ -402,10 +484,22 @@ class CatalogSourceBase(object):
 
         if col in self._overrides:
             del self._overrides[col]
+            self._modified()
             return
 
         raise ValueError("unable to delete column '%s' from CatalogSource" %col)
 
+    def _modified(self):
+        """
+        Internal function to record that the columns of ``self`` have been
+        modified, invalidating any fields painted from ``self`` that are
+        stored in the field cache.
+        """
+        from nbodykit.base.fieldcache import _field_cache
+
+        self._version = getattr(self, '_version', 0) + 1
+        _field_cache.invalidate(getattr(self, '_uid', None))
+
     @property
     def attrs(self):
         """
@@ -556,6 +650,100 @@ class CatalogSourceBase(object):
         if len(toret) == 1: toret = toret[0]
         return toret
 
+    def compute_chunks(self, *args):
+        """
+        Compute the dask arrays ``args``, which have the same length, one
+        chunk at a time, along the chunks of the first array.
+
+        This is a generator yielding the index of the first row of each
+        chunk, and the computed arrays, as returned by :func:`compute`,
+        such that the memory used only depends on the size of the chunks.
+        """
+        bounds = numpy.concatenate([[0], numpy.cumsum(args[0].chunks[0])]).astype('intp')
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            yield start, self.compute(*[arg[start:stop] for arg in args])
+
+    def persist(self, columns=None, spill_dir=None):
+        """
+        Evaluate the selected columns once, and replace them in the
+        CatalogSource by the resulting arrays.
+
+        Later accesses of these columns, e.g., by several algorithms, read
+        the arrays instead of re-evaluating the dask graphs of the columns.
+        The columns are evaluated at once and written chunk by chunk to the
+        arrays; the memory used is logged.
+
+        .. note::
+            If the :attr:`base` attribute is set, the columns will be
+            persisted in :attr:`base` instead of in ``self``.
+
+        Parameters
+        ----------
+        columns : list of str, optional
+            the names of the columns to persist; default is all columns,
+            except the default columns
+        spill_dir : str, optional
+            if given, the arrays are memory-mapped files in this local
+            directory, such that columns larger than the memory can be
+            persisted. The files are removed once they are mapped.
+
+        Returns
+        -------
+        nbytes : int
+            the number of bytes of the persisted columns on this rank
+        """
+        import tempfile
+        import os
+
+        if self.base is not None:
+            return self.base.persist(columns=columns, spill_dir=spill_dir)
+
+        if columns is None:
+            columns = [col for col in self.columns if not self[col].is_default]
+        elif isinstance(columns, string_types):
+            columns = [columns]
+
+        bad = set(columns) - set(self.columns)
+        if len(bad):
+            raise ValueError("invalid column names to persist: %s" %str(bad))
+
+        if spill_dir is not None and not os.path.exists(spill_dir):
+            try:
+                os.makedirs(spill_dir)
+            except OSError:
+                pass
+
+        # allocate the arrays
+        sources, targets = [], []
+        for col in columns:
+            c = self[col]
+            if spill_dir is not None:
+                fd, path = tempfile.mkstemp(dir=spill_dir, suffix='-%s.npy' % col)
+                os.close(fd)
+                target = numpy.lib.format.open_memmap(path, mode='w+', dtype=c.dtype, shape=c.shape)
+                os.remove(path)
+            else:
+                target = numpy.empty(c.shape, dtype=c.dtype)
+            sources.append(c.as_daskarray())
+            targets.append(target)
+
+        # evaluate all columns at once, with the same options as compute()
+        with GlobalCache.get():
+            da.store(sources, targets, lock=False, optimize_graph=False)
+
+        for col, target in zip(columns, targets):
+            self[col] = target
+
+        nbytes = sum(target.nbytes for target in targets)
+        total = self.comm.allreduce(nbytes)
+        largest = self.comm.allreduce(nbytes, op=MPI.MAX)
+        if self.comm.rank == 0:
+            where = 'in memory' if spill_dir is None else 'in %s' % spill_dir
+            args = (len(columns), total / 1024.**2, largest / 1024.**2, where)
+            self.logger.info("persisted %d columns: %.1f MB in total, at most %.1f MB per rank, %s" % args)
+
+        return nbytes
+
     def save(self, output, columns, datasets=None, header='Header'):
         """
         Save the CatalogSource to a :class:`bigfile.BigFile`.
@@ -563,6 +751,10 @@ class CatalogSourceBase(object):
         Only the selected columns are saved and :attr:`attrs` are saved in
         ``header``. The attrs of columns are stored in the datasets.
 
+        The columns are evaluated at once and written chunk by chunk, such
+        that the dependencies shared by several columns (e.g., a column
+        read from disk) are evaluated once.
+
         Parameters
         ----------
         output : str
@@ -577,47 +769,49 @@ class CatalogSourceBase(object):
             :attr:`attrs` is stored
         """
         import bigfile
-        import json
-        from nbodykit.utils import JSONEncoder
-
-        # trim out any default columns; these do not need to be saved as
-        # they are automatically available to every Catalog
-        columns = [col for col in columns if not self[col].is_default]
 
-        # also make sure no default columns in datasets
         if datasets is None:
             datasets = columns
-        else:
-            datasets = [col for col in datasets if not self[col].is_default]
 
         if len(datasets) != len(columns):
             raise ValueError("`datasets` must have the same length as `columns`")
 
+        # trim out any default columns; these do not need to be saved as
+        # they are automatically available to every Catalog
+        datasets = [d for col, d in zip(columns, datasets) if not self[col].is_default]
+        columns = [col for col in columns if not self[col].is_default]
+
+        # 32 million items per physical file, as in bigfile
+        csize = self.comm.allreduce(self.size)
+        Nfile = (csize + 32 * 1024 * 1024 - 1) // (32 * 1024 * 1024)
+        offset = sum(self.comm.allgather(self.size)[:self.comm.rank])
+
         with bigfile.BigFileMPI(comm=self.comm, filename=output, create=True) as ff:
+            _write_header(ff, header, self.attrs)
+
+            blocks, sources, targets = [], [], []
             try:
-                bb = ff.open(header)
-            except:
-                bb = ff.create(header)
-            with bb :
-                for key in self.attrs:
-                    try:
-                        bb.attrs[key] = self.attrs[key]
-                    except ValueError:
-                        try:
-                            json_str = 'json://'+json.dumps(self.attrs[key], cls=JSONEncoder)
-                            bb.attrs[key] = json_str
-                        except:
-                            raise ValueError("cannot save '%s' key in attrs dictionary" % key)
-
-            for column, dataset in zip(columns, datasets):
-                c = self[column]
-
-                # save column attrs too
-                with ff.create_from_array(dataset, c) as bb:
+                for column, dataset in zip(columns, datasets):
+                    c = self[column]
+                    bb = ff.create(dataset, numpy.dtype((c.dtype, c.shape[1:])), csize, Nfile)
+                    blocks.append(bb)
+
+                    # save column attrs too
                     if hasattr(c, 'attrs'):
                         for key in c.attrs:
                             bb.attrs[key] = c.attrs[key]
 
+                    # rows are written whole
+                    sources.append(c.as_daskarray().rechunk({i: -1 for i in range(1, c.ndim)}))
+                    targets.append(_BlockWriter(bb, offset))
+
+                # evaluate all columns at once, with the same options as compute()
+                with GlobalCache.get():
+                    da.store(sources, targets, lock=True, optimize_graph=False)
+            finally:
+                for bb in blocks:
+                    bb.close()
+
     def read(self, columns):
         """
         Return the requested columns as dask arrays.
@@ -1009,6 +1203,71 @@ class CatalogSource(CatalogSourceBase):
             toret.attrs.update(self.attrs)
             return toret
 
+    def save_spatial(self, output, columns, BoxSize=None, curve='hilbert',
+                        nbits=16, level=6, position='Position', header='Header'):
+        """
+        Save the CatalogSource to a :class:`bigfile.BigFile`, with the rows
+        sorted along a space-filling curve of the position, and
+        an index of the rows in each cell of a regular grid.
+
+        The file can be read with
+        :class:`~nbodykit.source.catalog.spatial.SpatialBigFileCatalog`,
+        which reads only the rows in a given box or domain decomposition.
+        The index is stored as ``SpatialIndex.npz`` in the ``output``
+        directory.
+
+        Parameters
+        ----------
+        output : str
+            the name of the file to write to
+        columns : list of str
+            the names of the columns to save in the file
+        BoxSize : float, array_like, optional
+            the size of the box; positions are wrapped periodically into
+            the box; default is to use the ``BoxSize`` attribute
+        curve : 'hilbert', 'morton'
+            the space-filling curve to sort the rows by; the Peano-Hilbert
+            curve gives fewer row ranges per region
+        nbits : int, optional
+            the number of bits per dimension of the sort key; at most 21
+        level : int, optional
+            the index stores the rows of ``2**level`` cells per side
+        position : str, optional
+            the name of the position column
+        header : str, optional
+            the name of the data set holding the header information, where
+            :attr:`attrs` is stored
+        """
+        from nbodykit.source.catalog.spatial import spatial_key, SpatialIndex, index_path
+
+        if BoxSize is None:
+            if 'BoxSize' not in self.attrs:
+                raise ValueError("'BoxSize' must be given or stored in attrs to save a spatially sorted catalog")
+            BoxSize = self.attrs['BoxSize']
+        if not 0 <= level <= nbits:
+            raise ValueError("'level' should be between 0 and 'nbits'")
+
+        if isinstance(columns, string_types):
+            columns = [columns]
+        columns = [col for col in columns if not self[col].is_default]
+
+        # sort by the curve key of the position
+        key = self[position].map_blocks(spatial_key, BoxSize, nbits, curve,
+                                        dtype='i8', drop_axis=1)
+        data = dict((col, self[col]) for col in columns)
+        data['SpatialKey'] = key
+        cat = CatalogSource._from_columns(self.size, self.comm, **data)
+        cat = cat.sort('SpatialKey')
+        cat.attrs.update(self.attrs)
+
+        cat.save(output, columns, header=header)
+
+        # the row ranges of the cells
+        index = SpatialIndex.build(cat['SpatialKey'].compute(), BoxSize, curve, nbits, level, comm=self.comm)
+        if self.comm.rank == 0:
+            index.save(index_path(output))
+        self.comm.barrier()
+
     @column(is_default=True)
     def Selection(self):
         """
@@ -1062,10 +1321,54 @@ class CatalogSource(CatalogSourceBase):
         return ConstantArray(1.0, self.size, chunks=_global_options['dask_chunk_size'])
 
 
+class _BlockWriter(object):
+    """
+    Internal class to write the slices of a local array, starting at
+    the global row ``offset`` of the :mod:`bigfile` block ``block``,
+    e.g., as the target of :func:`dask.array.store`.
+    """
+    def __init__(self, block, offset):
+        self.block = block
+        self.offset = offset
+
+    def __setitem__(self, index, value):
+        if isinstance(index, tuple):
+            index = index[0]
+        self.block.write(self.offset + (index.start or 0), numpy.asarray(value))
+
+def _write_header(ff, header, attrs):
+    """
+    Write the dictionary ``attrs`` to the attributes of the block ``header``
+    of the open :class:`bigfile.BigFileMPI` ``ff``, encoding the values
+    that are not supported by :mod:`bigfile` as JSON.
+    """
+    import json
+    from nbodykit.utils import JSONEncoder
+
+    try:
+        bb = ff.open(header)
+    except:
+        bb = ff.create(header)
+    with bb :
+        for key in attrs:
+            try:
+                bb.attrs[key] = attrs[key]
+            except ValueError:
+                try:
+                    json_str = 'json://'+json.dumps(attrs[key], cls=JSONEncoder)
+                    bb.attrs[key] = json_str
+                except:
+                    raise ValueError("cannot save '%s' key in attrs dictionary" % key)
+
 def _sort_data(comm, cat, rankby, reverse=False, usecols=None):
     """
     Sort the input data by the specified columns
 
+    All of the needed columns are computed at once, and the sort columns
+    are combined into a single order-preserving integer key. Only the key
+    and the global row index are moved in the parallel sort; the data
+    columns are then exchanged once, to their sorted position.
+
     Parameters
     ----------
     comm :
@@ -1088,40 +1391,154 @@ def _sort_data(comm, cat, rankby, reverse=False, usecols=None):
     # remove duplicates from usecols
     usecols = list(set(usecols))
 
-    # the columns we need in the sort steps
-    columns = list(set(rankby)|set(usecols))
-
-    # make the data to sort
-    dtype = [('_sortkey', 'i8')]
-    for col in cat:
-        if col in columns:
-            dt = (cat[col].dtype.char,)
-            dt += cat[col].shape[1:]
-            if len(dt) == 1: dt = dt[0]
-            dtype.append((col, dt))
-    dtype = numpy.dtype(dtype)
-
-    data = numpy.empty(cat.size, dtype=dtype)
-    for col in columns:
-        data[col] = cat[col]
-
-    # sort the particles by the specified columns and store the
-    # corrected sorted index
-    for col in reversed(rankby):
-        dt = data.dtype[col]
-        rankby_name = col
-
-        # make an integer key for floating columns
-        if issubclass(dt.type, numpy.floating):
-            data['_sortkey'] = numpy.fromstring(data[col].tobytes(), dtype='i8')
-            if reverse:
-                data['_sortkey'] *= -1
-            rankby_name = '_sortkey'
-        elif not issubclass(dt.type, numpy.integer):
+    # check the dtype of the sort columns
+    for col in rankby:
+        dt = cat[col].dtype
+        if not issubclass(dt.type, (numpy.floating, numpy.integer)):
             args = (col, str(dt))
             raise ValueError("cannot sort by column '%s' with dtype '%s'; must be integer or floating type" %args)
+        if cat[col].ndim != 1:
+            raise ValueError("cannot sort by column '%s' with shape %s; must be one-dimensional" %(col, str(cat[col].shape)))
+
+    # compute all of the columns at once
+    columns = list(set(rankby)|set(usecols))
+    values = dict(zip(columns, cat.compute(*[cat[col] for col in columns])))
+
+    # the payload to sort
+    dtype = []
+    for col in usecols:
+        dt = (values[col].dtype.char,)
+        dt += values[col].shape[1:]
+        if len(dt) == 1: dt = dt[0]
+        dtype.append((col, dt))
+    data = numpy.empty(cat.size, dtype=numpy.dtype(dtype))
+    for col in usecols:
+        data[col] = values[col]
+
+    # the global index of the local rows
+    start = sum(comm.allgather(cat.size)[:comm.rank])
+
+    # sort the keys and the row index
+    index = numpy.empty(cat.size, dtype=[('key', 'u8'), ('index', 'u8')])
+    index['key'] = _sort_key(comm, [values[col] for col in rankby], reverse=reverse)
+    index['index'] = numpy.arange(start, start + cat.size, dtype='u8')
+    del values
+    mpsort.sort(index, orderby='key', comm=comm)
+
+    # fetch the sorted rows
+    return _take(comm, data, index['index'])
+
+def _ordered_key(value, reverse=False):
+    """
+    Return the unsigned 64-bit integers with the same order as ``value``,
+    which is an integer or floating array. If ``reverse`` is ``True``,
+    the order is reversed.
+    """
+    if issubclass(value.dtype.type, numpy.floating):
+        # flip all bits of negative floats, and the sign bit of positive;
+        # adding zero maps -0. to 0.
+        key = (value.astype('f8') + 0.).view('u8')
+        neg = key >> numpy.uint64(63) == 1
+        key[neg] = ~key[neg]
+        key[~neg] |= numpy.uint64(1) << numpy.uint64(63)
+    elif issubclass(value.dtype.type, numpy.signedinteger):
+        key = value.astype('i8').view('u8') ^ (numpy.uint64(1) << numpy.uint64(63))
+    else:
+        key = value.astype('u8')
+
+    if reverse:
+        key = ~key
+    return key
+
+def _sort_key(comm, values, reverse=False):
+    """
+    Return a single unsigned 64-bit key that sorts the rows in
+    lexicographic order of the list of arrays ``values``.
+
+    If the ranges of the keys of the individual arrays can be packed into
+    64 bits, the keys are packed directly. Otherwise, the key is the global
+    dense rank of the rows, sorting on all of the keys at once.
+    """
+    keys = [_ordered_key(value, reverse=reverse) for value in values]
+    if len(keys) == 1:
+        return keys[0]
+
+    # the ranges of the individual keys
+    def bounds(key):
+        if len(key):
+            lo, hi = int(key.min()), int(key.max())
+        else:
+            lo, hi = 2**64-1, 0
+        return comm.allreduce(lo, op=MPI.MIN), comm.allreduce(hi, op=MPI.MAX)
+
+    ranges = [bounds(key) for key in keys]
+    nbits = [max(hi - lo, 0).bit_length() for lo, hi in ranges]
 
-        # do the parallel sort
-        mpsort.sort(data, orderby=rankby_name, comm=comm)
+    if sum(nbits) <= 64:
+        composite = numpy.zeros(len(keys[0]), dtype='u8')
+        for key, (lo, hi), b in zip(keys, ranges, nbits):
+            composite <<= numpy.uint64(b)
+            composite |= key - numpy.uint64(lo)
+        return composite
 
-    return data[usecols]
+    # the ranks are below the total size; the last key is the least
+    # significant word of the multi-word sort key
+    return _dense_rank(comm, numpy.stack(keys[::-1], axis=-1))
+
+def _dense_rank(comm, key):
+    """
+    Return the rank of each element of the distributed unsigned 64-bit
+    array ``key`` among the distinct values of ``key``.
+
+    If ``key`` is 2-dimensional, each row is a multi-word key, where the
+    last words are the most significant, as in :func:`mpsort.sort`.
+    """
+    import mpsort
+
+    key = key.reshape(len(key), -1)
+    start = sum(comm.allgather(len(key))[:comm.rank])
+
+    data = numpy.empty(len(key), dtype=[('key', 'u8', (key.shape[1],)), ('index', 'u8')])
+    data['key'] = key
+    data['index'] = numpy.arange(start, start + len(key), dtype='u8')
+    mpsort.sort(data, orderby='key', comm=comm)
+
+    # the last key on the previous non-empty rank
+    last = comm.allgather(data['key'][-1] if len(data) else None)
+    prev = [k for k in last[:comm.rank] if k is not None]
+
+    new = numpy.ones(len(data), dtype='u8')
+    new[1:] = (data['key'][1:] != data['key'][:-1]).any(axis=-1)
+    if len(prev) and len(data):
+        new[0] = (data['key'][0] != prev[-1]).any()
+    offset = sum(comm.allgather(int(new.sum()))[:comm.rank])
+    rank = numpy.cumsum(new) + numpy.uint64(offset) - numpy.uint64(1)
+
+    # back to the original order
+    out = numpy.empty(len(data), dtype=[('index', 'u8'), ('rank', 'u8')])
+    out['index'] = data['index']
+    out['rank'] = rank
+    mpsort.sort(out, orderby='index', comm=comm)
+    return out['rank']
+
+def _take(comm, data, index):
+    """
+    Return the rows of the distributed array ``data`` at the global
+    row indices ``index``.
+    """
+    from nbodykit.utils import ExchangeArray
+
+    sizes = numpy.array(comm.allgather(len(data)), dtype='u8')
+    offsets = numpy.concatenate([[0], numpy.cumsum(sizes)]).astype('u8')
+    owner = numpy.searchsorted(offsets, index, side='right') - 1
+
+    # send the requested local indices to the owners
+    request = ExchangeArray(index - offsets[owner], owner, comm)
+    counts = numpy.bincount(owner, minlength=comm.size)
+    senders = numpy.repeat(numpy.arange(comm.size), comm.alltoall(list(counts)))
+
+    # and receive the rows, in order of the owners
+    rows = ExchangeArray(data[request.astype('intp')], senders, comm)
+    out = numpy.empty_like(rows)
+    out[numpy.argsort(owner, kind='stable')] = rows
+    return out
@@ -3,6 +3,7 @@ from nbodykit.base.catalog import CatalogSource, CatalogSourceBase
 from nbodykit import _global_options
 import numpy
 import logging
+from six import string_types
 import warnings
 
 # for converting from particle to mesh
@@ -359,14 +360,14 @@ class CatalogMesh(CatalogSource, MeshSource):
                 sel = self.base.compute(Selection[s])
 
                 # be sure to use the source to compute
-                position, weight, value = \
-                    self.base.compute(Position[s], Weight[s], Value[s])
-
-                # FIXME: investigate if move selection before compute
-                # speeds up IO.
-                position = position[sel]
-                weight = weight[sel]
-                value = value[sel]
+                if sel.all():
+                    position, weight, value = \
+                        self.base.compute(Position[s], Weight[s], Value[s])
+                else:
+                    # only read the selected rows
+                    rows = numpy.flatnonzero(sel) + i
+                    position, weight, value = \
+                        self.base.compute(*[self.base.get_column_rows(col, rows) for col in columns[:3]])
             else:
                 # workaround a potential dask issue on empty dask arrays
                 position = numpy.empty((0, 3), dtype=Position.dtype)
@@ -479,6 +480,79 @@ class CatalogMesh(CatalogSource, MeshSource):
 
         return toret
 
+    def paint(self, mode="real", Nmesh=None):
+        """
+        Paint the catalog to the mesh and apply any transformation functions
+        specified in :attr:`actions`; see
+        :func:`~nbodykit.base.mesh.MeshSource.paint`.
+
+        If the field cache is enabled via the ``field_cache_size`` global
+        option (see :class:`~nbodykit.set_options`), the painted field is
+        stored, and repeated calls with the same parameters return a copy
+        of the stored field. The stored fields of a catalog are invalidated
+        when its columns are modified.
+
+        Parameters
+        ----------
+        mode : 'real' or 'complex'
+            the type of the returned Field object, either a RealField or
+            ComplexField
+        Nmesh : int or array_like, or None
+            If given and different from the intrinsic Nmesh of the source,
+            resample the mesh to the given resolution
+        """
+        from nbodykit.base.fieldcache import _field_cache
+
+        if not _field_cache.enabled:
+            return MeshSource.paint(self, mode=mode, Nmesh=Nmesh)
+
+        root, key, refs = self._get_cache_key(mode, Nmesh)
+        field = _field_cache.get(key, self.comm)
+        if field is not None:
+            if self.comm.rank == 0:
+                self.logger.info("using cached %s field for %s" % (mode, str(self)))
+            return field
+
+        field = MeshSource.paint(self, mode=mode, Nmesh=Nmesh)
+        _field_cache.put(key, root._uid, field, refs=refs)
+
+        # return a copy, such that the stored field is not modified
+        copy = _field_cache.get(key, self.comm)
+        return field if copy is None else copy
+
+    def _get_cache_key(self, mode, Nmesh):
+        """
+        Internal function to return the memory owner of the data, the
+        digest of all of the parameters determining the painted field, and
+        the objects whose identity enters the digest.
+        """
+        from nbodykit.base.fieldcache import FieldCache
+
+        # the catalog holding the data
+        root = self.base
+        while root.base is not None:
+            root = root.base
+
+        # the painting parameters, from the simple attributes and meta-data
+        def simple(value):
+            if isinstance(value, (string_types, bool, int, float, numpy.number, numpy.bool_)):
+                return True
+            return isinstance(value, numpy.ndarray) and value.size <= 16 and value.dtype.kind in 'biuf'
+
+        params = []
+        for d in [self.__dict__, self.attrs]:
+            params.append(sorted((k, repr(numpy.asarray(v).tolist())) for k, v in d.items()
+                                 if not k.startswith('_') and simple(v)))
+
+        # the functions in the actions are identified by their id
+        actions = MeshSource.actions.fget(self)
+        refs = tuple(action[1] for action in actions if len(action) > 1)
+
+        key = (root._uid, root._version, type(self).__name__, self.comm.size,
+               mode, str(self.pm.resize(Nmesh).Nmesh), params,
+               [(action[0], id(action[1]), action[2]) if len(action) > 1 else action for action in actions])
+        return root, FieldCache.digest(key), refs
+
     @property
     def actions(self):
         """
@@ -0,0 +1,148 @@
+from nbodykit import _global_options
+from collections import OrderedDict
+from mpi4py import MPI
+import numpy
+import hashlib
+import os
+
+class FieldCache(object):
+    """
+    A per-process cache of painted :mod:`pmesh` fields, with
+    least-recently-used eviction.
+
+    Fields are keyed by a digest of the identity and version of the
+    catalog they are painted from, and of all of the parameters of the
+    painting (see :func:`~nbodykit.base.catalogmesh.CatalogMesh.paint`).
+    Entries of a catalog are invalidated when its columns are modified.
+
+    The cache is disabled by default. The size of the cache in bytes is set
+    by the ``field_cache_size`` global option; if the ``field_cache_dir``
+    global option is set, fields are stored in that directory instead
+    of in memory. See :class:`~nbodykit.set_options`.
+    """
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.nbytes = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    @property
+    def enabled(self):
+        """
+        Whether the cache is enabled, i.e., ``field_cache_size`` is positive.
+        """
+        return _global_options['field_cache_size'] > 0
+
+    @staticmethod
+    def digest(key):
+        """
+        Return the hexadecimal digest of the tuple ``key``.
+        """
+        return hashlib.sha1(repr(key).encode()).hexdigest()
+
+    def get(self, key, comm):
+        """
+        Return a copy of the field stored for ``key``, or ``None`` if it
+        is not stored on all ranks of ``comm``.
+
+        This is a collective operation.
+        """
+        hit = key in self.entries
+        if not comm.allreduce(hit, op=MPI.LAND):
+            return None
+
+        entry = self.entries.pop(key)
+        self.entries[key] = entry
+
+        field = entry['pm'].create(mode=entry['mode'])
+        if entry['path'] is not None:
+            field.value[...] = numpy.load(entry['path'])
+        else:
+            field.value[...] = entry['field'].value
+        field.attrs = entry['attrs'].copy()
+        return field
+
+    def put(self, key, uid, field, refs=()):
+        """
+        Store ``field`` for ``key``, painted from the catalog with
+        identifier ``uid``.
+
+        Parameters
+        ----------
+        key : str
+            the digest of the parameters of the field
+        uid : str
+            the identifier of the catalog, used by :func:`invalidate`
+        field : :class:`pmesh.pm.RealField`, :class:`pmesh.pm.ComplexField`
+            the field to store; it should not be modified later
+        refs : tuple, optional
+            objects whose identity is part of ``key`` (e.g., the functions
+            in the actions), which are kept alive by the entry
+        """
+        self.discard(key)
+
+        nbytes = field.value.nbytes
+        if nbytes > _global_options['field_cache_size']:
+            return
+
+        entry = {'uid' : uid, 'pm' : field.pm, 'attrs' : dict(getattr(field, 'attrs', {})),
+                 'mode' : 'complex' if numpy.iscomplexobj(field.value) else 'real',
+                 'nbytes' : nbytes, 'refs' : refs, 'path' : None, 'field' : None}
+
+        cachedir = _global_options['field_cache_dir']
+        if cachedir is not None:
+            if not os.path.exists(cachedir):
+                try:
+                    os.makedirs(cachedir)
+                except OSError:
+                    pass
+            comm = field.pm.comm
+            path = os.path.join(cachedir, '%s-%d-%d.npy' % (key, comm.rank, comm.size))
+            numpy.save(path, field.value)
+            entry['path'] = path
+        else:
+            entry['field'] = field
+
+        self.entries[key] = entry
+        self.nbytes += nbytes
+        self.shrink()
+
+    def discard(self, key):
+        """
+        Remove the entry of ``key``, if any.
+        """
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        self.nbytes -= entry['nbytes']
+        if entry['path'] is not None and os.path.exists(entry['path']):
+            os.remove(entry['path'])
+
+    def invalidate(self, uid):
+        """
+        Remove all of the entries painted from the catalog ``uid``.
+        """
+        for key in [key for key in self.entries if self.entries[key]['uid'] == uid]:
+            self.discard(key)
+
+    def shrink(self, size=None):
+        """
+        Remove the least-recently-used entries until at most ``size``
+        bytes are stored; default is the ``field_cache_size`` global option.
+        """
+        if size is None:
+            size = _global_options['field_cache_size']
+        while self.nbytes > size and len(self.entries):
+            self.discard(next(iter(self.entries)))
+
+    def clear(self):
+        """
+        Remove all entries.
+        """
+        self.shrink(0)
+
+_field_cache = FieldCache()
@@ -255,35 +255,31 @@ class MeshSource(object):
         if not mode in ['real', 'complex']:
             raise ValueError('mode must be "real" or "complex"')
 
-        # add a dummy action to ensure the right mode of return value
-        actions = self.actions + [(mode, )]
+        # group consecutive actions in the same space into single passes
+        plan = _make_plan(self.actions, mode)
+        if self.comm.rank == 0:
+            self.logger.debug("paint plan for %s: %s" % (str(self), _format_plan(plan, mode)))
 
         # if we expect complex, be smart and use complex directly.
-        var = self.to_field(mode=actions[0][0])
+        var = self.to_field(mode=plan[0][0] if len(plan) else mode)
 
         if not hasattr(var, 'attrs'):
             attrs = {}
         else:
             attrs = var.attrs
 
-        for action in actions:
+        for m, funcs in plan + [(mode, [])]:
             # ensure var is the right mode
-
-            if action[0] == 'complex':
+            if m == 'complex':
                 if not isinstance(var, ComplexField):
                     var = var.r2c(out=Ellipsis)
-            if action[0] == 'real':
+            if m == 'real':
                 if not isinstance(var, RealField):
                     var = var.c2r(out=Ellipsis)
 
-            if len(action) > 1:
-                # there is a filter function
-                kwargs = {}
-                kwargs['func'] = action[1]
-                if action[2] is not None:
-                    kwargs['kind'] = action[2]
-                kwargs['out'] = Ellipsis
-                var.apply(**kwargs)
+            # apply all filter functions in a single pass
+            if len(funcs):
+                _apply_fused(var, funcs)
 
         pm = self.pm.resize(Nmesh)
 
@@ -332,49 +328,207 @@ class MeshSource(object):
 
         return field.preview(Nmesh, axes=axes)
 
-    def save(self, output, dataset='Field', mode='real'):
+    def save(self, output, dataset='Field', mode='real', precision=None, pyramid=None):
         """
         Save the mesh as a :class:`~nbodykit.source.mesh.bigfile.BigFileMesh`
         on disk, either in real or complex space.
 
+        The field is written in slabs of at most ``mesh_chunk_size``
+        cells per rank (see :class:`~nbodykit.set_options`), such that no
+        full-size copy of the field is made.
+
         Parameters
         ----------
         output : str
             name of the bigfile file
-        dataset : str, optional
-            name of the bigfile data set where the field is stored
-        mode : str, optional
-            real or complex; the form of the field to store
+        dataset : str, list of str, optional
+            name of the bigfile data set where the field is stored; if
+            several modes are saved, either a list with the data set of each
+            mode, or the prefix of the data sets, which are named
+            ``dataset/mode``
+        mode : str, list of str, optional
+            real or complex; the form of the field to store; both forms
+            are stored if ``['real', 'complex']`` is given, painting
+            the field only once
+        precision : 'f4', 'f8', optional
+            if given, the precision of the floating point numbers stored on
+            disk, e.g., ``'f4'`` to store a ``'f8'`` mesh in single precision;
+            the precision is stored in the ``precision`` attribute of the
+            data set
+        pyramid : list of int, optional
+            if given, also store the field resampled to each of these
+            (smaller) ``Nmesh``, in the data sets ``dataset-Nmesh``; a
+            :class:`~nbodykit.source.mesh.bigfile.BigFileMesh` initialized
+            with one of these ``Nmesh`` reads the stored lower resolution
         """
         import bigfile
-        import warnings
-        import json
-        from nbodykit.utils import JSONEncoder
+        from six import string_types
+
+        modes = [mode] if isinstance(mode, string_types) else list(mode)
+        for m in modes:
+            if m not in ['real', 'complex']:
+                raise ValueError('mode must be "real" or "complex"')
+        if len(set(modes)) != len(modes):
+            raise ValueError("duplicated modes to save")
+
+        if isinstance(dataset, string_types):
+            datasets = [dataset] if len(modes) == 1 else ['%s/%s' %(dataset, m) for m in modes]
+        else:
+            datasets = list(dataset)
+        if len(datasets) != len(modes):
+            raise ValueError("`dataset` must have the same length as `mode`")
+
+        if precision not in [None, 'f4', 'f8']:
+            raise ValueError("precision should be None, 'f4', or 'f8'")
 
-        field = self.paint(mode=mode)
+        levels = sorted(set(int(n) for n in pyramid)) if pyramid is not None else []
+        if any(n >= self.pm.Nmesh.min() for n in levels):
+            raise ValueError("the Nmesh of the pyramid levels should be smaller than the Nmesh of the mesh")
+
+        field = self.paint(mode=modes[0])
+        attrs = field.attrs
 
         with bigfile.BigFileMPI(self.pm.comm, output, create=True) as ff:
-            data = numpy.empty(shape=field.size, dtype=field.dtype)
-            field.ravel(out=data)
-            with ff.create_from_array(dataset, data) as bb:
-                if isinstance(field, RealField):
-                    bb.attrs['ndarray.shape'] = field.pm.Nmesh
-                    bb.attrs['BoxSize'] = field.pm.BoxSize
-                    bb.attrs['Nmesh'] = field.pm.Nmesh
-                elif isinstance(field, ComplexField):
-                    bb.attrs['ndarray.shape'] = field.Nmesh, field.Nmesh, field.Nmesh // 2 + 1
-                    bb.attrs['BoxSize'] = field.pm.BoxSize
-                    bb.attrs['Nmesh'] = field.pm.Nmesh
-
-                for key in field.attrs:
-                    # do not override the above values -- they are vectors (from pm)
-                    if key in bb.attrs: continue
-                    value = field.attrs[key]
-                    try:
-                        bb.attrs[key] = value
-                    except ValueError:
-                        try:
-                            json_str = 'json://'+json.dumps(value, cls=JSONEncoder)
-                            bb.attrs[key] = json_str
-                        except:
-                            warnings.warn("attribute %s of type %s is unsupported and lost while saving MeshSource" % (key, type(value)))
+            for m, ds in zip(modes, datasets):
+
+                # convert in place between the modes
+                if m == 'real' and not isinstance(field, RealField):
+                    field = field.c2r(out=Ellipsis)
+                elif m == 'complex' and not isinstance(field, ComplexField):
+                    field = field.r2c(out=Ellipsis)
+
+                dtype = field.dtype
+                if precision is not None:
+                    dtype = numpy.dtype(precision) if m == 'real' else numpy.result_type(precision, 'c8')
+
+                extra = {'pyramid' : numpy.array(levels)} if len(levels) else {}
+                _write_field(ff, ds, field, dtype, attrs, extra)
+
+                # the lower resolutions
+                for n in levels:
+                    low = self.pm.resize(n).create(mode=m)
+                    field.resample(out=low)
+                    _write_field(ff, '%s-%d' % (ds, n), low, dtype, attrs, {})
+
+                    if self.comm.rank == 0:
+                        self.logger.info("saved %s field resampled to Nmesh=%d" % (m, n))
+
+def _make_plan(actions, mode):
+    """
+    Internal function to group the ``(mode, func, kind)`` actions into a
+    list of ``(mode, [(func, kind), ...])``, merging consecutive actions in
+    the same space.
+
+    Actions without a function only request a mode; they are dropped, since
+    the mode of the field is only changed before applying a function, and
+    at the end, to return the field in ``mode``.
+    """
+    plan = []
+    for action in actions:
+        if len(action) == 1:
+            continue
+        if len(plan) and plan[-1][0] == action[0]:
+            plan[-1][1].append(action[1:])
+        else:
+            plan.append((action[0], [action[1:]]))
+    return plan
+
+def _format_plan(plan, mode):
+    """
+    Internal function to return a string describing the painting plan.
+    """
+    steps = ['to_field(%s)' % (plan[0][0] if len(plan) else mode)]
+    current = plan[0][0] if len(plan) else mode
+    for m, funcs in plan + [(mode, [])]:
+        if m != current:
+            steps.append('r2c' if m == 'complex' else 'c2r')
+            current = m
+        if len(funcs):
+            names = [getattr(func, '__name__', type(func).__name__) for func, kind in funcs]
+            steps.append('apply(%s; %s)' % (m, ', '.join(names)))
+    return ' -> '.join(steps)
+
+def _apply_fused(var, funcs):
+    """
+    Internal function to apply the list of ``(func, kind)`` filters to the
+    field ``var`` in place, evaluating all of the filters on each slab
+    of the field in a single pass.
+
+    The coordinates passed to each function match those of
+    :func:`pmesh.pm.Field.apply` for the given ``kind``, and an invalid
+    ``kind`` for the type of field raises a ValueError, before any filter
+    is applied.
+    """
+    if isinstance(var, ComplexField):
+        kinds = ['wavenumber', 'circular', 'index']
+        cellsize = var.pm.BoxSize / var.pm.Nmesh
+    else:
+        kinds = ['relative', 'index']
+
+    # the first kind is the default
+    funcs = [(func, kinds[0] if kind is None else kind) for func, kind in funcs]
+    for func, kind in funcs:
+        if kind not in kinds:
+            args = (kind, type(var).__name__, ", ".join(kinds))
+            raise ValueError("invalid kind '%s' of action on a %s; should be one of %s" % args)
+
+    for x, i, slab in zip(var.slabs.x, var.slabs.i, var.slabs):
+        for func, kind in funcs:
+            if kind == 'index':
+                coords = i
+            elif kind == 'circular':
+                coords = [xx * cellsize[d] for d, xx in enumerate(x)]
+            else:
+                coords = x
+            slab[...] = func(coords, slab)
+
+def _write_field(ff, dataset, field, dtype, attrs, extra):
+    """
+    Internal function to write ``field`` and its meta-data to the data set
+    ``dataset`` of the open :mod:`bigfile` file ``ff``.
+    """
+    import warnings
+    import json
+    from nbodykit.utils import JSONEncoder
+    from nbodykit.source.mesh.bigfile import write_field
+
+    # sane value -- 32 million items per physical file
+    Nfile = max(1, (field.csize + 32 * 1024 * 1024 - 1) // (32 * 1024 * 1024))
+
+    with ff.create(dataset, dtype=dtype, size=field.csize, Nfile=Nfile) as bb:
+        write_field(bb, field, dtype=dtype)
+
+        if isinstance(field, RealField):
+            bb.attrs['ndarray.shape'] = field.pm.Nmesh
+            bb.attrs['BoxSize'] = field.pm.BoxSize
+            bb.attrs['Nmesh'] = field.pm.Nmesh
+        elif isinstance(field, ComplexField):
+            bb.attrs['ndarray.shape'] = field.Nmesh, field.Nmesh, field.Nmesh // 2 + 1
+            bb.attrs['BoxSize'] = field.pm.BoxSize
+            bb.attrs['Nmesh'] = field.pm.Nmesh
+        bb.attrs['precision'] = _real_precision(dtype)
+
+        for key in extra:
+            bb.attrs[key] = extra[key]
+
+        for key in attrs:
+            # do not override the above values -- they are vectors (from pm)
+            if key in bb.attrs or key == 'pyramid': continue
+            value = attrs[key]
+            try:
+                bb.attrs[key] = value
+            except ValueError:
+                try:
+                    json_str = 'json://'+json.dumps(value, cls=JSONEncoder)
+                    bb.attrs[key] = json_str
+                except:
+                    warnings.warn("attribute %s of type %s is unsupported and lost while saving MeshSource" % (key, type(value)))
+
+def _real_precision(dtype):
+    """
+    Internal function to return the precision of the real numbers of a
+    real or complex ``dtype``, as ``'f4'`` or ``'f8'``.
+    """
+    dtype = numpy.dtype(dtype)
+    itemsize = dtype.itemsize // 2 if dtype.kind == 'c' else dtype.itemsize
+    return 'f%d' % itemsize
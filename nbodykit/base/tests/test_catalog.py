@@ -339,3 +339,71 @@ def test_view(comm):
     # make sure attrs are dependent.
     source.attrs['foo'] = 123
     assert 'foo' in view.attrs
+
+@MPITest([1, 4])
+def test_sort_multiple_keys(comm):
+    CurrentMPIComm.set(comm)
+
+    source = UniformCatalog(nbar=1e-4, BoxSize=512., seed=42)
+    source['Group'] = source.rng.randint(-5, 5, size=source.size)
+    source['Mass'] = source.rng.normal(size=source.size)
+    source['ID'] = source.Index
+
+    for reverse in [False, True]:
+        sorted = source.sort(['Group', 'Mass'], reverse=reverse, usecols=['ID', 'Group', 'Mass'])
+        assert sorted.csize == source.csize
+
+        # lexicographic order
+        group = numpy.concatenate(comm.allgather(sorted['Group'].compute()))
+        mass = numpy.concatenate(comm.allgather(sorted['Mass'].compute()))
+        order = numpy.lexsort((mass, group))
+        if reverse: order = order[::-1]
+        assert_array_equal(group, group[order])
+        assert_array_equal(mass, mass[order])
+
+        # the rows are moved together
+        ID = numpy.concatenate(comm.allgather(sorted['ID'].compute()))
+        mass0 = numpy.concatenate(comm.allgather(source['Mass'].compute()))
+        assert_array_equal(mass0[ID], mass)
+
+    # only numeric, one-dimensional keys
+    with pytest.raises(ValueError):
+        sorted = source.sort('Position')
+
+@MPITest([1, 4])
+def test_persist(comm):
+    import tempfile
+    import shutil
+    CurrentMPIComm.set(comm)
+
+    if comm.rank == 0:
+        tmpdir = tempfile.mkdtemp()
+    else:
+        tmpdir = None
+    tmpdir = comm.bcast(tmpdir)
+
+    for spill_dir in [None, tmpdir]:
+        source = UniformCatalog(nbar=1e-4, BoxSize=512., seed=42)
+        source['Mass'] = source.rng.uniform(size=source.size)
+        source['Radius'] = source['Mass'] ** (1./3)
+        radius, pos = source.compute(source['Radius'], source['Position'])
+
+        nbytes = source.persist(['Radius', 'Position'], spill_dir=spill_dir)
+        assert nbytes == radius.nbytes + pos.nbytes
+
+        # same data, now backed by arrays
+        assert_array_equal(source['Radius'].compute(), radius)
+        assert_array_equal(source['Position'].compute(), pos)
+        assert 'Radius' in source._overrides
+
+        # the files are removed once mapped
+        if spill_dir is not None:
+            assert len(os.listdir(spill_dir)) == 0
+
+    # invalid column
+    with pytest.raises(ValueError):
+        source.persist(['BadColumn'])
+
+    comm.barrier()
+    if comm.rank == 0:
+        shutil.rmtree(tmpdir)
@@ -230,3 +230,57 @@ def test_view(comm):
     # adding columns to the view changes original source
     view['TEST2'] = 5.0
     assert 'TEST2' in source
+
+@MPITest([1, 4])
+def test_field_cache(comm):
+    from nbodykit.base.fieldcache import _field_cache
+    import tempfile
+    import shutil
+
+    CurrentMPIComm.set(comm)
+
+    if comm.rank == 0:
+        tmpdir = tempfile.mkdtemp()
+    else:
+        tmpdir = None
+    tmpdir = comm.bcast(tmpdir)
+
+    for cachedir in [None, tmpdir]:
+        with set_options(field_cache_size=1e9, field_cache_dir=cachedir):
+            _field_cache.clear()
+
+            source = UniformCatalog(nbar=0.2e-3, BoxSize=1024., seed=42)
+            source['Weight'] = 2.
+            mesh = source.to_mesh(Nmesh=32, compensated=True)
+
+            # the second paint is a hit, and a copy
+            real1 = mesh.paint(mode='real')
+            assert len(_field_cache) == 1
+            real1[...] = 0.
+            real2 = mesh.paint(mode='real')
+            assert len(_field_cache) == 1
+            assert_allclose(real2.cmean(), 1.0)
+            assert_allclose(real2.attrs['W'], source.csize * 2.)
+
+            # a new mesh with the same parameters also hits
+            real3 = source.to_mesh(Nmesh=32, compensated=True).paint(mode='real')
+            assert len(_field_cache) == 1
+            assert_array_equal(real3, real2)
+
+            # different parameters miss
+            mesh.compensated = False
+            real4 = mesh.paint(mode='real')
+            assert len(_field_cache) == 2
+
+            # modifying a column invalidates the fields of the catalog
+            source['Weight'] = 1.
+            assert len(_field_cache) == 0
+            real5 = mesh.paint(mode='real')
+            assert_allclose(real5.attrs['W'], source.csize * 1.)
+
+        # disabled again
+        assert len(_field_cache) == 0
+
+    comm.barrier()
+    if comm.rank == 0:
+        shutil.rmtree(tmpdir)
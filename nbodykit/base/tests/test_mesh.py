@@ -194,3 +194,35 @@ def test_view(comm):
     # check meta-data
     for k in source.attrs:
         assert k in view.attrs
+
+@MPITest([1,4])
+def test_fused_actions(comm):
+
+    cosmo = cosmology.Planck15
+    CurrentMPIComm.set(comm)
+
+    # linear mesh
+    Plin = cosmology.LinearPower(cosmo, redshift=0.55, transfer='EisensteinHu')
+    source = LinearMesh(Plin, Nmesh=32, BoxSize=512, seed=42)
+
+    def smoothing(k, v):
+        return v * numpy.exp(-0.5 * sum(ki**2 for ki in k) * 10.**2)
+    def kcut(w, v):
+        return v * (sum(wi**2 for wi in w) < 2.)
+    def shift(x, v):
+        return v + 1.
+    def index(i, v):
+        return v * (i[0] + 1.)
+
+    # apply the actions one at a time
+    field = source.paint(mode='complex')
+    field.apply(smoothing, kind='wavenumber', out=Ellipsis)
+    field.apply(kcut, kind='circular', out=Ellipsis)
+    field = field.c2r(out=Ellipsis)
+    field.apply(shift, kind='relative', out=Ellipsis)
+    field.apply(index, kind='index', out=Ellipsis)
+
+    # the fused pipeline
+    mesh = source.apply(smoothing).apply(kcut, kind='circular')
+    mesh = mesh.apply(shift, kind='relative', mode='real').apply(index, kind='index', mode='real')
+    assert_allclose(mesh.paint(mode='real'), field, rtol=1e-6)
@@ -1,5 +1,5 @@
 from .cosmology import Cosmology
-from .background import PerturbationGrowth
+from .background import PerturbationGrowth, BackgroundTable, get_background_table
 from .power import *
 from .correlation import CorrelationFunction, xi_to_pk, pk_to_xi
 
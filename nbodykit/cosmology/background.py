@@ -217,3 +217,111 @@ class PerturbationGrowth(object):
         v1 /= v1[ind][0]
         v2 /= v2[ind][0]
         return v1, v2
+
+class BackgroundTable(object):
+    """
+    Splines of the comoving distance, and its inverse, and of the
+    growth factor and growth rate as a function of redshift, tabulated
+    once for a cosmology.
+
+    Values outside of the range of the table, ``0 <= z <= zmax``, are
+    computed directly from the cosmology.
+
+    Use :func:`get_background_table` to share the table of a cosmology.
+
+    Parameters
+    ----------
+    cosmo : :class:`~nbodykit.cosmology.cosmology.Cosmology`
+        the cosmology
+    zmax : float, optional
+        the maximum redshift of the table
+    N : int, optional
+        the number of redshifts in the table
+    """
+    def __init__(self, cosmo, zmax=100., N=1025):
+        from scipy.interpolate import InterpolatedUnivariateSpline as spline
+
+        self.cosmo = cosmo
+        self.zmax = zmax
+
+        self.z = np.concatenate([[0.], np.logspace(-8, np.log10(zmax), N-1)])
+        self.r = cosmo.comoving_distance(self.z)
+
+        self._r_of_z = spline(self.z, self.r)
+        self._z_of_r = spline(self.r, self.z)
+        self._D = None
+        self._f = None
+
+    def _interpolate(self, table, func, z):
+        """
+        Internal function to evaluate the spline ``table`` at ``z`` within
+        the range of the table, and ``func`` elsewhere.
+        """
+        z = np.asarray(z, dtype='f8')
+        intable = (z >= 0) & (z <= self.zmax)
+        if intable.all():
+            return table(z.ravel()).reshape(z.shape)[()]
+
+        toret = np.empty(z.shape)
+        toret[intable] = table(z[intable])
+        toret[~intable] = func(z[~intable])
+        return toret[()]
+
+    def comoving_distance(self, z):
+        r"""
+        The comoving distance in units of :math:`h^{-1} \mathrm{Mpc}`
+        at redshift ``z``.
+        """
+        return self._interpolate(self._r_of_z, self.cosmo.comoving_distance, z)
+
+    def redshift(self, r):
+        r"""
+        The redshift at the comoving distance ``r``, in units of
+        :math:`h^{-1} \mathrm{Mpc}`.
+
+        Raises
+        ------
+        ValueError :
+            if ``r`` is outside of the range of the table
+        """
+        r = np.asarray(r, dtype='f8')
+        if r.size and (r.min() < 0 or r.max() > self.r[-1]):
+            raise ValueError("comoving distances should be between 0 and %g Mpc/h, "
+                             "the distance at zmax=%g" % (self.r[-1], self.zmax))
+        return self._z_of_r(r.ravel()).reshape(r.shape)[()]
+
+    def growth_factor(self, z):
+        """
+        The scale-independent growth factor at redshift ``z``; see
+        :func:`~nbodykit.cosmology.cosmology.Cosmology.scale_independent_growth_factor`.
+        """
+        if self._D is None:
+            from scipy.interpolate import InterpolatedUnivariateSpline as spline
+            self._D = spline(self.z, self.cosmo.scale_independent_growth_factor(self.z))
+        return self._interpolate(self._D, self.cosmo.scale_independent_growth_factor, z)
+
+    def growth_rate(self, z):
+        """
+        The scale-independent growth rate at redshift ``z``; see
+        :func:`~nbodykit.cosmology.cosmology.Cosmology.scale_independent_growth_rate`.
+        """
+        if self._f is None:
+            from scipy.interpolate import InterpolatedUnivariateSpline as spline
+            self._f = spline(self.z, self.cosmo.scale_independent_growth_rate(self.z))
+        return self._interpolate(self._f, self.cosmo.scale_independent_growth_rate, z)
+
+def get_background_table(cosmo, zmax=100.):
+    """
+    Return the :class:`BackgroundTable` of ``cosmo``, computing it once
+    for each set of cosmological parameters.
+
+    Parameters
+    ----------
+    cosmo : :class:`~nbodykit.cosmology.cosmology.Cosmology`
+        the cosmology
+    zmax : float, optional
+        the maximum redshift of the table
+    """
+    from .power.table import memoize
+    key = ('BackgroundTable', sorted(dict(cosmo).items()), zmax)
+    return memoize(key, lambda: BackgroundTable(cosmo, zmax=zmax))
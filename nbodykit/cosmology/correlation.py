@@ -2,6 +2,7 @@ import numpy
 import mcfit
 from scipy.interpolate import InterpolatedUnivariateSpline
 from .power.zeldovich import ZeldovichPower
+from .power.table import memoize
 
 NUM_PTS = 1024
 
@@ -124,13 +125,27 @@ class CorrelationFunction(object):
             the minimum ``k`` value to compute P(k) for before taking the FFT
         kmax : float, optional
             the maximum ``k`` value to compute P(k) for before taking the FFT
+
+        Notes
+        -----
+        For the power spectrum objects of :mod:`nbodykit.cosmology`, the
+        transform is cached for each set of parameters, such that later
+        calls only evaluate the spline of the correlation function.
         """
-        k = numpy.logspace(numpy.log10(kmin), numpy.log10(kmax), NUM_PTS)
+        def compute():
+            k = numpy.logspace(numpy.log10(kmin), numpy.log10(kmax), NUM_PTS)
+
+            # power with smoothing
+            Pk = self.power(k)
+            Pk *= numpy.exp(-(k*smoothing)**2)
+
+            # only extrap if not zeldovich
+            extrap = not isinstance(self.power, ZeldovichPower)
+            return pk_to_xi(k, Pk, extrap=extrap)
 
-        # power with smoothing
-        Pk = self.power(k)
-        Pk *= numpy.exp(-(k*smoothing)**2)
+        key = getattr(self.power, '_table_key', None)
+        if key is None:
+            return compute()(r)
 
-        # only extrap if not zeldovich
-        extrap = not isinstance(self.power, ZeldovichPower)
-        return pk_to_xi(k, Pk, extrap=extrap)(r)
+        key = key() + ('xi', smoothing, kmin, kmax, getattr(self.power, 'tabulate', False))
+        return memoize(key, compute)(r)
@@ -1,4 +1,5 @@
 import numpy
+from .table import get_table, evaluate_with_table
 
 class HalofitPower(object):
     """
@@ -11,6 +12,9 @@ class HalofitPower(object):
         converted
     redshift : float
         the redshift of the power spectrum
+    tabulate : bool, optional
+        if ``True``, the power is interpolated from a table computed once;
+        see :class:`~nbodykit.cosmology.power.linear.LinearPower`
 
     Attributes
     ----------
@@ -21,7 +25,7 @@ class HalofitPower(object):
     redshift : float
         the redshift to compute the power at
     """
-    def __init__(self, cosmo, redshift):
+    def __init__(self, cosmo, redshift, tabulate=False):
         from astropy.cosmology import FLRW
 
         # convert astropy
@@ -33,6 +37,7 @@ class HalofitPower(object):
         self.cosmo = cosmo.clone(nonlinear=True)
         self.redshift = redshift
         self._sigma8 = self.cosmo.sigma8
+        self.tabulate = tabulate
 
         # store meta-data
         self._attrs = {}
@@ -75,6 +80,22 @@ class HalofitPower(object):
             the linear power spectrum evaluated at ``k`` in units of
             :math:`h^{-3} \mathrm{Mpc}^3`
         """
+        if self.tabulate:
+            kmin, kmax = 1.0001*self.cosmo.P_k_min, self.cosmo.P_k_max
+            table = get_table(self._table_key(), self._evaluate, kmin, kmax)
+            return evaluate_with_table(table, self._evaluate, k)
+        return self._evaluate(k)
+
+    def _table_key(self):
+        """
+        Internal function to return the parameters that determine the power.
+        """
+        return ('HalofitPower', sorted(dict(self.cosmo).items()), self.redshift)
+
+    def _evaluate(self, k):
+        """
+        Internal function to compute the power at ``k``.
+        """
         k = numpy.asarray(k)
         if k.max() > self.cosmo.P_k_max:
             msg = "results can only be computed up to k=%.2e h/Mpc; " %self.cosmo.P_k_max
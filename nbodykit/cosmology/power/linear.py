@@ -1,7 +1,10 @@
 import numpy
 from . import transfers
+from .table import get_table, evaluate_with_table, memoize
 from ..cosmology import Cosmology
 
+NUM_PTS = 1024
+
 class LinearPower(object):
     """
     An object to compute the linear power spectrum and related quantities,
@@ -18,6 +21,13 @@ class LinearPower(object):
     transfer : str, optional
         string specifying the transfer function to use; one of
         'CLASS', 'EisensteinHu', 'NoWiggleEisensteinHu'
+    tabulate : bool, optional
+        if ``True``, the power is interpolated from a table computed
+        once on logarithmically spaced wavenumbers, with the relative
+        accuracy given by the ``power_table_rtol`` global option; the
+        table is shared by all instances with the same cosmology,
+        redshift, transfer and normalization. This is much faster when
+        evaluating the power on large arrays, e.g., on a mesh
 
     Attributes
     ----------
@@ -30,7 +40,7 @@ class LinearPower(object):
     transfer : str
         the type of transfer function used
     """
-    def __init__(self, cosmo, redshift, transfer='CLASS'):
+    def __init__(self, cosmo, redshift, transfer='CLASS', tabulate=False):
         from astropy.cosmology import FLRW
 
         # convert astropy
@@ -54,13 +64,15 @@ class LinearPower(object):
         self._transfer = getattr(transfers, transfer)(c, redshift)
         self._fallback = transfers.EisensteinHu(c, redshift) # fallback to analytic when out of range
 
-        # normalize to proper sigma8
+        # normalize to proper sigma8, without a table
+        self.tabulate = False
         self._norm = 1.
         self.redshift = 0;
         self._norm = (self._sigma8 / self.sigma_r(8.))**2 # sigma_r(z=0, r=8)
 
         # set redshift
         self.redshift = redshift
+        self.tabulate = tabulate
 
         # store meta-data
         self._attrs = {}
@@ -131,6 +143,23 @@ class LinearPower(object):
             the linear power spectrum evaluated at ``k`` in units of
             :math:`h^{-3} \mathrm{Mpc}^3`
         """
+        if self.tabulate:
+            kmax = 0.999*self.cosmo.P_k_max if self.transfer == 'CLASS' else 1e2
+            table = get_table(self._table_key(), self._evaluate, 1e-5, kmax)
+            return evaluate_with_table(table, self._evaluate, k)
+        return self._evaluate(k)
+
+    def _table_key(self):
+        """
+        Internal function to return the parameters that determine the power.
+        """
+        return ('LinearPower', sorted(dict(self.cosmo).items()), self.transfer,
+                self.redshift, self._norm)
+
+    def _evaluate(self, k):
+        """
+        Internal function to compute the power at ``k``.
+        """
         if self.transfer != "CLASS":
             Pk = k**self.cosmo.n_s * self._transfer(k)**2
         else:
@@ -155,6 +184,17 @@ class LinearPower(object):
 
         return self._norm * Pk
 
+    def _pk_grid(self, kmin, kmax):
+        """
+        Internal function to return ``NUM_PTS`` logarithmically spaced
+        wavenumbers between ``kmin`` and ``kmax`` and the power at these
+        wavenumbers, computed once for each set of parameters.
+        """
+        def compute():
+            k = numpy.logspace(numpy.log10(kmin), numpy.log10(kmax), NUM_PTS)
+            return k, self(k)
+        return memoize(self._table_key() + ('grid', kmin, kmax, self.tabulate), compute)
+
     def velocity_dispersion(self, kmin=1e-5, kmax=10., **kwargs):
         r"""
         The velocity dispersion in units of of :math:`\mathrm{Mpc/h}` at
@@ -166,19 +206,36 @@ class LinearPower(object):
 
             \sigma_v^2 = \frac{1}{3} \int_a^b \frac{d^3 q}{(2\pi)^3} \frac{P(q,z)}{q^2}.
 
+        The integral is computed from the spline of the power on a grid of
+        wavenumbers, which is cached for each set of parameters.
+
         Parameters
         ----------
         kmin : float, optional
             the lower bound for the integral, in units of :math:`\mathrm{Mpc/h}`
         kmax : float, optional
             the upper bound for the integral, in units of :math:`\mathrm{Mpc/h}`
+        **kwargs :
+            if given, the integral is instead computed with
+            :func:`scipy.integrate.quad`, with these keywords
         """
-        from scipy.integrate import quad
+        if len(kwargs):
+            from scipy.integrate import quad
+
+            def integrand(logq):
+                q = numpy.exp(logq)
+                return q*self(q)
+            sigmasq = quad(integrand, numpy.log(kmin), numpy.log(kmax), **kwargs)[0] / (6*numpy.pi**2)
+            return sigmasq**0.5
 
-        def integrand(logq):
-            q = numpy.exp(logq)
-            return q*self(q)
-        sigmasq = quad(integrand, numpy.log(kmin), numpy.log(kmax), **kwargs)[0] / (6*numpy.pi**2)
+        from scipy.interpolate import InterpolatedUnivariateSpline as spline
+
+        def compute():
+            k, Pk = self._pk_grid(kmin, kmax)
+            integral = spline(numpy.log(k), k*Pk).integral(numpy.log(kmin), numpy.log(kmax))
+            return integral / (6*numpy.pi**2)
+
+        sigmasq = memoize(self._table_key() + ('sigma_v', kmin, kmax, self.tabulate), compute)
         return sigmasq**0.5
 
     def sigma_r(self, r, kmin=1e-5, kmax=1e1):
@@ -198,6 +255,11 @@ class LinearPower(object):
         The value of this function with ``r=8`` returns
         :attr:`sigma8`, within numerical precision.
 
+        The values of :math:`\sigma^2` for all radii are computed at once
+        with a single FFTLog transform, and the resulting spline is cached
+        for each set of parameters, such that evaluating many radii
+        costs the same as a single radius.
+
         Parameters
         ----------
         r : float, array_like
@@ -211,11 +273,13 @@ class LinearPower(object):
         import mcfit
         from scipy.interpolate import InterpolatedUnivariateSpline as spline
 
-        k = numpy.logspace(numpy.log10(kmin), numpy.log10(kmax), 1024)
-        Pk = self(k)
-        R, sigmasq = mcfit.TophatVar(k)(Pk)
+        def compute():
+            k, Pk = self._pk_grid(kmin, kmax)
+            R, sigmasq = mcfit.TophatVar(k)(Pk)
+            return spline(R, sigmasq)
 
-        return spline(R, sigmasq)(r)**0.5
+        sigmasq = memoize(self._table_key() + ('sigma_r', kmin, kmax, self.tabulate), compute)
+        return sigmasq(r)**0.5
 
 
 def NoWiggleEHPower(cosmo, redshift):
@@ -0,0 +1,178 @@
+import numpy
+from collections import OrderedDict
+from scipy.interpolate import InterpolatedUnivariateSpline as spline
+
+from nbodykit import _global_options
+
+NUM_PER_DECADE = 32 # the initial number of k values per decade
+MAX_PTS = 8192 # the maximum number of k values in a table
+MAX_TABLES = 32 # the maximum number of tables kept in memory
+
+class PowerTable(object):
+    """
+    A cubic spline of a power spectrum in log-log space, tabulated
+    on logarithmically spaced wavenumbers between ``kmin`` and ``kmax``.
+
+    The table is refined, by adding the midpoints of the current
+    wavenumbers, until the spline reproduces the power at the midpoints
+    with a relative error below ``rtol``.
+
+    Parameters
+    ----------
+    func : callable
+        the function returning the power at an array of wavenumbers
+    kmin : float
+        the minimum wavenumber of the table
+    kmax : float
+        the maximum wavenumber of the table
+    rtol : float
+        the relative accuracy of the table
+
+    Attributes
+    ----------
+    k : array_like
+        the wavenumbers of the table
+    Pk : array_like
+        the power at :attr:`k`
+    error : float
+        the maximum relative error of the spline at the midpoints of the
+        last refinement
+    """
+    def __init__(self, func, kmin, kmax, rtol):
+
+        self.kmin = kmin
+        self.kmax = kmax
+
+        N = max(int(NUM_PER_DECADE * numpy.log10(kmax / kmin)), 4)
+        logk = numpy.linspace(numpy.log(kmin), numpy.log(kmax), N)
+        Pk = func(numpy.exp(logk))
+
+        self._build(logk, Pk)
+        self.error = numpy.inf
+        while self.error >= rtol and 2*len(logk) - 1 <= MAX_PTS:
+
+            # check the accuracy at the midpoints
+            mid = 0.5 * (logk[1:] + logk[:-1])
+            Pmid = func(numpy.exp(mid))
+            with numpy.errstate(divide='ignore', invalid='ignore'):
+                self.error = numpy.nanmax(abs(self._spline(mid) / Pmid - 1.))
+
+            # add the midpoints to the table
+            logk = numpy.stack([logk, numpy.append(mid, numpy.nan)], axis=-1).ravel()[:-1]
+            Pk = numpy.stack([Pk, numpy.append(Pmid, numpy.nan)], axis=-1).ravel()[:-1]
+            self._build(logk, Pk)
+
+        self.k = numpy.exp(logk)
+        self.Pk = Pk
+
+    def _build(self, logk, Pk):
+        """
+        Internal function to build the spline through ``Pk``, in log-log
+        space if the power is positive.
+        """
+        self._log = (Pk > 0).all()
+        if self._log:
+            self._table = spline(logk, numpy.log(Pk))
+        else:
+            self._table = spline(logk, Pk)
+
+    def _spline(self, logk):
+        """
+        Internal function to return the spline at ``logk``.
+        """
+        if self._log:
+            return numpy.exp(self._table(logk))
+        return self._table(logk)
+
+    def contains(self, k):
+        """
+        Return a boolean mask of the values of ``k`` in the range of the table.
+        """
+        return (k >= self.kmin) & (k <= self.kmax)
+
+    def __call__(self, k):
+        """
+        Return the interpolated power at ``k``, which should be in
+        the range of the table.
+        """
+        return self._spline(numpy.log(k))
+
+_tables = OrderedDict()
+_results = OrderedDict()
+
+def _lookup(cache, key, func):
+    """
+    Internal function to return ``cache[key]``, or to store and return
+    ``func()`` if ``key`` is not in ``cache``, evicting the least
+    recently used entries beyond ``MAX_TABLES``.
+    """
+    key = repr(key)
+    if key in cache:
+        result = cache.pop(key)
+    else:
+        result = func()
+        while len(cache) >= MAX_TABLES:
+            cache.popitem(last=False)
+    cache[key] = result
+    return result
+
+def get_table(key, func, kmin, kmax, rtol=None):
+    """
+    Return the :class:`PowerTable` of ``func`` identified by ``key``,
+    computing it if it is not already in memory.
+
+    Tables are shared by all power spectrum objects with the same
+    parameters, i.e., the same ``key``.
+
+    Parameters
+    ----------
+    key : tuple
+        the parameters that uniquely determine the power spectrum
+    func : callable
+        the function returning the power at an array of wavenumbers
+    kmin : float
+        the minimum wavenumber of the table
+    kmax : float
+        the maximum wavenumber of the table
+    rtol : float, optional
+        the relative accuracy of the table; default is the
+        ``power_table_rtol`` global option
+    """
+    if rtol is None:
+        rtol = _global_options['power_table_rtol']
+
+    return _lookup(_tables, (key, kmin, kmax, rtol),
+                    lambda: PowerTable(func, kmin, kmax, rtol))
+
+def memoize(key, func):
+    r"""
+    Return the result of ``func()``, computed once for each ``key``.
+
+    This caches quantities derived from a power spectrum, e.g., the
+    power on a grid of wavenumbers or the spline of :math:`\sigma(R)`,
+    which are shared by all power spectrum objects with the same
+    parameters.
+
+    Parameters
+    ----------
+    key : tuple
+        the parameters that uniquely determine the result
+    func : callable
+        the function computing the result, taking no arguments
+    """
+    return _lookup(_results, key, func)
+
+def evaluate_with_table(table, func, k):
+    """
+    Return the power at ``k``, interpolating ``table`` where possible
+    and calling ``func`` elsewhere.
+    """
+    k = numpy.asarray(k, dtype='f8')
+    kflat = k.ravel()
+    Pk = numpy.empty_like(kflat)
+
+    intable = table.contains(kflat)
+    Pk[intable] = table(kflat[intable])
+    if not intable.all():
+        Pk[~intable] = func(kflat[~intable])
+    return Pk.reshape(k.shape)[()]
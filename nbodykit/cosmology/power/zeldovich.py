@@ -1,29 +1,17 @@
 import mcfit
 import numpy
 from scipy.interpolate import InterpolatedUnivariateSpline as spline
+from scipy.interpolate import make_interp_spline
 from scipy.integrate import quad
 
 from .linear import LinearPower
+from .table import get_table, evaluate_with_table
 
 NUM_PTS = 1024
 KMIN = 1e-5
 KMAX = 1e2
 NMAX = 15
-
-def isiterable(obj):
-    """Returns `True` if the given object is iterable."""
-    try:
-        iter(obj)
-        return True
-    except TypeError:
-        return False
-
-def vectorize_if_needed(func, *x):
-    """ Helper function to vectorize functions on array inputs"""
-    if any(map(isiterable, x)):
-        return numpy.vectorize(func)(*x)
-    else:
-        return func(*x)
+BATCH_SIZE = 256 # number of k values transformed at once
 
 class ZeldovichPower(object):
     """
@@ -38,6 +26,10 @@ class ZeldovichPower(object):
     transfer : str, optional
         string specifying the transfer function to use for the linear
         power spectrum; one of 'CLASS', 'EisensteinHu', 'NoWiggleEisensteinHu'
+    tabulate : bool, optional
+        if ``True``, the power is interpolated from a table computed once;
+        see :class:`~nbodykit.cosmology.power.linear.LinearPower`. This is
+        much faster when the power is evaluated repeatedly
 
     Attributes
     ----------
@@ -50,10 +42,12 @@ class ZeldovichPower(object):
     Plin : class:`LinearPower`
         the linear power spectrum class used to compute the Zel'dovich power
     """
-    def __init__(self, cosmo, redshift, transfer='CLASS'):
+    def __init__(self, cosmo, redshift, transfer='CLASS', tabulate=False):
+
+        self.tabulate = tabulate
 
         # initialize the linear power
-        self.Plin = LinearPower(cosmo, redshift, transfer='CLASS')
+        self.Plin = LinearPower(cosmo, redshift, transfer=transfer)
 
         self.cosmo = self.Plin.cosmo
         self._sigma8 = self.cosmo.sigma8
@@ -95,13 +89,16 @@ class ZeldovichPower(object):
         _, I1 = ZeldovichJ1(k)(Pk, extrap=True)
 
         # compute the X(r), Y(r) integrals we need
-        self._sigmasq = self.Plin.velocity_dispersion(kmin=1e-5, kmax=10., limit=500)**2
+        self._sigmasq = self.Plin.velocity_dispersion(kmin=1e-5, kmax=10.)**2
         self._X = -2.*I1 + 2 * self._sigmasq
         self._Y = -2.*I0 + 6.*I1
 
         # needed for the low-k approx
         self._Q3 = quad(lambda q: (self.Plin(q)/q)**2, 1e-6, 100.)[0]
 
+        # the integrals of each order n, which only depend on the r grid
+        self._integrals = [ZeldovichPowerIntegral(self._r, n) for n in range(0, NMAX+1)]
+
     @property
     def redshift(self):
         """
@@ -158,28 +155,82 @@ class ZeldovichPower(object):
         k : float, array_like
             the wavenumbers to evaluate the power at
         """
-        def Pzel_at_k(ki):
+        if self.tabulate:
+            table = get_table(self._table_key(), self._evaluate, self._k0_low, KMAX)
+            return evaluate_with_table(table, self._evaluate, k)
+        return self._evaluate(k)
+
+    def _table_key(self):
+        """
+        Internal function to return the parameters that determine the power.
+        """
+        return ('ZeldovichPower',) + self.Plin._table_key()
+
+    def _evaluate(self, k):
+        """
+        Internal function to compute the power at ``k``.
+        """
+        k = numpy.asarray(k, dtype='f8')
+        kflat = k.ravel()
+        Pk = numpy.empty_like(kflat)
 
-            # return the low-k approximation
-            if ki < self._k0_low:
-                return self._low_k_approx(ki)
+        # return the low-k approximation
+        low = kflat < self._k0_low
+        Pk[low] = self._low_k_approx(kflat[low])
 
-            # do the full integral
-            Pzel = 0.0
-            for n in range(0, NMAX+1):
+        # do the full integrals
+        Pk[~low] = self._integrate(kflat[~low])
+        return Pk.reshape(k.shape)[()]
+
+    def _integrate(self, k):
+        """
+        Internal function to compute the full Zel'dovich power at the
+        1D array of wavenumbers ``k``.
+
+        For each order ``n``, the integrands of all ``k`` values are
+        transformed at once, in batches of ``BATCH_SIZE`` values, and
+        each transform is interpolated to its ``k`` with a cubic spline.
+        """
+        Pzel = numpy.zeros(len(k))
+
+        for n, I in enumerate(self._integrals):
+            for start in range(0, len(k), BATCH_SIZE):
+                ki = k[start:start+BATCH_SIZE, None]
 
-                I = ZeldovichPowerIntegral(self._r, n)
                 if n > 0:
                     f = (ki*self._Y)**n * numpy.exp(-0.5*ki**2 * (self._X + self._Y))
                 else:
                     f = numpy.exp(-0.5*ki**2 * (self._X + self._Y)) - numpy.exp(-ki**2*self._sigmasq)
 
+                # the stack of transforms, on the same output grid kk
                 kk, this_Pzel = I(f, extrap=False)
-                Pzel += spline(kk, this_Pzel)(ki)
 
-            return Pzel
+                # one cubic spline through kk for all of the transforms;
+                # transform i is evaluated at ki[i] only
+                spline = make_interp_spline(kk, this_Pzel, axis=1)
+                Pzel[start:start+BATCH_SIZE] += _evaluate_rows(spline, ki[:,0])
+
+        return Pzel
 
-        return vectorize_if_needed(Pzel_at_k, k)
+def _evaluate_rows(spline, x):
+    """
+    Internal function to evaluate the spline ``spline`` of a stack of
+    functions, with function ``i`` evaluated at ``x[i]`` only, using the
+    de Boor algorithm on the coefficients of each function.
+    """
+    t, c, k = spline.t, spline.c, spline.k
+    n = len(t) - k - 1
+
+    # the knot interval of each x, extrapolating the first and last polynomials
+    m = numpy.clip(numpy.searchsorted(t, x, side='right') - 1, k, n - 1)
+    rows = numpy.arange(len(x))
+    d = [c[m - k + j, rows] for j in range(k + 1)]
+    for r in range(1, k + 1):
+        for j in range(k, r - 1, -1):
+            lo, hi = t[j + m - k], t[j + 1 + m - r]
+            alpha = (x - lo) / (hi - lo)
+            d[j] = (1 - alpha) * d[j - 1] + alpha * d[j]
+    return d[k]
 
 class ZeldovichJ0(mcfit.mcfit):
     r"""
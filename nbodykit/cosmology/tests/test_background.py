@@ -1,6 +1,8 @@
 from nbodykit.cosmology import Planck15, Cosmology, PerturbationGrowth
+from nbodykit.cosmology import BackgroundTable, get_background_table
 from numpy.testing import assert_allclose
 import numpy
+import pytest
 
 def test_ode():
 
@@ -35,3 +37,25 @@ def test_ode():
     # second order quantities
     D2 = pt.D2(a)
     f2 = pt.f2(a)
+
+def test_table():
+
+    C = Planck15
+    z = numpy.linspace(0., 5., 100)
+
+    table = get_background_table(C)
+    assert get_background_table(C) is table
+
+    # forward and inverse splines
+    r = C.comoving_distance(z)
+    assert_allclose(table.comoving_distance(z), r, rtol=1e-6)
+    assert_allclose(table.redshift(r), z, rtol=1e-6, atol=1e-8)
+
+    assert_allclose(table.growth_factor(z), C.scale_independent_growth_factor(z), rtol=1e-6)
+    assert_allclose(table.growth_rate(z), C.scale_independent_growth_rate(z), rtol=1e-6)
+
+    # outside of the table
+    table = BackgroundTable(C, zmax=1.0)
+    assert_allclose(table.comoving_distance(z), r, rtol=1e-6)
+    with pytest.raises(ValueError):
+        table.redshift(r)
@@ -76,3 +76,20 @@ def test_zeldovich():
     CF = CorrelationFunction(Pzel)
 
     xi = CF(r)
+
+def test_cached():
+
+    c = Cosmology()
+    Plin = LinearPower(c, redshift=0)
+    CF = CorrelationFunction(Plin)
+
+    r = numpy.logspace(0, numpy.log10(150), 100)
+    xi1 = CF(r)
+
+    # same result from the cache
+    assert_allclose(CF(r), xi1)
+
+    # the cache depends on the parameters
+    CF.sigma8 = 0.5 * CF.sigma8
+    assert_allclose(CF(r), 0.25 * xi1, rtol=1e-5)
+    assert not numpy.allclose(CF(r, smoothing=1.), CF(r))
@@ -160,3 +160,72 @@ def test_zeldovich():
     D2 = c.scale_independent_growth_factor(0.)
     D3 = c.scale_independent_growth_factor(0.55)
     assert_allclose(Pk2.max()/Pk3.max(), (D2/D3)**2, rtol=1e-2)
+
+def test_zeldovich_tabulate():
+
+    c = Cosmology().match(sigma8=0.82)
+    k = numpy.logspace(-3, 0, 50)
+
+    P = ZeldovichPower(c, redshift=0)
+    P2 = ZeldovichPower(c, redshift=0, tabulate=True)
+
+    # the tabulated power agrees with the direct evaluation
+    assert_allclose(P2(k), P(k), rtol=1e-4)
+
+    # array shape and scalars
+    assert P(k.reshape(5, 10)).shape == (5, 10)
+    assert numpy.ndim(P(0.1)) == 0
+    assert_allclose(P(0.1), P(numpy.array([0.1]))[0])
+
+def test_tabulate():
+
+    from nbodykit.cosmology.power.table import _tables
+
+    c = Cosmology().match(sigma8=0.82)
+    k = numpy.logspace(-4, numpy.log10(0.99*c.P_k_max), 1000)
+
+    # the tables agree with the direct evaluation
+    for transfer in ['CLASS', 'EisensteinHu']:
+        P = LinearPower(c, redshift=0.5, transfer=transfer)
+        P2 = LinearPower(c, redshift=0.5, transfer=transfer, tabulate=True)
+        assert_allclose(P2(k), P(k), rtol=1e-3)
+
+    P = HalofitPower(c, redshift=0.5)
+    P2 = HalofitPower(c, redshift=0.5, tabulate=True)
+    assert_allclose(P2(k), P(k), rtol=1e-3)
+
+    # outside of the table
+    P2 = LinearPower(c, redshift=0.5, tabulate=True)
+    kout = numpy.array([1e-6, 2*c.P_k_max])
+    assert_allclose(P2(kout), LinearPower(c, redshift=0.5)(kout))
+
+    # the table is shared by identical instances
+    N = len(_tables)
+    P3 = LinearPower(c, redshift=0.5, tabulate=True)
+    P3(k)
+    assert len(_tables) == N
+
+    # and recomputed when the parameters change
+    P3.sigma8 = 0.75
+    P4 = LinearPower(c.match(sigma8=0.75), redshift=0.5)
+    assert_allclose(P3(k), P4(k), rtol=1e-3)
+    assert len(_tables) == N + 1
+
+def test_sigma_r_batched():
+
+    c = Cosmology().match(sigma8=0.82)
+    P = LinearPower(c, redshift=0)
+
+    # sigma_r for an array of radii matches single radii
+    r = numpy.logspace(-1, 2, 500)
+    sigma = P.sigma_r(r)
+    assert_allclose(sigma[::100], [P.sigma_r(ri) for ri in r[::100]])
+    assert_allclose(P.sigma_r(8.), 0.82, rtol=1e-3)
+
+    # the cached result is updated with the redshift
+    P.redshift = 1.0
+    D = c.scale_independent_growth_factor(1.0)
+    assert_allclose(P.sigma_r(r), D * sigma, rtol=1e-2)
+
+    # the spline integral matches quad
+    assert_allclose(P.velocity_dispersion(), P.velocity_dispersion(limit=500), rtol=1e-4)
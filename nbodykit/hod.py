@@ -1,4 +1,9 @@
 from nbodykit.cosmology import Cosmology
+from nbodykit.utils import uniform_from_counter, poisson_from_uniform
+import numpy
+
+# G in units of (km/s)^2 Mpc / Msun
+G = 4.30091e-9
 
 class HODModel(object):
     """
@@ -15,7 +20,205 @@ class HODModel(object):
     .. note::
         Here, mass definition is used to place satellites in halos using
         a NFW profile in order to convert mass to radius.
+
+    Models with a native implementation (i.e., with :attr:`defaults`) can
+    also be instantiated and populated directly with :mod:`numpy`, on all
+    ranks in parallel; see :func:`populate`. In this case, centrals are
+    placed at the center of halos, with the halo velocity, and satellites
+    follow a NFW profile, with isotropic Gaussian velocities with the
+    dispersion from the Jeans equation.
+
+    Parameters
+    ----------
+    **params :
+        the values of the model parameters, which default to
+        :attr:`defaults`
     """
+    defaults = None
+    gal_types = ['centrals', 'satellites']
+
+    def __init__(self, **params):
+        if self.defaults is None:
+            raise NotImplementedError("%s has no native implementation; use to_halotools()" %self.__class__.__name__)
+
+        self.param_dict = dict(self.defaults)
+        self.param_dict.update(params)
+        self.halos = None
+        self._draws = None
+
+    def mean_occupation_centrals(self, mass):
+        """
+        The mean number of centrals in halos of mass ``mass``.
+        """
+        raise NotImplementedError
+
+    def mean_occupation_satellites(self, mass):
+        """
+        The mean number of satellites in halos of mass ``mass``.
+        """
+        raise NotImplementedError
+
+    def load_halos(self, halos, BoxSize=None):
+        """
+        Compute and store the local columns of the
+        :class:`~nbodykit.source.catalog.halos.HaloCatalog` ``halos``
+        that are needed to populate the model.
+
+        Parameters
+        ----------
+        halos : :class:`~nbodykit.source.catalog.halos.HaloCatalog`
+            the halos
+        BoxSize : float, array_like, optional
+            the size of the box, used to wrap the positions of satellites;
+            must be supplied if 'BoxSize' is not in the ``attrs`` of ``halos``
+        """
+        if BoxSize is None:
+            BoxSize = halos.attrs.get('BoxSize', None)
+        if BoxSize is None:
+            raise ValueError("please specify a 'BoxSize' to populate halos")
+
+        cols = ['Position', 'Velocity', 'Mass', 'Radius', 'Concentration', 'Index']
+        data = halos.compute(*[halos[col] for col in cols])
+
+        self.halos = dict(zip(cols, data))
+        self.halos['BoxSize'] = numpy.ones(3) * BoxSize
+        self._draws = None
+        self.mass_key = halos.attrs['halo_mass_key']
+        self.radius_key = halos.attrs['halo_radius_key']
+
+    def populate(self, seed):
+        """
+        Populate the local halos stored by :func:`load_halos` and return
+        the galaxies as a structured array.
+
+        Random numbers are drawn from counter-based streams, keyed by
+        ``seed``, the global index of the halo, and the number of the
+        draw in the halo. The galaxies of each halo, and their order,
+        are thus independent of the number of ranks.
+
+        Parameters
+        ----------
+        seed : int
+            the random seed
+
+        Returns
+        -------
+        data : structured numpy.ndarray
+            the galaxies, ordered by halo, with centrals first
+        """
+        if self.halos is None:
+            raise ValueError("call load_halos() before populating the model")
+
+        halos = self.halos
+        mass = halos['Mass']
+        draws = self._get_draws(seed)
+
+        # the number of centrals and satellites in each halo
+        ncen = (draws['centrals'] < self.mean_occupation_centrals(mass)).astype('i8')
+        nsat = poisson_from_uniform(self.mean_occupation_satellites(mass), draws['satellites'])
+
+        # the host of each satellite, and its number in the host
+        sathost = numpy.repeat(numpy.arange(len(mass)), nsat)
+        j = numpy.arange(len(sathost)) - numpy.repeat(numpy.cumsum(nsat) - nsat, nsat)
+
+        # the satellite offsets from the host
+        dpos, dvel = self._get_satellite_offsets(draws, nsat, sathost, j)
+
+        # the galaxies are ordered by host, with centrals first
+        start = numpy.cumsum(ncen + nsat) - ncen - nsat
+        host = numpy.empty((ncen + nsat).sum(), dtype='i8')
+        gal_type = numpy.ones(len(host), dtype='i4')
+        censlot = start[ncen > 0]
+        satslot = start[sathost] + ncen[sathost] + j
+        host[censlot] = numpy.flatnonzero(ncen)
+        host[satslot] = sathost
+        gal_type[censlot] = 0
+
+        pos = halos['Position'][host]
+        vel = halos['Velocity'][host]
+        pos[satslot] += dpos
+        vel[satslot] += dvel
+        pos %= halos['BoxSize']
+
+        distance = numpy.zeros(len(host))
+        distance[satslot] = (dpos**2).sum(axis=-1)**0.5
+
+        dtype = [('x', 'f8'), ('y', 'f8'), ('z', 'f8'), ('vx', 'f8'), ('vy', 'f8'), ('vz', 'f8'),
+                 ('gal_type', 'i4'), ('halo_id', 'i8'), (self.mass_key, 'f8'), (self.radius_key, 'f8'),
+                 ('halo_nfw_conc', 'f8'), ('host_centric_distance', 'f8')]
+        data = numpy.empty(len(host), dtype=dtype)
+        for i, col in enumerate(['x', 'y', 'z']):
+            data[col] = pos[:, i]
+            data['v' + col] = vel[:, i]
+        data['gal_type'] = gal_type
+        data['halo_id'] = halos['Index'][host]
+        data[self.mass_key] = mass[host]
+        data[self.radius_key] = halos['Radius'][host]
+        data['halo_nfw_conc'] = halos['Concentration'][host]
+        data['host_centric_distance'] = distance
+        return data
+
+    def _get_draws(self, seed):
+        """
+        Internal function to return the random draws of the local halos
+        for ``seed``, which do not depend on the model parameters.
+
+        The draws are cached until the seed or the halos change. They hold
+        the uniform numbers of the occupations of each halo, and a pool of
+        satellite offsets, which grows as needed; see
+        :func:`_get_satellite_offsets`.
+        """
+        draws = self._draws
+        if draws is None or draws['seed'] != seed:
+            index = self.halos['Index'].astype('u8')
+            draws = {'seed' : seed,
+                     'centrals' : uniform_from_counter(seed, index, 0),
+                     'satellites' : uniform_from_counter(seed, index, 1),
+                     'size' : numpy.zeros(len(index), dtype='i8'),
+                     'start' : numpy.zeros(len(index), dtype='i8'),
+                     'dpos' : numpy.empty((0, 3)),
+                     'dvel' : numpy.empty((0, 3))}
+            self._draws = draws
+        return draws
+
+    def _get_satellite_offsets(self, draws, nsat, sathost, j):
+        """
+        Internal function to return the offsets of the positions and
+        velocities of the satellites ``j`` of the halos ``sathost``.
+
+        The offsets of satellite ``j`` of a halo only depend on the seed,
+        the halo, and ``j``, and are taken from the pool of ``draws``;
+        the pool of the halos with more than their pooled satellites is
+        extended by 50%.
+        """
+        grow = nsat > draws['size']
+        if grow.any():
+            halos = self.halos
+            size = draws['size'].copy()
+            size[grow] = nsat[grow] + nsat[grow] // 2 + 1
+            start = numpy.cumsum(size) - size
+
+            # the pooled satellites, and the ones to draw
+            host = numpy.repeat(numpy.arange(len(size)), size)
+            jj = numpy.arange(len(host)) - numpy.repeat(start, size)
+            old = jj < draws['size'][host]
+            new = ~old
+
+            dpos = numpy.empty((len(host), 3))
+            dvel = numpy.empty((len(host), 3))
+            dpos[old] = draws['dpos'][draws['start'][host[old]] + jj[old]]
+            dvel[old] = draws['dvel'][draws['start'][host[old]] + jj[old]]
+
+            h = host[new]
+            index = halos['Index'][h].astype('u8')
+            u = [uniform_from_counter(draws['seed'], index, 2 + 6*jj[new] + d) for d in range(6)]
+            dpos[new], dvel[new] = _nfw_phase_space(u, halos['Mass'][h], halos['Radius'][h],
+                                                        halos['Concentration'][h])
+            draws.update(size=size, start=start, dpos=dpos, dvel=dvel)
+
+        k = draws['start'][sathost] + j
+        return draws['dpos'][k], draws['dvel'][k]
+
     @staticmethod
     def to_halotools(cosmo, redshift, mdef, concentration_key=None, **kwargs):
         """
@@ -51,6 +254,33 @@ class HODModel(object):
 
 # NOTE: we are making zheng 07 separately due to astropy/halotools#827
 class Zheng07Model(HODModel):
+    r"""
+    The HOD model of `Zheng et al. 2007 <https://arxiv.org/abs/astro-ph/0703457>`_.
+
+    The mean occupations are
+
+    .. math::
+
+        \langle N_\mathrm{cen} \rangle = \frac{1}{2} \left[ 1 + \mathrm{erf}
+            \left( \frac{\log M - \log M_\mathrm{min}}{\sigma_{\log M}} \right) \right],
+
+        \langle N_\mathrm{sat} \rangle = \langle N_\mathrm{cen} \rangle
+            \left( \frac{M - M_0}{M_1} \right)^\alpha,
+
+    with the default parameters of :mod:`halotools`. The model can be
+    used natively, or converted with :func:`to_halotools`.
+    """
+    defaults = {'logMmin':12.02, 'sigma_logM':0.26, 'logM0':11.38, 'logM1':13.31, 'alpha':1.06}
+
+    def mean_occupation_centrals(self, mass):
+        from scipy.special import erf
+        p = self.param_dict
+        return 0.5 * (1 + erf((numpy.log10(mass) - p['logMmin']) / p['sigma_logM']))
+
+    def mean_occupation_satellites(self, mass):
+        p = self.param_dict
+        x = numpy.clip((mass - 10**p['logM0']) / 10**p['logM1'], 0, None)
+        return self.mean_occupation_centrals(mass) * x**p['alpha']
 
     @staticmethod
     def to_halotools(cosmo, redshift, mdef, concentration_key=None, **kwargs):
@@ -119,6 +349,59 @@ class Zheng07Model(HODModel):
         model['satellites_profile'] = satsprof
         return HodModelFactory(**model)
 
+def _nfw_g(y):
+    return numpy.log1p(y) - y / (1. + y)
+
+_jeans_table = None
+
+def _nfw_velocity_dispersion(x, c):
+    r"""
+    Internal function to return the isotropic velocity dispersion of a
+    NFW profile with concentration ``c``, at the radius ``x`` in units of
+    the halo radius, in units of the virial velocity.
+
+    This solves the Jeans equation, using a table of the dimensionless
+    integral :math:`\int_y^\infty g(y') / (y'^3 (1 + y')^2) dy'`.
+    """
+    global _jeans_table
+    if _jeans_table is None:
+        logy = numpy.linspace(numpy.log(1e-6), numpy.log(1e4), 4096)
+        y = numpy.exp(logy)
+        f = _nfw_g(y) / (y**2 * (1 + y)**2) # integrand in dlogy
+        I = numpy.concatenate([numpy.cumsum((0.5 * (f[1:] + f[:-1]) * numpy.diff(logy))[::-1])[::-1], [0.]])
+        _jeans_table = (logy, numpy.log(I[:-1]))
+
+    logy, logI = _jeans_table
+    y = numpy.clip(c * x, numpy.exp(logy[0]), numpy.exp(logy[-2]))
+    I = numpy.exp(numpy.interp(numpy.log(y), logy[:-1], logI))
+    return (c / _nfw_g(c) * y * (1 + y)**2 * I)**0.5
+
+def _nfw_phase_space(u, mass, radius, conc):
+    """
+    Internal function to return the offsets of the positions and
+    velocities of satellites from their hosts, for a NFW profile,
+    from the six uniform random numbers ``u`` of each satellite.
+    """
+    from scipy.special import lambertw, ndtri
+
+    # the radius, inverting the cumulative mass profile
+    q = u[0] * _nfw_g(conc)
+    x = (-1. / lambertw(-numpy.exp(-q - 1)).real - 1) / conc
+
+    # isotropic direction
+    mu = 2 * u[1] - 1
+    phi = 2 * numpy.pi * u[2]
+    sin = (1 - mu**2)**0.5
+    r = x * radius
+    dpos = numpy.stack([r * sin * numpy.cos(phi), r * sin * numpy.sin(phi), r * mu], axis=-1)
+
+    # Gaussian velocities
+    vvir = (G * mass / radius)**0.5
+    sigma = vvir * _nfw_velocity_dispersion(x, conc)
+    dvel = numpy.stack([sigma * ndtri(u[i]) for i in range(3, 6)], axis=-1)
+
+    return dpos.reshape(-1, 3), dvel.reshape(-1, 3)
+
 def HODModelFactory(name, func_name):
     """
     Factory to generate the functions that will return one of the
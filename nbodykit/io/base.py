@@ -1,6 +1,7 @@
 from six import string_types
 import numpy
 import logging
+import os
 from abc import abstractmethod
 from nbodykit import _global_options
 
@@ -13,6 +14,10 @@ class FileType(object):
     """
     logger = logging.getLogger("FileType")
 
+    # whether the file accepts a ``comm`` keyword and should be
+    # initialized collectively on all ranks, rather than on the root only
+    parallel_init = False
+
     @abstractmethod
     def read(self, columns, start, stop, step=1):
         """
@@ -37,6 +42,30 @@ class FileType(object):
         """
         pass
 
+    def read_chunks(self, columns, chunks):
+        """
+        Read the specified column(s) over a sequence of row ranges,
+        returning the concatenation of the ranges as a single
+        structured numpy array
+
+        Subclasses can override this to coalesce the reads of nearby
+        ranges; the default calls :func:`read` once per range.
+
+        Parameters
+        ----------
+        columns : str, list of str
+            the name of the column(s) to return
+        chunks : iterable of tuple
+            the ``(start, stop, step)`` tuples to read, e.g., as
+            returned by :func:`find_slice_chunks`
+
+        Returns
+        -------
+        data : array_like
+            a numpy structured array holding the requested data
+        """
+        return numpy.concatenate([self.read(columns, *sl) for sl in chunks])
+
     @property
     def columns(self):
         """
@@ -112,6 +141,16 @@ class FileType(object):
     def __len__(self):
         return self.size
 
+    def get_chunk_size(self, column):
+        """
+        The natural length (in rows) of the on-disk chunks of ``column``,
+        or ``None`` if the file has no preferred chunking.
+
+        When set, the blocks of :func:`get_dask` are aligned to
+        multiples of this length.
+        """
+        return None
+
     def __iter__(self):
         return iter(self.keys())
 
@@ -222,7 +261,7 @@ class FileType(object):
                 s[s < 0] += len(self)
 
             # read the full desired slice in consecutive chunks
-            toret = numpy.concatenate([memown.read(self.keys(),*sl) for sl in find_slice_chunks(s)])
+            toret = memown.read_chunks(self.keys(), find_slice_chunks(s))
 
         # slice contiguous chunk via (start, stop, step)
         else:
@@ -339,6 +378,99 @@ class FileType(object):
 
         return obj
 
+    def build_zonemap(self, columns, blocksize=None, bins=None, save=True):
+        """
+        Build a zone map of the specified columns, storing the minimum and
+        maximum values (and optionally, histograms) of each block of rows,
+        and save it next to the data.
+
+        The zone map allows selections of a
+        :class:`~nbodykit.source.catalog.file.FileCatalogBase` by simple
+        range predicates, e.g., ``cat[cat['Redshift'] < 0.6]``, to only read
+        the blocks that can contain matching rows.
+
+        Parameters
+        ----------
+        columns : str, list of str
+            the names of the (scalar) columns to index
+        blocksize : int, optional
+            the number of rows in each block; default is the
+            ``dask_chunk_size`` global option, aligned to the on-disk
+            chunks of the file
+        bins : int, dict, optional
+            if given, also store a histogram of each column in each block,
+            used to balance the selected rows between ranks; either the
+            number of bins, or a dictionary of bin edges for each column
+        save : bool, optional
+            if ``True``, save the zone map to :attr:`zonemap_path`
+
+        Returns
+        -------
+        :class:`~nbodykit.io.zonemap.ZoneMap` :
+            the zone map
+        """
+        from .zonemap import ZoneMap
+
+        if isinstance(columns, string_types): columns = [columns]
+        if blocksize is None:
+            blocksize = _global_options['dask_chunk_size']
+
+        # align the blocks to the on-disk chunks
+        for col in columns:
+            align = self.get_chunk_size(col)
+            if align:
+                blocksize = max(int(blocksize) // align, 1) * align
+                break
+
+        # stamp the file before reading it, such that a file changed
+        # while building does not match
+        if save:
+            path = self.zonemap_path
+            stamp = file_stamp(self.path)
+
+        zonemap = ZoneMap.build(self, columns, int(blocksize), bins=bins)
+        if save:
+            zonemap.stamp = stamp
+            zonemap.save(path)
+        return zonemap
+
+    def get_zonemap(self):
+        """
+        Load the zone map saved by :func:`build_zonemap`, returning
+        ``None`` if no valid zone map exists for this file.
+
+        A zone map is only valid if the inode, modification time and
+        size of the file match those stored when it was built, such that
+        the zone map of a file that has been re-written is ignored.
+        """
+        from .zonemap import ZoneMap
+
+        try:
+            path = self.zonemap_path
+        except ValueError:
+            return None
+
+        if not os.path.exists(path):
+            return None
+
+        zonemap = ZoneMap.load(path)
+        if zonemap.size != self.size or zonemap.stamp != file_stamp(self.path):
+            self.logger.warning("ignoring stale zone map '%s' of a modified file; please rebuild" %path)
+            return None
+        return zonemap
+
+    @property
+    def zonemap_path(self):
+        """
+        The path of the zone map sidecar file, stored next to the data.
+        """
+        from .zonemap import sidecar_path
+
+        path = getattr(self, 'path', None)
+        if not isinstance(path, string_types):
+            raise ValueError("cannot determine the zone map path of '%s'" %self.__class__.__name__)
+        return sidecar_path(path)
+
     def get_dask(self, column, blocksize=None):
         """
         Return the specified column as a dask array, which
@@ -347,6 +479,10 @@ class FileType(object):
 
         The dask array is chunked into blocks of size `blocksize`
 
+        If the file reports an on-disk chunk length via
+        :func:`get_chunk_size`, ``blocksize`` is rounded to a multiple of
+        that length, such that each block reads whole chunks.
+
         Parameters
         ----------
         column : str
@@ -368,9 +504,27 @@ class FileType(object):
             raise ValueError("'%s' is not a valid column; run keys() for valid options" %column)
 
         import dask.array as da
-        return da.from_array(self[column], chunks=blocksize)
+        return da.from_array(self[column], chunks=self._get_dask_chunks(column, blocksize))
+
+    def _get_dask_chunks(self, column, blocksize):
+        """
+        Internal function to return the dask chunks of ``column``, aligning
+        ``blocksize`` to the on-disk chunking of the file, if any.
+        """
+        align = self.get_chunk_size(column)
+        if align:
+            blocksize = max(int(blocksize) // align, 1) * align
+        return blocksize
 
 
+def file_stamp(path):
+    """
+    Return the ``(inode, modification time, size)`` of the file ``path``,
+    which changes when the file is re-written.
+    """
+    st = os.stat(path)
+    return (st.st_ino, st.st_mtime, st.st_size)
+
 def find_slice_chunks(index):
     """
     A generator to yield (start, stop, step) tuples
@@ -391,30 +545,20 @@ def find_slice_chunks(index):
         the slice integers to read, corresponding to a valid spart of the
         selection index
     """
-    from itertools import groupby
-    from operator import itemgetter
-
     if isinstance(index, list):
         index = numpy.array(index)
 
     # handle boolean index
     if index.dtype == '?':
-        vals, N = zip(*[(k, sum(1 for i in g)) for k,g in groupby(index)])
-        N = numpy.cumsum(N)
-
-        for i, v in enumerate(vals):
-            if v:
-                ilow = i-1
-                if ilow < 0: Nlow = 0
-                else: Nlow = N[ilow]
+        index = numpy.flatnonzero(index)
 
-                yield (Nlow, N[i], 1)
+    if not len(index):
+        return
 
-    # handle integer index
-    else:
-        N = []
-        for k,g in groupby(enumerate(index), lambda x: x[0]-x[1]):
-            N.append(list(map(itemgetter(1), g)))
+    # the runs of consecutive integers
+    breaks = numpy.flatnonzero(numpy.diff(index) != 1) + 1
+    starts = index[numpy.concatenate([[0], breaks])]
+    stops = index[numpy.concatenate([breaks - 1, [len(index) - 1]])] + 1
 
-        for xx in N:
-            yield (xx[0], xx[-1]+1, 1)
+    for start, stop in zip(starts, stops):
+        yield (int(start), int(stop), 1)
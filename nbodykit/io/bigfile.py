@@ -3,6 +3,7 @@ from __future__ import absolute_import
 # import this module itself. Due to the unfortnate name conflict!
 
 import numpy
+import posixpath
 
 from .base import FileType
 from six import string_types
@@ -32,8 +33,8 @@ class BigFile(FileType):
         the data sets to exlude from loading within bigfile; default
         is the header
     header : str, optional
-        the path to the header; default is to use a column 'Header'.
-        It is relative to the file, not the dataset.
+        the path to the header, relative to the file, not the dataset;
+        default is to use a column 'Header' of the dataset.
     dataset : str
         load a specific dataset from the bigfile; default is to starting
         from the root.
@@ -53,10 +54,16 @@ class BigFile(FileType):
         # the file path
         with bigfile.BigFile(filename=path) as ff:
             columns = ff[self.dataset].blocks
+            headerpath = header
             if header is Automatic:
                 for header in ['Header', 'header', './']:
                     if header in columns: break
 
+                # the default header is in the dataset
+                headerpath = header
+                if header in columns:
+                    headerpath = posixpath.normpath(self.dataset + header)
+
             if exclude is None:
                 exclude = [header]
 
@@ -68,7 +75,7 @@ class BigFile(FileType):
             self.dtype = ds.dtype
             self.size = ds.size
 
-            header = ff[header]
+            header = ff[headerpath]
             attrs = header.attrs
 
             # copy over the attrs
@@ -151,10 +151,25 @@ class BinaryFile(FileType):
         with open(self.path, 'rb') as ff:
 
             for col in columns:
-                offset = self.offsets[col]
-                dtype = self.dtype[col]
-                ff.seek(offset, 0)
-                ff.seek(start * dtype.itemsize, 1)
-                toret[col][:] = numpy.fromfile(ff, count=stop-start, dtype=dtype)[::step]
+                toret[col][:] = self._read_column(ff, self.offsets[col], self.dtype[col], start, stop, step)
 
         return toret
+
+    def _read_column(self, ff, offset, dtype, start, stop, step):
+        """
+        Internal function to read rows ``start:stop:step`` of the column
+        of type ``dtype`` stored at the byte ``offset`` of the open file ``ff``
+
+        Strided reads are done through a memory map, such that only
+        the selected rows are read from disk.
+        """
+        if stop <= start:
+            return numpy.empty(0, dtype=dtype)
+
+        if step == 1:
+            ff.seek(offset, 0)
+            ff.seek(start * dtype.itemsize, 1)
+            return numpy.fromfile(ff, count=stop-start, dtype=dtype)
+
+        mm = numpy.memmap(ff, dtype=dtype, mode='r', offset=offset + start*dtype.itemsize, shape=(stop-start,))
+        return numpy.array(mm[::step])
@@ -1,10 +1,76 @@
 import numpy
 import os
+import threading
+from collections import OrderedDict
 from pandas import read_csv
 from six import string_types
 
 from .base import FileType
 from . import tools
+from nbodykit import _global_options
+
+class PartitionCache(object):
+    """
+    A least-recently-used record of the :class:`CSVPartition` objects
+    currently holding data in memory, bounded by the total number of bytes.
+
+    When the total size exceeds the ``csv_cache_size`` global option
+    (see :class:`~nbodykit.set_options`), the data of the least-recently
+    used partitions is released.
+    """
+    def __init__(self):
+        self.partitions = OrderedDict()
+        self.nbytes = 0
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.partitions)
+
+    def add(self, partition, attr, value, nbytes):
+        """
+        Attach ``value`` to ``partition`` as ``attr``, accounting
+        for ``nbytes`` in the cache.
+        """
+        with self.lock:
+            self.discard(partition, attr)
+            setattr(partition, attr, value)
+            self.partitions[(id(partition), attr)] = (partition, nbytes)
+            self.nbytes += nbytes
+            self.shrink()
+
+    def touch(self, partition, attr):
+        """
+        Mark the ``attr`` data of ``partition`` as most-recently used.
+        """
+        with self.lock:
+            key = (id(partition), attr)
+            if key in self.partitions:
+                self.partitions[key] = self.partitions.pop(key)
+
+    def discard(self, partition, attr):
+        """
+        Release the ``attr`` data of ``partition``, if any.
+        """
+        with self.lock:
+            item = self.partitions.pop((id(partition), attr), None)
+            if item is not None:
+                self.nbytes -= item[1]
+                partition.__dict__.pop(attr, None)
+
+    def shrink(self, size=None):
+        """
+        Release the least-recently-used data until the total is at most
+        ``size`` bytes; default is the ``csv_cache_size`` global option.
+        """
+        if size is None:
+            size = _global_options['csv_cache_size']
+        with self.lock:
+            while self.nbytes > size and len(self.partitions) > 1:
+                (_, attr), (partition, nbytes) = self.partitions.popitem(last=False)
+                self.nbytes -= nbytes
+                partition.__dict__.pop(attr, None)
+
+_partition_cache = PartitionCache()
 
 class CSVPartition(object):
     """
@@ -12,7 +78,10 @@ class CSVPartition(object):
     to a pandas DataFrame on demand
 
     The DataFrame is cached as :attr:`value`, so only a single
-    call to :func:`pandas.read_csv` is used
+    call to :func:`pandas.read_csv` is used, until the memory is
+    released by the partition cache. The raw bytes read when
+    partitioning the file are also cached, such that the block is
+    not read from disk twice.
     """
     def __init__(self, filename, offset, blocksize, delimiter, **config):
         """
@@ -35,29 +104,69 @@ class CSVPartition(object):
         self.delimiter = delimiter
         self.config    = config
 
+    def __getstate__(self):
+        # do not pickle the cached data
+        state = self.__dict__.copy()
+        state.pop('_block', None)
+        state.pop('_value', None)
+        return state
+
+    @property
+    def block(self):
+        """
+        The raw bytes of this partition
+        """
+        try:
+            _partition_cache.touch(self, '_block')
+            return self._block
+        except AttributeError:
+            from dask.bytes.utils import read_block
+
+            with open(self.filename, 'rb') as f:
+                return read_block(f, self.offset, self.blocksize, self.delimiter)
+
+    @block.setter
+    def block(self, val):
+        _partition_cache.add(self, '_block', val, len(val))
+
     @property
     def value(self):
         """
         Return the parsed btye string as a DataFrame
         """
         try:
+            _partition_cache.touch(self, '_value')
             return self._value
         except AttributeError:
             from io import BytesIO
-            from dask.bytes.utils import read_block
-
-            # read the relevant bytes
-            with open(self.filename, 'rb') as f:
-                block = read_block(f, self.offset, self.blocksize, self.delimiter)
 
             # parse the byte string
-            b = BytesIO()
-            b.write(block); b.seek(0)
-            self._value = read_csv(b, **self.config)
+            b = BytesIO(self.block)
+            value = read_csv(b, **self.config)
 
-            return self._value
+            # the raw bytes are not needed once parsed
+            _partition_cache.discard(self, '_block')
+            _partition_cache.add(self, '_value', value, value.memory_usage(index=False).sum())
+            return value
 
-def make_partitions(filename, blocksize, config, delimiter="\n"):
+def _count_block(partition, skip_blank_lines):
+    """
+    Internal function to read the bytes of ``partition`` and count
+    the number of delimiters in it, caching the raw bytes.
+
+    Returns a tuple of the number of delimiters, the number of
+    blank lines, and whether the block starts and ends with
+    the delimiter.
+    """
+    block = partition.block
+    partition.block = block
+
+    delimiter = partition.delimiter
+    nblank = block.count(delimiter+delimiter) if skip_blank_lines else 0
+    return (block.count(delimiter), nblank,
+            block.startswith(delimiter), block.endswith(delimiter))
+
+def make_partitions(filename, blocksize, config, delimiter="\n", comm=None):
     """
     Partition a CSV file into blocks, using the preferred blocksize
     in bytes, returning the partititions and number of rows in
@@ -67,6 +176,11 @@ def make_partitions(filename, blocksize, config, delimiter="\n"):
     roughly equal to blocksize, reads the bytes, and counts
     the number of delimiters to compute the size of each block
 
+    If ``comm`` is provided, the blocks are divided evenly between the
+    ranks, with each rank reading and counting the delimiters of its own
+    contiguous byte range, and the counts are exchanged with a single
+    ``allgather``. All ranks in ``comm`` must call this function.
+
     Parameters
     ----------
     filename : str
@@ -78,6 +192,8 @@ def make_partitions(filename, blocksize, config, delimiter="\n"):
         the newline character
     config : dict
         any keyword options to pass to :func:`pandas.read_csv`
+    comm : MPI Communicator, optional
+        if given, partition the file in parallel across the ranks
 
     Returns
     -------
@@ -87,8 +203,6 @@ def make_partitions(filename, blocksize, config, delimiter="\n"):
     sizes : list of int
         the list of the number of rows in each partition
     """
-    from dask.bytes.utils import read_block
-
     config = config.copy()
 
     # search for lines separated by this character
@@ -104,48 +218,76 @@ def make_partitions(filename, blocksize, config, delimiter="\n"):
     # number of rows to read
     nrows = config.pop('nrows', None)
 
-    sizes = []; partitions = []
-    with open(filename, 'rb') as f:
-        for i, offset in enumerate(offsets):
-
-            # skiprows only valid for first block
-            if i > 0 and 'skiprows' in config:
-                config.pop('skiprows')
-
-            # set nrows for this block
-            config['nrows'] = nrows
-
-            block = read_block(f, offset, blocksize, delimiter)
-            partitions.append(CSVPartition(filename, offset, blocksize, delimiter, **config))
-
-            # count delimiter to get size
-            size = block.count(delimiter)
-
-            # account for blank lines
-            if skip_blank_lines:
-                size -= block.count(delimiter+delimiter)
-                if i == 0 and block.startswith(delimiter):
-                    size -= 1
-
-            # account for skiprows
-            skiprows = config.get('skiprows', 0)
-            size -= skiprows
+    # the blocks counted on this rank
+    if comm is not None:
+        ibegin = comm.rank * len(offsets) // comm.size
+        iend = (comm.rank + 1) * len(offsets) // comm.size
+    else:
+        ibegin, iend = 0, len(offsets)
+
+    # count the delimiters of each block in the local byte range
+    counts = []
+    for offset in offsets[ibegin:iend]:
+        partition = CSVPartition(filename, offset, blocksize, delimiter)
+        counts.append((partition, _count_block(partition, skip_blank_lines)))
+
+    # exchange the counts (not the data)
+    if comm is not None:
+        allcounts = comm.allgather([c for _, c in counts])
+        allcounts = [c for rankcounts in allcounts for c in rankcounts]
+    else:
+        allcounts = [c for _, c in counts]
+    local = dict((ibegin+i, p) for i, (p, _) in enumerate(counts))
 
-            # account for nrows
-            if nrows is not None and nrows > 0:
-                if nrows < size:
-                    sizes.append(nrows)
-                    break
-                else:
-                    nrows -= size # update for next block
-
-            # manually increase size if at end of the file and no newline
-            if i == len(offsets)-1 and not block.endswith(delimiter):
-                size += 1
+    sizes = []; partitions = []
+    for i, offset in enumerate(offsets):
+
+        # skiprows only valid for first block
+        if i > 0 and 'skiprows' in config:
+            config.pop('skiprows')
+
+        # set nrows for this block
+        config['nrows'] = nrows
+
+        # re-use the partition holding the raw bytes, if we read them
+        partition = local.get(i, None)
+        if partition is None:
+            partition = CSVPartition(filename, offset, blocksize, delimiter)
+        partition.config = config.copy()
+        partitions.append(partition)
+
+        # count delimiter to get size
+        ndelim, nblank, startswith, endswith = allcounts[i]
+        size = ndelim
+
+        # account for blank lines
+        if skip_blank_lines:
+            size -= nblank
+            if i == 0 and startswith:
+                size -= 1
+
+        # account for skiprows
+        skiprows = config.get('skiprows', 0)
+        size -= skiprows
+
+        # account for nrows
+        if nrows is not None and nrows > 0:
+            if nrows < size:
+                sizes.append(nrows)
+                break
+            else:
+                nrows -= size # update for next block
 
-            sizes.append(size)
+        # manually increase size if at end of the file and no newline
+        if i == len(offsets)-1 and not endswith:
+            size += 1
 
+        sizes.append(size)
 
+    # release the raw bytes of any unused blocks
+    for i in local:
+        if i >= len(partitions):
+            _partition_cache.discard(local[i], '_block')
 
     return partitions, sizes
 
@@ -236,13 +378,25 @@ class CSVFile(FileType):
     delim_whitespace : bool, optional
         a ``pandas.read_csv`` keyword; if the CSV file is space-separated,
         set this to ``True``
+    comm : MPI Communicator, optional
+        if given, the file is partitioned in parallel by all ranks of
+        the communicator, which must all initialize the object
     **config :
         additional keyword arguments that will be passed to
         :func:`pandas.read_csv`; see the documentation of that
         function for a full list of possible options
+
+    Notes
+    -----
+    Partitions that span the requested rows are parsed concurrently
+    using a pool of ``io_threads`` threads, and parsed partitions are
+    cached in memory up to ``csv_cache_size`` bytes;
+    see :class:`~nbodykit.set_options`.
     """
+    parallel_init = True
+
     def __init__(self, path, names, blocksize=32*1024*1024, dtype={},
-                    usecols=None, delim_whitespace=True, **config):
+                    usecols=None, delim_whitespace=True, comm=None, **config):
 
         self.path      = path
         self.names     = names if usecols is None else usecols
@@ -305,7 +459,7 @@ class CSVFile(FileType):
         self.pandas_config['names'] = names
 
         # make the partitions
-        self.partitions, self._sizes = make_partitions(path, blocksize, self.pandas_config)
+        self.partitions, self._sizes = make_partitions(path, blocksize, self.pandas_config, comm=comm)
         self.size = sum(self._sizes)
 
     def read(self, columns, start, stop, step=1):
@@ -334,8 +488,7 @@ class CSVFile(FileType):
         """
         if isinstance(columns, string_types): columns = [columns]
 
-        toret = []
-        for fnum in tools.get_file_slice(self._sizes, start, stop):
+        def read_partition(fnum):
 
             # the local slice
             sl = tools.global_to_local_slice(self._sizes, start, stop, fnum)
@@ -346,6 +499,10 @@ class CSVFile(FileType):
             # slice and convert to a structured array
             data = data[sl[0]:sl[1]]
             data = data[columns]
-            toret.append(data.to_records(index=False))
+            return data.to_records(index=False)
+
+        # parse the partitions concurrently
+        fnums = tools.get_file_slice(self._sizes, start, stop)
+        toret = tools.threaded_map(read_partition, fnums)
 
         return numpy.concatenate(toret, axis=0)[::step]
@@ -195,8 +195,6 @@ class Gadget1File(BinaryFile):
                 if col == 'Mass' and self.header_mass != 0:
                     toret[col][:] = self.header_mass
                 else:
-                    ff.seek(offset, 0)
-                    ff.seek(start * dtype.itemsize, 1)
-                    toret[col][:] = numpy.fromfile(ff, count=stop-start, dtype=dtype)[::step]
+                    toret[col][:] = self._read_column(ff, offset, dtype, start, stop, step)
 
         return toret
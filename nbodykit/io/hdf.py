@@ -1,14 +1,133 @@
-from .base import FileType
+from .base import FileType, file_stamp
 from . import tools
 from six import string_types
 import numpy
 import os
-from collections import  namedtuple
+import threading
+import atexit
+import contextlib
+from collections import  namedtuple, OrderedDict
+from nbodykit import _global_options
 
 try: import h5py
 except ImportError: h5py = None
 
-ColumnInfo = namedtuple('ColumnInfo', ['size', 'dtype', 'dset'])
+ColumnInfo = namedtuple('ColumnInfo', ['size', 'dtype', 'dset', 'field', 'chunks'])
+
+class HDFFilePool(object):
+    """
+    A per-process pool of read-only :class:`h5py.File` handles, with
+    least-recently-used eviction.
+
+    Handles are keyed by the absolute path of the file, and the inode,
+    modification time and size of the file are checked on each access,
+    such that a file that has been re-written on disk is re-opened.
+
+    The maximum number of open handles is set by the ``hdf_pool_size``
+    global option; see :class:`~nbodykit.set_options`. Setting it to zero
+    disables pooling. Note that HDF5 does not allow a file to be opened
+    for writing while a read-only handle is open in the same process;
+    use :func:`close` to release pooled handles first.
+    """
+    def __init__(self):
+        self.handles = OrderedDict()
+        self.inuse = {}
+        self.pid = os.getpid()
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.handles)
+
+    def __contains__(self, path):
+        return os.path.abspath(path) in self.handles
+
+    @contextlib.contextmanager
+    def open(self, path):
+        """
+        A context manager yielding an open, read-only :class:`h5py.File`
+        for ``path``, re-using a pooled handle if possible.
+        """
+        path = os.path.abspath(path)
+
+        # pooling disabled
+        if _global_options['hdf_pool_size'] <= 0:
+            self.close()
+            with h5py.File(path, 'r') as ff:
+                yield ff
+            return
+
+        stamp = file_stamp(path)
+
+        with self.lock:
+
+            # handles do not survive a fork
+            if os.getpid() != self.pid:
+                self.handles.clear()
+                self.inuse.clear()
+                self.pid = os.getpid()
+
+            ff = None
+            if path in self.handles:
+                ff, oldstamp = self.handles.pop(path)
+                if oldstamp != stamp or not ff.id.valid:
+                    if not self.inuse.get(path, 0):
+                        self._close(ff)
+                    ff = None
+
+            if ff is None:
+                ff = h5py.File(path, 'r')
+
+            # most-recently used handles at the end
+            self.handles[path] = (ff, stamp)
+            self.inuse[path] = self.inuse.get(path, 0) + 1
+
+        try:
+            yield ff
+        finally:
+            with self.lock:
+                self.inuse[path] -= 1
+                self.shrink()
+
+    def shrink(self, size=None):
+        """
+        Close the least-recently-used handles that are not in use until
+        at most ``size`` handles are open; default is the ``hdf_pool_size``
+        global option.
+        """
+        if size is None:
+            size = _global_options['hdf_pool_size']
+
+        with self.lock:
+            for path in list(self.handles):
+                if len(self.handles) <= max(size, 0):
+                    break
+                if not self.inuse.get(path, 0):
+                    ff, stamp = self.handles.pop(path)
+                    self._close(ff)
+
+    def close(self, path=None):
+        """
+        Close the pooled handle of ``path``, or all handles if ``path``
+        is ``None``.
+        """
+        with self.lock:
+            if path is None:
+                self.shrink(0)
+            else:
+                path = os.path.abspath(path)
+                if path in self.handles and not self.inuse.get(path, 0):
+                    ff, stamp = self.handles.pop(path)
+                    self._close(ff)
+
+    @staticmethod
+    def _close(ff):
+        try:
+            ff.close()
+        except Exception:
+            pass
+
+_handle_pool = HDFFilePool()
+atexit.register(_handle_pool.close)
 
 def find_datasets(info, attrs, name, obj):
     """
@@ -24,13 +143,17 @@ def find_datasets(info, attrs, name, obj):
         # update meta-data (remember: all strings in h5py stored encoded data)
         attrs[str(name)] = {str(k):obj.attrs[k] for k in obj.attrs}
 
+        # the on-disk chunk length along the first axis
+        chunks = obj.chunks[0] if obj.chunks is not None else None
+
         # structured array
         if obj.dtype.kind == 'V':
             for col in obj.dtype.names:
                 size = len(obj)
                 dtype = obj.dtype[col]
                 key = str(os.path.join(name, col))
-                info[key] = ColumnInfo(size=size, dtype=dtype, dset=name)
+                info[key] = ColumnInfo(size=size, dtype=dtype, dset=name,
+                                        field=col, chunks=chunks)
         # normal array
         else:
             size = obj.shape[0]
@@ -39,7 +162,8 @@ def find_datasets(info, attrs, name, obj):
             if len(subshape): fmt = (fmt,) + subshape
             dtype = numpy.dtype(fmt)
             key = str(name)
-            info[key] = ColumnInfo(size=size, dtype=dtype, dset=name)
+            info[key] = ColumnInfo(size=size, dtype=dtype, dset=name,
+                                    field=None, chunks=chunks)
 
 class HDFFile(FileType):
     """
@@ -57,14 +181,32 @@ class HDFFile(FileType):
     exclude : list of str, optional
         list of path names to exclude; these can be absolute paths, or paths
         relative to ``root``
+    driver : 'mpio', optional
+        if set to ``'mpio'``, data is read with collective MPI-IO via
+        :func:`read_collective`, with each rank reading its own
+        contiguous slab of rows; this requires :mod:`h5py` to be built
+        with MPI support
+
+    Notes
+    -----
+    Open file handles are shared between reads of the same file via
+    a per-process pool; the number of handles kept open is controlled
+    by the ``hdf_pool_size`` global option. Call :func:`close` before
+    writing to the file from the same process.
     """
-    def __init__(self, path, root='/', exclude=[]):
+    def __init__(self, path, root='/', exclude=[], driver=None):
 
         if h5py is None:
             raise ImportError("please install h5py to use HDFFile")
 
+        if driver not in (None, 'mpio'):
+            raise ValueError("'driver' should be None or 'mpio', not '%s'" %driver)
+        if driver == 'mpio' and not h5py.get_config().mpi:
+            raise ValueError("h5py must be built with MPI support to use driver='mpio'")
+
         self.path = path
         self.root = root
+        self.driver = driver
         self.attrs = {}
 
         # gather dtype and size information from file
@@ -116,12 +258,20 @@ class HDFFile(FileType):
         single_structured_arr = len(unique_dsets) == 1 and len(info) > 1
 
         # construct the data type from "info"
+        # and resolve the dataset path and field of each column once
         dtype = []
+        self._datasets = {}
+        self._chunks = {}
         for col in info:
             name = col
             if single_structured_arr:
                 name = name.rsplit('/', 1)[-1]
             dtype.append((name, info[col].dtype))
+
+            dset = info[col].dset
+            dset = os.path.join(root, dset) if dset else root
+            self._datasets[name] = (dset, info[col].field)
+            self._chunks[name] = info[col].chunks
         self.dtype = numpy.dtype(dtype)
 
         # set the root properly if columns stored as single structured array
@@ -155,55 +305,95 @@ class HDFFile(FileType):
             structured array holding the requested columns over
             the specified range of rows
         """
+        with _handle_pool.open(self.path) as ff:
+            return self._read(ff, columns, start, stop, step)
+
+    def close(self):
+        """
+        Close the pooled read-only handle of this file, if any; this is
+        necessary before opening the file for writing in the same process.
+        """
+        _handle_pool.close(self.path)
+
+    @property
+    def collective(self):
+        """
+        Whether data should be read with collective MPI-IO, i.e., the
+        file was initialized with ``driver='mpio'``
+        """
+        return getattr(self, 'driver', None) == 'mpio'
+
+    def read_collective(self, columns, start, stop, comm):
+        """
+        Read the specified column(s) over the given range using collective
+        MPI-IO, where each rank in ``comm`` reads its own contiguous range.
+
+        This must be called by all ranks in ``comm``; ranks with no rows to
+        read should pass ``start == stop``.
+
+        Parameters
+        ----------
+        columns : str, list of str
+            the name of the column(s) to return
+        start : int
+            the row integer to start reading at on this rank
+        stop : int
+            the row integer to stop reading at on this rank
+        comm : MPI Communicator
+            the communicator of the ranks taking part in the read
+
+        Returns
+        -------
+        numpy.array
+            structured array holding the requested columns over
+            the specified range of rows
+        """
+        with h5py.File(self.path, 'r', driver='mpio', comm=comm) as ff:
+            return self._read(ff, columns, start, stop, 1, collective=True)
+
+    def get_chunk_size(self, column):
+        """
+        The chunk length along the first axis of the dataset holding
+        ``column``, or ``None`` if the dataset is stored contiguously
+        """
+        base = getattr(self, 'base', None)
+        owner = self if base is None else base
+        return owner._chunks.get(column, None)
+
+    def _read(self, ff, columns, start, stop, step, collective=False):
+        """
+        Internal function to read columns from the open file ``ff``.
+        """
         if isinstance(columns, string_types): columns = [columns]
 
         dt = [(col, self.dtype[col]) for col in columns]
         toret = numpy.empty(tools.get_slice_size(start, stop, step), dtype=dt)
 
-        with h5py.File(self.path, 'r') as ff:
-            # compile a list of datasets
-            dsets = {}
-
-            for col in columns:
+        # group the columns by dataset, such that
+        # columns in the same dataset are read only once.
+        # see, http://docs.h5py.org/en/latest/high/dataset.html#reading-writing-data
+        dsets = OrderedDict()
+        for col in columns:
+            name, field = self._datasets[col]
+            dsets.setdefault(name, []).append((col, field))
+
+        for name, cols in dsets.items():
+            dset = ff[name]
+            if len(cols) == 1 and cols[0][1] is None:
+                sel = slice(start, stop, step)
+            else:
+                sel = tuple([field for col, field in cols] + [slice(start, stop, step)])
 
-                # absolute name of column (with root path prepended)
-                name = os.path.join(self.root, col)
+            if collective:
+                with dset.collective:
+                    results = dset[sel]
+            else:
+                results = dset[sel]
 
-                if name in ff:
-                    # data from a h5py Dataset directly
-                    dsets[name] = [(col, None)]
-                    continue
-                else:
-                    # data from a column in a structured array
-                    splitcol = name.rsplit('/', 1)
-                    if len(splitcol) != 2:
-                        raise ValueError("error trying to access column '%s' in HDF file" %col)
-
-                    name, field = splitcol
-
-                    try:
-                        dsets[name].append((col, field))
-                    except KeyError:
-                        dsets[name] = [(col, field)]
-            # then read through the list of datasets,
-            # columns in the same dataset is read only once.
-            # see, http://docs.h5py.org/en/latest/high/dataset.html#reading-writing-data
-
-            # it is a bit ugly seems to work will see if this fixes the slowness.
-            for name, cols in dsets.items():
-                dset = ff[name]
-                if len(cols) == 1 and cols[0][1] is None:
-                    [[col, field]] = cols
-                    toret[col][:] = dset[start:stop:step]
+            for col, field in cols:
+                if len(cols) > 1:
+                    toret[col][:] = results[field]
                 else:
-                    fields = [field for col, field in cols]
-                    fields.append(slice(start, stop, step))
-                    results = dset[tuple(fields)]
-
-                    for col, field in cols:
-                        if len(cols) > 1:
-                            toret[col][:] = results[field]
-                        else:
-                            toret[col][:] = results
+                    toret[col][:] = results
 
         return toret
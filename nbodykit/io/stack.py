@@ -28,6 +28,9 @@ class FileStack(FileType):
         additional keyword arguments passed to the ``filetype`` instance
         during initialization
     """
+    # nearby ranges in a file separated by fewer rows than this
+    # are read at once by :func:`read_chunks`
+    coalesce_gap = 4096
     def __init__(self, filetype, path, *args, **kwargs):
 
         # check that filetype is subclass of FileType
@@ -66,6 +69,14 @@ class FileStack(FileType):
         else:
             return {}
 
+    @property
+    def collective(self):
+        """
+        Whether all files in the stack are read with collective MPI-IO
+        via :func:`read_collective`
+        """
+        return all(getattr(f, 'collective', False) for f in self.files)
+
     @property
     def nfiles(self):
         """
@@ -96,14 +107,218 @@ class FileStack(FileType):
         """
         if isinstance(columns, string_types): columns = [columns]
 
+        # negative step: read the equivalent increasing range and reverse
+        if step < 0:
+            N = tools.get_slice_size(start, stop, step)
+            if N <= 0:
+                return self._empty(columns)
+            return self.read(columns, start + (N-1)*step, start+1, -step)[::-1].copy()
+
+        # read each file with the proper local offset and step
+        def read_file(sl):
+            fnum, lstart, lstop = sl
+            self.logger.debug("Reading column %s [%d:%d:%d] from file %s" % (columns, lstart, lstop, step, self.files[fnum]))
+            return self.files[fnum].read(columns, lstart, lstop, step)
+
+        toret = tools.threaded_map(read_file, self._get_local_slices(start, stop, step))
+        if not len(toret):
+            return self._empty(columns)
+        return numpy.concatenate(toret, axis=0)
+
+    def read_chunks(self, columns, chunks):
+        """
+        Read the specified column(s) over a sequence of row ranges,
+        returning the concatenation of the ranges as a single
+        structured numpy array
+
+        The ranges are grouped by file, and nearby ranges in the same
+        file (separated by fewer than :attr:`coalesce_gap` rows) are
+        read with a single call to the file's ``read``. Different
+        files are read concurrently with a pool of threads.
+
+        Parameters
+        ----------
+        columns : str, list of str
+            the name of the column(s) to return
+        chunks : iterable of tuple
+            the ``(start, stop, step)`` tuples to read, e.g., as
+            returned by :func:`~nbodykit.io.base.find_slice_chunks`
+
+        Returns
+        -------
+        data : array_like
+            a numpy structured array holding the requested data
+        """
+        if isinstance(columns, string_types): columns = [columns]
+
+        # split each contiguous range into its pieces in each file;
+        # strided ranges are read on their own
+        pieces = {}
+        strided = []
+        norder = 0
+        for start, stop, step in chunks:
+            if step != 1:
+                strided.append((norder, start, stop, step))
+                norder += 1
+                continue
+            for fnum, lstart, lstop in self._get_local_slices(start, stop, step):
+                pieces.setdefault(fnum, []).append((norder, lstart, lstop))
+                norder += 1
+
+        def read_file(fnum):
+            f = self.files[fnum]
+            toret = []
+
+            # coalesce nearby ranges
+            ranges = sorted(pieces[fnum], key=lambda p: p[1])
+            i = 0
+            while i < len(ranges):
+                j = i + 1
+                lo, hi = ranges[i][1], ranges[i][2]
+                while j < len(ranges) and ranges[j][1] - hi <= self.coalesce_gap:
+                    hi = max(hi, ranges[j][2])
+                    j += 1
+                data = f.read(columns, lo, hi, 1)
+                for order, lstart, lstop in ranges[i:j]:
+                    toret.append((order, data[lstart-lo:lstop-lo]))
+                i = j
+            return toret
+
+        results = tools.threaded_map(read_file, sorted(pieces))
+        results = [r for rs in results for r in rs]
+        results += [(p[0], self.read(columns, *p[1:])) for p in strided]
+        results = sorted(results, key=lambda r: r[0])
+        if not len(results):
+            return self._empty(columns)
+        return numpy.concatenate([data for order, data in results], axis=0)
+
+    def build_zonemap(self, columns, blocksize=None, bins=None, save=True):
+        """
+        Build the zone map of each file in the stack, saving each next
+        to its file, and return the zone map of the full stack
+
+        See :func:`nbodykit.io.base.FileType.build_zonemap` for a
+        description of the parameters. When ``bins`` is the number of bins,
+        the bin edges are shared between all files.
+        """
+        from .zonemap import ZoneMap
+
+        if isinstance(columns, string_types): columns = [columns]
+
+        # use common bin edges, such that the histograms can be concatenated
+        if bins is not None and not isinstance(bins, dict):
+            zonemaps = tools.threaded_map(lambda f: f.build_zonemap(columns, blocksize, save=False), self.files)
+            zonemap = ZoneMap.concatenate(zonemaps)
+            nbins, bins = int(bins), {}
+            for col in columns:
+                lo, hi = numpy.nanmin(zonemap.mins[col]), numpy.nanmax(zonemap.maxs[col])
+                bins[col] = numpy.linspace(lo, hi, nbins+1)
+
+        zonemaps = tools.threaded_map(lambda f: f.build_zonemap(columns, blocksize, bins=bins, save=save), self.files)
+        return ZoneMap.concatenate(zonemaps)
+
+    def get_zonemap(self):
+        """
+        Return the zone map of the full stack, concatenated from the zone
+        maps of each file, or ``None`` if any file is missing a zone map.
+        """
+        from .zonemap import ZoneMap
+
+        zonemaps = [f.get_zonemap() for f in self.files]
+        if any(zm is None for zm in zonemaps):
+            return None
+        return ZoneMap.concatenate(zonemaps)
+
+    def _get_local_slices(self, start, stop, step):
+        """
+        Internal function to convert the global slice ``start:stop:step``
+        (with positive ``step``) to a list of ``(fnum, start, stop)``
+        slices local to each file, such that reading each local slice
+        with ``step`` selects the same rows.
+        """
+        cumsizes = numpy.insert(numpy.cumsum(self.sizes), 0, 0)
+
         toret = []
         for fnum in tools.get_file_slice(self.sizes, start, stop):
+            if fnum >= self.nfiles: break
+
+            # the first row in this file that lies on the stride
+            first = max(start, cumsizes[fnum])
+            first += (start - first) % step
+            last = min(stop, cumsizes[fnum+1])
+
+            if first < last:
+                toret.append((fnum, int(first - cumsizes[fnum]), int(last - cumsizes[fnum])))
+        return toret
+
+    def _empty(self, columns):
+        """
+        Internal function returning an empty structured array with ``columns``.
+        """
+        return numpy.empty(0, dtype=[(col, self.dtype[col]) for col in columns])
+
+    def read_collective(self, columns, start, stop, comm):
+        """
+        Read the specified column(s) over the given range with collective
+        MPI-IO, where each rank in ``comm`` reads its own contiguous range.
+
+        This must be called by all ranks in ``comm``, since every file
+        in the stack is opened collectively.
+
+        Parameters
+        ----------
+        columns : str, list of str
+            the name of the column(s) to return
+        start : int
+            the row integer to start reading at on this rank
+        stop : int
+            the row integer to stop reading at on this rank
+        comm : MPI Communicator
+            the communicator of the ranks taking part in the read
+
+        Returns
+        -------
+        data : array_like
+            a numpy structured array holding the requested data
+        """
+        if isinstance(columns, string_types): columns = [columns]
+
+        cumsizes = numpy.insert(numpy.cumsum(self.sizes), 0, 0)
+        toret = []
+        for fnum, f in enumerate(self.files):
+
+            # the local slice, possibly empty on this rank
+            lstart = min(max(start - cumsizes[fnum], 0), self.sizes[fnum])
+            lstop = min(max(stop - cumsizes[fnum], lstart), self.sizes[fnum])
+
+            toret.append(f.read_collective(columns, lstart, lstop, comm))
 
-            # the local slice
-            sl = tools.global_to_local_slice(self.sizes, start, stop, fnum)
+        return numpy.concatenate(toret, axis=0)
+
+    def get_chunk_size(self, column):
+        """
+        The on-disk chunk length of ``column``, if all files in the
+        stack share the same chunking
+        """
+        chunks = set(f.get_chunk_size(column) for f in self.files)
+        if len(chunks) == 1:
+            return chunks.pop()
+        return None
+
+    def _get_dask_chunks(self, column, blocksize):
+        """
+        Internal function to return the dask chunks of ``column``, where
+        the blocks in each file are aligned to the chunking of that file.
+        """
+        aligns = [f.get_chunk_size(column) for f in self.files]
+        if not any(aligns) or self.size == 0:
+            return blocksize
 
-            # read this chunk
-            toret.append(self.files[fnum].read(columns, sl[0], sl[1], step=1))
+        blocks = []
+        for align, size in zip(aligns, self.sizes):
+            bs = max(int(blocksize) // align, 1) * align if align else int(blocksize)
+            nfull, remainder = divmod(int(size), bs)
+            blocks += [bs] * nfull
+            if remainder: blocks.append(remainder)
 
-        self.logger.debug("Reading column %s [%d:%d] from file %s" % (columns, sl[0], sl[1], self))
-        return numpy.concatenate(toret, axis=0)[::step]
+        return (tuple(blocks),) + tuple((n,) for n in self[column].shape[1:])
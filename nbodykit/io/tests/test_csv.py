@@ -265,3 +265,59 @@ def test_invalid_keywords(comm):
         for k,v in bad_kws.items():
             with pytest.raises(ValueError):
                 f = CSVFile(path=ff.name, names=names, blocksize=1000, **{k:v})
+
+@MPITest([1, 4])
+def test_parallel_partitions(comm):
+
+    from nbodykit.io.csv import make_partitions
+
+    # write the data on the root
+    if comm.rank == 0:
+        tmpfile = tempfile.mkstemp()[1]
+        data = numpy.random.random(size=(100,5))
+        with open(tmpfile, 'wb') as ff:
+            numpy.savetxt(ff, data, fmt='%.7e')
+    else:
+        tmpfile = data = None
+    tmpfile = comm.bcast(tmpfile)
+    data = comm.bcast(data)
+
+    names =['a', 'b', 'c', 'd', 'e']
+    f = CSVFile(path=tmpfile, names=names, blocksize=500)
+
+    # same partitioning in serial and in parallel
+    f2 = CSVFile(path=tmpfile, names=names, blocksize=500, comm=comm)
+    assert f2.size == f.size == 100
+    assert f2._sizes == f._sizes
+    numpy.testing.assert_almost_equal(data, f2.asarray()[:], decimal=7)
+
+    # with nrows and skiprows
+    partitions, sizes = make_partitions(tmpfile, 500, dict(f.pandas_config, nrows=50, skiprows=25), comm=comm)
+    assert sum(sizes) == 50
+    assert len(partitions) == len(sizes)
+
+    comm.barrier()
+    if comm.rank == 0:
+        os.unlink(tmpfile)
+
+@MPITest([1])
+def test_partition_cache(comm):
+
+    from nbodykit.io.csv import _partition_cache
+    from nbodykit import set_options
+
+    with tempfile.NamedTemporaryFile() as ff:
+
+        # generate data
+        data = numpy.random.random(size=(100,5))
+        numpy.savetxt(ff, data, fmt='%.7e'); ff.seek(0)
+
+        names =['a', 'b', 'c', 'd', 'e']
+        with set_options(csv_cache_size=1000, io_threads=2):
+            f = CSVFile(path=ff.name, names=names, blocksize=500)
+
+            # data is re-read from disk when evicted
+            numpy.testing.assert_almost_equal(data, f.asarray()[:], decimal=7)
+            numpy.testing.assert_almost_equal(data, f.asarray()[:], decimal=7)
+            _partition_cache.shrink()
+            assert _partition_cache.nbytes <= 1000 or len(_partition_cache) == 1
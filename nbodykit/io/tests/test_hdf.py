@@ -144,4 +144,71 @@ def test_empty(comm):
         f = HDFFile(tmpfile)
     
     os.unlink(tmpfile) 
-        
\ No newline at end of file
+        
+@MPITest([1])
+@pytest.mark.skipif(h5py is None, "h5py is not installed")
+def test_handle_pool(comm):
+
+    from nbodykit.io.hdf import _handle_pool
+    from nbodykit import set_options
+
+    with temporary_data() as (data, tmpfile):
+
+        f = HDFFile(tmpfile)
+
+        # the handle is kept open between reads
+        numpy.testing.assert_almost_equal(data['Mass'], f['X/Mass'][:])
+        assert tmpfile in _handle_pool
+        numpy.testing.assert_almost_equal(data['Mass'][:10], f['Y/Mass'][:10])
+
+        # must close before writing
+        f.close()
+        assert tmpfile not in _handle_pool
+        with h5py.File(tmpfile, 'a') as ff:
+            ff['Y/Mass'][:] = 0.
+        numpy.testing.assert_equal(f['Y/Mass'][:], 0.)
+
+        # no pooling
+        f.close()
+        with set_options(hdf_pool_size=0):
+            numpy.testing.assert_almost_equal(data['Mass'], f['X/Mass'][:])
+            assert tmpfile not in _handle_pool
+
+        f.close()
+
+
+@MPITest([1])
+@pytest.mark.skipif(h5py is None, "h5py is not installed")
+def test_chunk_aligned_dask(comm):
+
+    from nbodykit.io.stack import FileStack
+
+    # generate data
+    mass = numpy.random.random(size=1000)
+
+    # write to file with chunking
+    tmpfile = tempfile.mkstemp()[1]
+    with h5py.File(tmpfile , 'w') as ff:
+        ff.create_dataset('Mass', data=mass, chunks=(64,))
+        ff.create_dataset('Position', data=numpy.random.random(size=(1000, 3)))
+
+    f = HDFFile(tmpfile)
+    assert f.get_chunk_size('Mass') == 64
+    assert f.get_chunk_size('Position') is None
+
+    # blocks are multiples of the chunk size
+    d = f.get_dask('Mass', blocksize=100)
+    assert all(c % 64 == 0 for c in d.chunks[0][:-1])
+    numpy.testing.assert_almost_equal(d.compute(), mass)
+
+    # aligned within each file of a stack
+    s = FileStack(HDFFile, [tmpfile, tmpfile])
+    d = s.get_dask('Mass', blocksize=100)
+    assert d.chunks[0] == (64, 64, 64, 64, 64, 64, 64, 64, 64, 64, 64, 64, 64, 64, 64, 40) * 2
+    numpy.testing.assert_almost_equal(d.compute(), numpy.concatenate([mass, mass]))
+
+    # no chunking
+    assert s.get_dask('Position', blocksize=100).chunks[0] == (100,) * 20
+
+    f.close()
+    os.unlink(tmpfile)
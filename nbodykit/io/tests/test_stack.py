@@ -110,3 +110,49 @@ def test_bad_path(comm):
         # bad path name
         with pytest.raises(ValueError): 
             f = FileStack(TPMBinaryFile, ff, precision='f4')
+
+
+@MPITest([1])
+def test_strided_and_index_reads(comm):
+
+    with TemporaryDirectory() as tmpdir:
+
+        # generate TPM-format data in files of different sizes
+        sizes = [100, 0, 250, 7, 643]
+        pos = numpy.random.random(size=(1000, 3)).astype('f4')
+        vel = numpy.random.random(size=(1000, 3)).astype('f4')
+        uid = numpy.arange(1000, dtype='u8')
+        hdr = numpy.ones(28, dtype='?')
+
+        offset = 0
+        for i, size in enumerate(sizes):
+            sl = slice(offset, offset+size)
+            offset += size
+
+            # write to file
+            fname = os.path.join(tmpdir, 'tpm.%03d' %i)
+            with open(fname, 'wb') as ff:
+                hdr.tofile(ff)
+                pos[sl].tofile(ff); vel[sl].tofile(ff); uid[sl].tofile(ff)
+
+        # initialize the stack
+        path = os.path.join(tmpdir, 'tpm.00*')
+        f = FileStack(TPMBinaryFile, path, precision='f4')
+        assert f.size == 1000
+
+        # strided slices across file boundaries
+        for sl in [slice(3, 900, 7), slice(None, None, 100), slice(None, None, -1),
+                    slice(950, 10, -13), slice(5, 5), slice(999, None)]:
+            numpy.testing.assert_equal(uid[sl], f['ID'][sl])
+            numpy.testing.assert_almost_equal(pos[sl], f['Position'][sl])
+
+        # boolean and integer index arrays
+        index = numpy.random.random(size=1000) < 0.3
+        numpy.testing.assert_equal(uid[index], f['ID'][index])
+        index = numpy.array([5, 3, 999, 100, 101, 102])
+        numpy.testing.assert_equal(uid[index], f['ID'][index])
+
+        # without coalescing
+        f.coalesce_gap = 0
+        index = numpy.random.random(size=1000) < 0.5
+        numpy.testing.assert_almost_equal(vel[index], f['Velocity'][index])
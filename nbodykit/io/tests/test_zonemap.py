@@ -0,0 +1,77 @@
+from runtests.mpi import MPITest
+from nbodykit.io.binary import BinaryFile
+from nbodykit.io.stack import FileStack
+from nbodykit.io.zonemap import ZoneMap, evaluate
+import numpy
+import tempfile
+import os
+import shutil
+import pytest
+
+@MPITest([1])
+def test_build_and_load(comm):
+
+    tmpdir = tempfile.mkdtemp()
+
+    # sorted redshifts spread over two files
+    z = numpy.sort(numpy.random.random(size=1000))
+    mass = numpy.random.random(size=1000)
+    paths = []
+    for i in range(2):
+        path = os.path.join(tmpdir, 'data.%d' %i)
+        with open(path, 'wb') as ff:
+            z[i*500:(i+1)*500].tofile(ff)
+            mass[i*500:(i+1)*500].tofile(ff)
+        paths.append(path)
+
+    f = FileStack(BinaryFile, paths, dtype=[('Redshift', 'f8'), ('Mass', 'f8')])
+
+    # no zone map yet
+    assert f.get_zonemap() is None
+
+    zonemap = f.build_zonemap(['Redshift', 'Mass'], blocksize=64, bins=10)
+    assert zonemap.size == 1000
+    assert zonemap.nblocks == 16 # blocks do not span files
+    assert zonemap.hists['Redshift'][1].sum() == 1000
+
+    # the saved zone map
+    zonemap2 = f.get_zonemap()
+    numpy.testing.assert_equal(zonemap.bounds, zonemap2.bounds)
+    numpy.testing.assert_equal(zonemap.mins['Mass'], zonemap2.mins['Mass'])
+    numpy.testing.assert_equal(zonemap.hists['Redshift'][1], zonemap2.hists['Redshift'][1])
+
+    # all matching rows are in the surviving blocks
+    predicate = (('Redshift', '>=', 0.1), ('Redshift', '<', 0.3))
+    mask = zonemap.prune(predicate)
+    assert mask.sum() < zonemap.nblocks
+
+    index = evaluate(predicate, {'Redshift':z})
+    block = numpy.searchsorted(zonemap.bounds, numpy.arange(1000), side='right') - 1
+    assert mask[block[index]].all()
+    assert zonemap.estimate_counts(predicate).sum() >= index.sum()
+
+    # a file re-written with the same size invalidates the zone map
+    with open(paths[1], 'wb') as ff:
+        z[:500].tofile(ff)
+        mass[:500].tofile(ff)
+    st = os.stat(paths[1])
+    os.utime(paths[1], (st.st_atime, st.st_mtime + 10))
+    assert f.get_zonemap() is None
+
+    # until it is rebuilt
+    f.build_zonemap(['Redshift'], blocksize=64)
+    assert f.get_zonemap() is not None
+
+    shutil.rmtree(tmpdir)
+
+@MPITest([1])
+def test_vector_column(comm):
+
+    with tempfile.NamedTemporaryFile() as ff:
+
+        numpy.random.random(size=(100, 3)).tofile(ff); ff.flush()
+        f = BinaryFile(ff.name, dtype=[('Position', ('f8', 3))])
+
+        # only scalar columns
+        with pytest.raises(ValueError):
+            f.build_zonemap('Position', save=False)
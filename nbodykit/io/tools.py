@@ -1,4 +1,5 @@
 import numpy
+from nbodykit import _global_options
 
 def get_slice_size(start, stop, step):
     """
@@ -78,4 +79,39 @@ def get_file_slice(sizes, start, stop):
     
     # return the relevant file numbers
     fnums = numpy.searchsorted(cumsizes[1:], [start, stop])
-    return list(range(fnums[0], fnums[1]+1))
\ No newline at end of file
+    return list(range(fnums[0], fnums[1]+1))
+
+def threaded_map(func, items, nthreads=None):
+    """
+    Apply ``func`` to each of ``items`` using a pool of threads,
+    returning the list of results in the order of ``items``
+
+    Parameters
+    ----------
+    func : callable
+        the function to apply
+    items : list
+        the list of arguments to apply ``func`` to
+    nthreads : int, optional
+        the number of threads to use; default is the ``io_threads``
+        global option
+
+    Returns
+    -------
+    results : list
+        the list of ``func(item)`` for each item
+    """
+    items = list(items)
+    if nthreads is None:
+        nthreads = _global_options['io_threads']
+    nthreads = min(nthreads, len(items))
+
+    if nthreads <= 1:
+        return [func(item) for item in items]
+
+    from multiprocessing.pool import ThreadPool
+    pool = ThreadPool(nthreads)
+    try:
+        return pool.map(func, items)
+    finally:
+        pool.close()
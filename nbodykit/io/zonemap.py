@@ -0,0 +1,266 @@
+import numpy
+import operator
+import os
+
+# the comparison operators supported in range predicates
+OPERATORS = {'<' : operator.lt, '<=' : operator.le,
+             '>' : operator.gt, '>=' : operator.ge}
+
+class ZoneMap(object):
+    """
+    A columnar index storing the minimum and maximum values (and optionally,
+    a histogram) of selected columns of a file in consecutive blocks of rows.
+
+    A zone map allows range predicates, e.g., ``Redshift < 0.6``, to skip
+    the blocks of rows that cannot contain any matching rows. Zone maps are
+    built once with :func:`~nbodykit.io.base.FileType.build_zonemap` and
+    stored next to the data as a sidecar file.
+
+    Parameters
+    ----------
+    bounds : array_like
+        the ``nblocks+1`` row boundaries of the blocks
+    mins : dict
+        dictionary holding the array of the minimum value of each
+        block, for each column
+    maxs : dict
+        dictionary holding the array of the maximum value of each
+        block, for each column
+    hists : dict, optional
+        dictionary holding a tuple of ``(edges, counts)`` for each column,
+        where ``counts`` has shape ``(nblocks, len(edges)-1)``
+    stamp : tuple, optional
+        the ``(inode, modification time, size)`` of the file when the zone
+        map was built; see :func:`~nbodykit.io.base.file_stamp`
+    """
+    def __init__(self, bounds, mins, maxs, hists={}, stamp=None):
+
+        self.bounds = numpy.asarray(bounds, dtype='i8')
+        self.mins = dict((col, numpy.asarray(mins[col])) for col in mins)
+        self.maxs = dict((col, numpy.asarray(maxs[col])) for col in maxs)
+        self.hists = dict(hists)
+        self.stamp = stamp
+
+        if set(self.mins) != set(self.maxs):
+            raise ValueError("mismatch between the columns of 'mins' and 'maxs'")
+        for col in self.columns:
+            if len(self.mins[col]) != self.nblocks or len(self.maxs[col]) != self.nblocks:
+                raise ValueError("size mismatch between 'bounds' and zone map of column '%s'" %col)
+
+    def __repr__(self):
+        return "ZoneMap(size=%d, nblocks=%d, columns=%s)" %(self.size, self.nblocks, str(self.columns))
+
+    @property
+    def columns(self):
+        """
+        The names of the columns in the zone map.
+        """
+        return sorted(self.mins)
+
+    @property
+    def nblocks(self):
+        """
+        The number of blocks of rows.
+        """
+        return len(self.bounds) - 1
+
+    @property
+    def size(self):
+        """
+        The total number of rows covered by the zone map.
+        """
+        return int(self.bounds[-1])
+
+    @classmethod
+    def build(cls, f, columns, blocksize, bins=None):
+        """
+        Build the zone map of a :class:`~nbodykit.io.base.FileType` by
+        reading ``columns`` in blocks of ``blocksize`` rows.
+
+        Parameters
+        ----------
+        f : FileType
+            the file object to build the zone map of
+        columns : list of str
+            the names of the scalar columns to index
+        blocksize : int
+            the number of rows in each block
+        bins : int, dict, optional
+            if given, also store a histogram of each column in each block;
+            either the number of bins (spanning the range of the column), or
+            a dictionary giving the bin edges for each column
+
+        Returns
+        -------
+        ZoneMap :
+            the zone map of ``f``
+        """
+        for col in columns:
+            if f.dtype[col].shape:
+                raise ValueError("zone maps can only be built for scalar columns; '%s' is a vector" %col)
+
+        bounds = numpy.append(numpy.arange(0, f.size, blocksize), f.size)
+        if f.size == 0: bounds = numpy.array([0])
+        nblocks = len(bounds) - 1
+
+        mins = dict((col, numpy.empty(nblocks, dtype=f.dtype[col])) for col in columns)
+        maxs = dict((col, numpy.empty(nblocks, dtype=f.dtype[col])) for col in columns)
+        for i in range(nblocks):
+            data = f.read(columns, bounds[i], bounds[i+1])
+            for col in columns:
+                mins[col][i], maxs[col][i] = _nanminmax(data[col])
+
+        # the histograms need a second pass, once the edges are known
+        hists = {}
+        if bins is not None:
+            edges = {}
+            for col in columns:
+                if isinstance(bins, dict):
+                    edges[col] = numpy.asarray(bins[col])
+                else:
+                    lo, hi = _nanminmax(mins[col])[0], _nanminmax(maxs[col])[1]
+                    if not numpy.isfinite(lo) or not numpy.isfinite(hi): lo, hi = 0., 1.
+                    edges[col] = numpy.linspace(lo, hi, int(bins)+1)
+                hists[col] = (edges[col], numpy.zeros((nblocks, len(edges[col])-1), dtype='i8'))
+
+            for i in range(nblocks):
+                data = f.read(columns, bounds[i], bounds[i+1])
+                for col in columns:
+                    hists[col][1][i] = numpy.histogram(data[col], bins=edges[col])[0]
+
+        return cls(bounds, mins, maxs, hists=hists)
+
+    @classmethod
+    def concatenate(cls, zonemaps):
+        """
+        Concatenate the zone maps of consecutive files, e.g., the
+        files of a :class:`~nbodykit.io.stack.FileStack`.
+
+        Only columns present in all zone maps are kept; histograms are only
+        kept if they share the same bin edges.
+        """
+        columns = set.intersection(*[set(zm.columns) for zm in zonemaps])
+
+        offsets = numpy.cumsum([0] + [zm.size for zm in zonemaps])
+        bounds = numpy.concatenate([[0]] + [zm.bounds[1:] + offset for zm, offset in zip(zonemaps, offsets)])
+
+        mins = dict((col, numpy.concatenate([zm.mins[col] for zm in zonemaps])) for col in columns)
+        maxs = dict((col, numpy.concatenate([zm.maxs[col] for zm in zonemaps])) for col in columns)
+
+        hists = {}
+        for col in columns:
+            if not all(col in zm.hists for zm in zonemaps):
+                continue
+            edges = zonemaps[0].hists[col][0]
+            if all(numpy.array_equal(zm.hists[col][0], edges) for zm in zonemaps):
+                hists[col] = (edges, numpy.concatenate([zm.hists[col][1] for zm in zonemaps], axis=0))
+
+        return cls(bounds, mins, maxs, hists=hists)
+
+    def save(self, filename):
+        """
+        Save the zone map to a ``.npz`` file.
+        """
+        data = {'bounds' : self.bounds}
+        for col in self.columns:
+            data['min/' + col] = self.mins[col]
+            data['max/' + col] = self.maxs[col]
+        for col in self.hists:
+            data['edges/' + col] = self.hists[col][0]
+            data['counts/' + col] = self.hists[col][1]
+        if self.stamp is not None:
+            data['stamp'] = numpy.array([self.stamp], dtype=[('ino', 'u8'), ('mtime', 'f8'), ('size', 'u8')])
+
+        with open(filename, 'wb') as ff:
+            numpy.savez(ff, **data)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Load a zone map from a ``.npz`` file written by :func:`save`.
+        """
+        with numpy.load(filename) as ff:
+            mins, maxs, edges, counts = {}, {}, {}, {}
+            for key in ff.files:
+                if key in ['bounds', 'stamp']: continue
+                kind, col = key.split('/', 1)
+                {'min':mins, 'max':maxs, 'edges':edges, 'counts':counts}[kind][col] = ff[key]
+            hists = dict((col, (edges[col], counts[col])) for col in edges)
+            stamp = tuple(ff['stamp'][0].tolist()) if 'stamp' in ff.files else None
+            return cls(ff['bounds'], mins, maxs, hists=hists, stamp=stamp)
+
+    def prune(self, predicate):
+        """
+        Return a boolean array selecting the blocks that may contain
+        rows satisfying ``predicate``.
+
+        Parameters
+        ----------
+        predicate : list of tuple
+            the list of ``(column, op, value)`` terms, combined with a
+            logical and, where ``op`` is one of ``<``, ``<=``, ``>``, ``>=``
+        """
+        mask = numpy.ones(self.nblocks, dtype='?')
+        for col, op, value in predicate:
+            if op in ('<', '<='):
+                mask &= OPERATORS[op](self.mins[col], value)
+            else:
+                mask &= OPERATORS[op](self.maxs[col], value)
+        return mask
+
+    def estimate_counts(self, predicate):
+        """
+        Return an estimate of the number of rows in each block that
+        satisfy ``predicate``, using the histograms if available,
+        and the size of the blocks otherwise.
+
+        The estimate from each histogram includes all bins that overlap
+        the range of the predicate, and the smallest estimate among the
+        terms of the predicate is used.
+        """
+        counts = numpy.diff(self.bounds)
+        for col, op, value in predicate:
+            if col not in self.hists: continue
+            edges, hist = self.hists[col]
+            if op in ('<', '<='):
+                overlap = edges[:-1] <= value
+            else:
+                overlap = edges[1:] >= value
+            counts = numpy.minimum(counts, hist[:, overlap].sum(axis=-1))
+        return counts * self.prune(predicate)
+
+def evaluate(predicate, data):
+    """
+    Evaluate the boolean index of the rows of ``data`` satisfying ``predicate``.
+
+    Parameters
+    ----------
+    predicate : list of tuple
+        the list of ``(column, op, value)`` terms, combined with a
+        logical and
+    data : dict
+        dictionary holding the array of values for each column
+        in ``predicate``
+    """
+    index = True
+    for col, op, value in predicate:
+        index = index & OPERATORS[op](data[col], value)
+    return index
+
+def sidecar_path(path):
+    """
+    The path of the zone map stored next to the data at ``path``.
+    """
+    return os.path.abspath(path).rstrip(os.sep) + '.zonemap.npz'
+
+def _nanminmax(x):
+    """
+    Internal function to return the minimum and maximum of ``x``, ignoring NaN.
+    """
+    if not len(x):
+        x = numpy.array([numpy.nan])
+    if numpy.issubdtype(x.dtype, numpy.floating):
+        if numpy.isnan(x).all():
+            return numpy.nan, numpy.nan
+        return numpy.nanmin(x), numpy.nanmax(x)
+    return x.min(), x.max()
@@ -4,11 +4,89 @@ from mpi4py import MPI
 
 from pmesh.pm import RealField, ComplexField
 from nbodykit.meshtools import SlabIterator
-from nbodykit.utils import GatherArray, ScatterArray
+from nbodykit import _global_options
+from nbodykit.utils import uniform_from_counter, poisson_from_uniform
+
+def _shell_table(pm, linear_power):
+    """
+    Internal function to return the power at the norm of the wavevectors
+    of each integer shell :math:`n^2 = |k / k_f|^2` of the mesh of ``pm``,
+    up to the largest shell of the mesh, or ``None`` if the shells are
+    not used.
+
+    The shells are used if the ``power_mesh_shells`` option is set and
+    the fundamental wavenumber :math:`k_f` is the same along all axes.
+    The table is the same on all ranks, and its evaluation is divided
+    between the ranks.
+    """
+    kf = 2 * numpy.pi / numpy.asarray(pm.BoxSize, dtype='f8')
+    if not _global_options['power_mesh_shells'] or not numpy.allclose(kf, kf[0]):
+        return None
+
+    n2max = int(sum((int(N) // 2)**2 for N in pm.Nmesh))
+    comm = pm.comm
+    lo = (n2max + 1) * comm.rank // comm.size
+    hi = (n2max + 1) * (comm.rank + 1) // comm.size
+    power = numpy.asarray(linear_power(numpy.arange(lo, hi)**0.5 * kf[0]), dtype='f8')
+    return numpy.concatenate(comm.allgather(power))
+
+def _power_on_mesh(linear_power, kslab, BoxSize, table=None):
+    """
+    Internal function to evaluate ``linear_power`` at the norm of the
+    wavevectors ``kslab`` of a slab of a mesh with size ``BoxSize``,
+    or to look up the power of their shell in ``table``, as returned by
+    :func:`_shell_table`.
+    """
+    if table is not None:
+        kf = 2 * numpy.pi / BoxSize[0]
+        n2 = sum(numpy.rint(kk / kf).astype('i8')**2 for kk in kslab)
+        return table[n2]
+
+    k2 = sum(kk**2 for kk in kslab)
+    return linear_power((k2**0.5).flatten()).reshape(k2.shape)
+
+class LinearTransfer(object):
+    r"""
+    The factor :math:`(P(k) / V)^{1/2}` that scales complex white noise
+    to a Gaussian overdensity field with power spectrum :math:`P(k)`,
+    evaluated once on the Fourier-space mesh of ``pm``.
+
+    This can be passed to :func:`gaussian_complex_fields` to generate
+    many realizations with the same power spectrum and mesh, without
+    evaluating the power spectrum on the mesh again.
+
+    Parameters
+    ----------
+    pm : pmesh.pm.ParticleMesh
+        the mesh object
+    linear_power : callable
+        a function taking wavenumber as its only argument, which returns
+        the linear power spectrum
+    """
+    def __init__(self, pm, linear_power):
+
+        self.pm = pm
+
+        # volume factor needed for normalization
+        norm = 1.0 / pm.BoxSize.prod()
+
+        table = _shell_table(pm, linear_power)
+        field = pm.create(mode='complex')
+        for kslab, slab in zip(field.slabs.x, field.slabs):
+
+            # the norm of k on the mesh
+            k = sum(kk**2 for kk in kslab)**0.5
+
+            # the linear power (function of k), zero at k == 0
+            power = _power_on_mesh(linear_power, kslab, pm.BoxSize, table)
+            slab[...] = numpy.where(k == 0., 0., (power*norm)**0.5)
+
+        # the local values, in the layout of the complex fields of pm
+        self.value = field.value.real.copy()
 
 def gaussian_complex_fields(pm, linear_power, seed,
             unitary_amplitude=False, inverted_phase=False,
-            compute_displacement=False):
+            compute_displacement=False, transfer=None):
     r"""
     Make a Gaussian realization of a overdensity field, :math:`\delta(x)`.
 
@@ -65,6 +143,9 @@ def gaussian_complex_fields(pm, linear_power, seed,
         if ``True``, the seed gaussian has unitary_amplitude.
     inverted_phase: bool, optional
         if ``True``, the phase of the seed gaussian is inverted
+    transfer : LinearTransfer, optional
+        the factor :math:`(P(k) / V)^{1/2}` precomputed on the mesh ``pm``;
+        if given, ``linear_power`` is not evaluated
 
     Returns
     -------
@@ -90,6 +171,9 @@ def gaussian_complex_fields(pm, linear_power, seed,
     else:
         disp_k = None
 
+    if transfer is not None and transfer.pm is not pm:
+        raise ValueError("the mesh of the precomputed transfer does not match `pm`")
+
     # volume factor needed for normalization
     norm = 1.0 / pm.BoxSize.prod()
 
@@ -98,6 +182,12 @@ def gaussian_complex_fields(pm, linear_power, seed,
     if compute_displacement:
         slabs += [d.slabs for d in disp_k]
 
+    # multiply complex field by the precomputed sqrt of power
+    if transfer is not None:
+        delta_k.value[...] *= transfer.value
+    else:
+        table = _shell_table(pm, linear_power)
+
     # loop over the mesh, slab by slab
     for islabs in zip(*slabs):
         kslab, delta_slab = islabs[:2] # the k arrays and delta slab
@@ -105,11 +195,11 @@ def gaussian_complex_fields(pm, linear_power, seed,
         # the square of the norm of k on the mesh
         k2 = sum(kk**2 for kk in kslab)
 
-        # the linear power (function of k)
-        power = linear_power((k2**0.5).flatten())
-
         # multiply complex field by sqrt of power
-        delta_slab[...].flat *= (power*norm)**0.5
+        if transfer is None:
+            # the linear power (function of k)
+            power = _power_on_mesh(linear_power, kslab, pm.BoxSize, table)
+            delta_slab[...] *= (power*norm)**0.5
 
         # set k == 0 to zero (zero config-space mean)
         zero_idx = k2 == 0.
@@ -131,7 +221,8 @@ def gaussian_complex_fields(pm, linear_power, seed,
 
 def gaussian_real_fields(pm, linear_power, seed,
                 unitary_amplitude=False,
-                inverted_phase=False, compute_displacement=False):
+                inverted_phase=False, compute_displacement=False,
+                transfer=None):
     r"""
     Make a Gaussian realization of a overdensity field in
     real-space :math:`\delta(x)`.
@@ -161,6 +252,9 @@ def gaussian_real_fields(pm, linear_power, seed,
         if ``True``, the seed gaussian has unitary_amplitude.
     inverted_phase: bool, optional
         if ``True``, the phase of the seed gaussian is inverted
+    transfer : LinearTransfer, optional
+        the factor :math:`(P(k) / V)^{1/2}` precomputed on the mesh ``pm``;
+        if given, ``linear_power`` is not evaluated
 
     Returns
     -------
@@ -173,7 +267,8 @@ def gaussian_real_fields(pm, linear_power, seed,
     delta_k, disp_k = gaussian_complex_fields(pm, linear_power, seed,
                             inverted_phase=inverted_phase,
                             unitary_amplitude=unitary_amplitude,
-                            compute_displacement=compute_displacement)
+                            compute_displacement=compute_displacement,
+                            transfer=transfer)
 
     # FFT the density to real-space
     delta = delta_k.c2r()
@@ -216,7 +311,7 @@ def lognormal_transform(density, bias=1.):
     """
     toret = density.copy()
     toret[:] = numpy.exp(bias * density.value)
-    toret[:] /= numpy.mean(toret)
+    toret[:] /= toret.cmean()
     return toret
 
 
@@ -231,6 +326,11 @@ def poisson_sample_to_points(delta, displacement, pm, nbar, bias=1., seed=None,
     #.  Disribute the positions of particles uniformly within the mesh cells,
         and assign the displacement field at each cell to the particles
 
+    The sampling is done in parallel on the local cells of each rank, with
+    a counter-based random generator keyed on ``seed`` and the global index
+    of each cell, such that the same particles are generated for any number
+    of ranks, and the random numbers of different cells are independent.
+
     Parameters
     ----------
     delta : RealField
@@ -243,6 +343,8 @@ def poisson_sample_to_points(delta, displacement, pm, nbar, bias=1., seed=None,
         apply a linear bias to the overdensity field (default is 1.)
     seed : int, optional
         the random seed used to Poisson sample the field to points
+    comm : MPI communicator, optional
+        the MPI communicator; default is ``MPI.COMM_WORLD``
 
     Returns
     -------
@@ -255,8 +357,10 @@ def poisson_sample_to_points(delta, displacement, pm, nbar, bias=1., seed=None,
     if comm is None:
         comm = MPI.COMM_WORLD
 
-    # create a random state with the input seed
-    rng = numpy.random.RandomState(seed)
+    # all ranks need the same seed
+    if seed is None:
+        seed = numpy.random.randint(0, 4294967295) if comm.rank == 0 else None
+        seed = comm.bcast(seed)
 
     # apply the lognormal transformation to the initial conditions density
     # this creates a positive-definite delta (necessary for Poisson sampling)
@@ -269,20 +373,25 @@ def poisson_sample_to_points(delta, displacement, pm, nbar, bias=1., seed=None,
 
     # number of objects in each cell (per rank)
     cellmean = delta.value*overallmean
-    cellmean = GatherArray(cellmean.flatten(), comm, root=0)
-
-    # rank 0 computes the poisson sampling
-    if comm.rank == 0:
-        N = rng.poisson(cellmean)
-    else:
-        N = None
 
-    # scatter N back evenly across the ranks
-    counts = comm.allgather(delta.value.size)
-    N = ScatterArray(N, comm, root=0, counts=counts).reshape(delta.shape)
+    # the random numbers are keyed on the global index of the cells
+    Nmesh = numpy.array(delta.Nmesh)
+    cells = numpy.indices(delta.value.shape).reshape(delta.ndim, -1)
+    cells = numpy.ravel_multi_index(tuple(cells + numpy.array(delta.start)[:, None]), Nmesh)
+    cells = cells.astype('u8')
+
+    # the number of objects in each cell (counter 0), and their offsets
+    # in the cell (counters 1 + ndim * j + d for the object j of the cell)
+    N = poisson_from_uniform(cellmean.ravel(), uniform_from_counter(seed, cells, 0))
+    start = numpy.cumsum(N) - N
+    j = numpy.arange(N.sum()) - numpy.repeat(start, N)
+    cell = numpy.repeat(cells, N)
+    in_cell_shift = numpy.stack([uniform_from_counter(seed, cell, 1 + delta.ndim * j + d)
+                                    for d in range(delta.ndim)], axis=-1)
+    in_cell_shift = (in_cell_shift * H).astype(delta.dtype)
+    N = N.reshape(delta.shape)
 
     Nlocal = N.sum() # local number of particles
-    Ntot = comm.allreduce(Nlocal) # the collective number of particles
     nonzero_cells = N.nonzero() # indices of nonzero cells
 
     # initialize the mesh of particle positions and displacement
@@ -299,18 +408,6 @@ def poisson_sample_to_points(delta, displacement, pm, nbar, bias=1., seed=None,
         # displacements for each particle
         disp_mesh[i] = displacement[i][nonzero_cells]
 
-    # rank 0 computes the in-cell uniform offsets
-    if comm.rank == 0:
-        in_cell_shift = numpy.empty((Ntot, delta.ndim), dtype=delta.dtype)
-        for i in range(delta.ndim):
-            in_cell_shift[:,i] = rng.uniform(0, H[i], size=Ntot)
-    else:
-        in_cell_shift = None
-
-    # scatter the in-cell uniform offsets back to the ranks
-    counts = comm.allgather(Nlocal)
-    in_cell_shift = ScatterArray(in_cell_shift, comm, root=0, counts=counts)
-
     # initialize the output array of particle positions and displacement
     # this has shape: (local number of particles, number of dimensions)
     pos = numpy.zeros((Nlocal, delta.ndim), dtype=delta.dtype)
@@ -6,12 +6,14 @@ from .file import HDFCatalog
 from .file import TPMBinaryCatalog
 from .file import FITSCatalog
 from .file import Gadget1Catalog
+from .spatial import SpatialBigFileCatalog
 
 from .array import ArrayCatalog
-from .lognormal import LogNormalCatalog
+from .lognormal import LogNormalCatalog, LogNormalEnsemble
 from .uniform import UniformCatalog, RandomCatalog
 from .fkp import FKPCatalog
 from .halos import HaloCatalog
+from .lightcone import LightConeCatalog
 from .species import MultipleSpeciesCatalog
 
 __all__ = ['CSVCatalog',
@@ -21,9 +23,11 @@ __all__ = ['CSVCatalog',
            'TPMBinaryCatalog',
            'FITSCatalog',
            'Gadget1Catalog',
+           'SpatialBigFileCatalog',
            'ArrayCatalog',
-           'LogNormalCatalog',
+           'LogNormalCatalog', 'LogNormalEnsemble',
            'UniformCatalog', 'RandomCatalog',
            'FKPCatalog',
            'HaloCatalog',
+           'LightConeCatalog',
            'MultipleSpeciesCatalog']
@@ -1,10 +1,12 @@
 from nbodykit.base.catalog import CatalogSource
 from nbodykit.io.stack import FileStack
-from nbodykit import CurrentMPIComm
+from nbodykit.io.base import find_slice_chunks
+from nbodykit import CurrentMPIComm, _global_options
 from nbodykit import io
 from nbodykit.extern import docrep
 
 from six import string_types
+import numpy
 import textwrap
 import os
 
@@ -40,12 +42,16 @@ class FileCatalogBase(CatalogSource):
         self.comm = comm
         self.filetype = filetype
 
-        # bcast the FileStack
-        if self.comm.rank == 0:
-            self._source = FileStack(filetype, *args, **kwargs)
+        # initialize the FileStack on all ranks if supported;
+        # otherwise bcast the FileStack from the root
+        if filetype.parallel_init:
+            self._source = FileStack(filetype, *args, comm=self.comm, **kwargs)
         else:
-            self._source = None
-        self._source = self.comm.bcast(self._source)
+            if self.comm.rank == 0:
+                self._source = FileStack(filetype, *args, **kwargs)
+            else:
+                self._source = None
+            self._source = self.comm.bcast(self._source)
 
         # compute the size
         start = self.comm.rank * self._source.size // self.comm.size
@@ -70,6 +76,98 @@ class FileCatalogBase(CatalogSource):
             args = (name, self.size, self._source.nfiles)
             return "%s(size=%d, nfiles=%d)" % args
 
+    def __getitem__(self, sel):
+        """
+        Column and slice access, as in
+        :func:`~nbodykit.base.catalog.CatalogSourceBase.__getitem__`.
+
+        If the selection is a range predicate on columns in the file,
+        e.g., ``cat[(cat['Redshift'] > 0.4) & (cat['Redshift'] < 0.6)]``, and
+        the file has a zone map of these columns (see
+        :func:`~nbodykit.io.base.FileType.build_zonemap`), only the blocks
+        of rows that can satisfy the predicate are read, and the returned
+        catalog is partitioned across ranks by the surviving blocks.
+        """
+        predicate = getattr(sel, 'predicate', None)
+        if predicate and self._can_pushdown(sel):
+            zonemap = self._get_zonemap()
+            if zonemap is not None and all(col in zonemap.columns for col, _, _ in predicate):
+                return self._select_blocks(zonemap, predicate)
+
+        return CatalogSource.__getitem__(self, sel)
+
+    def _can_pushdown(self, sel):
+        """
+        Internal function to check whether the selection ``sel`` can be
+        evaluated by reading only blocks of the file.
+
+        This is only valid for an unmodified file catalog, where all columns
+        are read from the file using the default partitioning.
+        """
+        if self.base is not None or len(self._overrides):
+            return False
+        if getattr(sel, 'catalog', None) is not self:
+            return False
+        return all(col in self._source.dtype.names for col, _, _ in sel.predicate)
+
+    def _get_zonemap(self):
+        """
+        Internal function to return the zone map of the file source,
+        loaded on the root and broadcast; ``None`` if not available.
+        """
+        try:
+            return self._zonemap
+        except AttributeError:
+            zonemap = self._source.get_zonemap() if self.comm.rank == 0 else None
+            self._zonemap = self.comm.bcast(zonemap)
+            return self._zonemap
+
+    def _select_blocks(self, zonemap, predicate):
+        """
+        Internal function to select the rows satisfying ``predicate``,
+        reading only the blocks of the file allowed by ``zonemap``.
+        """
+        import dask.array as da
+        from nbodykit.io.zonemap import evaluate
+
+        # the blocks that can match, and the estimated matches per block
+        mask = zonemap.prune(predicate)
+        counts = zonemap.estimate_counts(predicate)[mask].astype('f8')
+        starts = zonemap.bounds[:-1][mask]
+        stops = zonemap.bounds[1:][mask]
+        if counts.sum() == 0: counts = (stops - starts).astype('f8')
+
+        if self.comm.rank == 0:
+            args = (mask.sum(), zonemap.nblocks, str(predicate))
+            self.logger.info("reading %d out of %d blocks to select %s" % args)
+
+        # divide the surviving blocks between ranks, balancing the estimated matches
+        owner = numpy.zeros(len(counts), dtype='i8')
+        if len(counts):
+            center = numpy.cumsum(counts) - 0.5 * counts
+            owner = (center * self.comm.size // counts.sum()).astype('i8')
+        ranges = list(zip(starts[owner == self.comm.rank], stops[owner == self.comm.rank]))
+
+        # the data in the local blocks
+        data = {}
+        for col in self._source.dtype.names:
+            if len(ranges):
+                full = self._source.get_dask(col)
+                data[col] = da.concatenate([full[start:stop] for start, stop in ranges], axis=0)
+            else:
+                data[col] = self.make_column(numpy.empty((0,) + self._source.dtype[col].shape, dtype=self._source.dtype[col].base))
+
+        # evaluate the predicate exactly on the local blocks
+        cols = sorted(set(col for col, _, _ in predicate))
+        values = self.compute(*[data[col] for col in cols])
+        if len(cols) == 1: values = [values]
+        index = evaluate(predicate, dict(zip(cols, values)))
+        index = numpy.broadcast_to(index, (len(values[0]),))
+
+        subset_data = dict((col, data[col][index]) for col in data)
+        toret = self.__class__._from_columns(int(index.sum()), self.comm, **subset_data)
+        return toret.__finalize__(self)
+
     @property
     def hardcolumns(self):
         """
@@ -83,14 +181,81 @@ class FileCatalogBase(CatalogSource):
         Return a column from the underlying file source.
 
         Columns are returned as dask arrays.
+
+        If the file source supports collective MPI-IO (for example,
+        :class:`~nbodykit.io.hdf.HDFFile` with ``driver='mpio'``), each rank
+        reads its contiguous slab directly when the column is accessed; in
+        this case, columns must be accessed on all ranks at the same time.
         """
         if col in self._source.dtype.names:
             start = self.comm.rank * self._source.size // self.comm.size
             end = (self.comm.rank  + 1) * self._source.size // self.comm.size
+
+            if getattr(self._source, 'collective', False):
+                import dask.array as da
+                data = self._source.read_collective([col], start, end, self.comm)[col]
+                return da.from_array(data, chunks=_global_options['dask_chunk_size'])
+
             return self._source.get_dask(col)[start:end]
         else:
             return CatalogSource.get_hardcolumn(self, col)
 
+    def get_column_rows(self, col, rows):
+        """
+        Return the local rows ``rows`` of the column ``col`` as a dask array.
+
+        For unmodified columns of the file, only the selected rows are read,
+        with nearby rows coalesced into ranges by
+        :func:`~nbodykit.io.base.find_slice_chunks`. The returned array has
+        chunks of ``dask_chunk_size`` selected rows, such that small
+        selections yield few chunks.
+        """
+        if self.base is not None or col in self._overrides or col not in self._source.dtype.names \
+                or getattr(self._source, 'collective', False):
+            return CatalogSource.get_column_rows(self, col, rows)
+
+        import dask.array as da
+        start = self.comm.rank * self._source.size // self.comm.size
+        reader = RowReader(self._source, col, numpy.asarray(rows, dtype='i8') + start)
+        return da.from_array(reader, chunks=_global_options['dask_chunk_size'])
+
+class RowReader(object):
+    """
+    An array-like view of a subset of the rows of a column of a
+    :class:`~nbodykit.io.base.FileType`, which reads only these rows.
+
+    Parameters
+    ----------
+    source : :class:`~nbodykit.io.base.FileType`
+        the file object
+    column : str
+        the name of the column
+    rows : array_like
+        the sorted indices of the rows in ``source``
+    """
+    def __init__(self, source, column, rows):
+        self.source = source
+        self.column = column
+        self.rows = rows
+
+        dtype = source.dtype[column]
+        self.dtype = dtype.base
+        self.shape = (len(rows),) + dtype.shape
+        self.ndim = len(self.shape)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, s):
+        if not isinstance(s, tuple): s = (s,)
+        rows = self.rows[s[0]]
+
+        if len(rows):
+            data = self.source.read_chunks([self.column], find_slice_chunks(rows))[self.column]
+        else:
+            data = numpy.empty((0,) + self.shape[1:], dtype=self.dtype)
+        return data[(slice(None),) + s[1:]]
+
 
 def _make_docstring(filetype, examples):
     """
@@ -153,7 +318,7 @@ def FileCatalogFactory(name, filetype, examples=None):
     def __init__(self, *args, **kwargs):
         comm = kwargs.pop('comm', None)
         attrs = kwargs.pop('attrs', {})
-        FileCatalogBase.__init__(self, filetype=filetype, args=args, kwargs=kwargs)
+        FileCatalogBase.__init__(self, filetype=filetype, args=args, kwargs=kwargs, comm=comm)
         self.attrs.update(attrs)
 
     # make the doc string for this class
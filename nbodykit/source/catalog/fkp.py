@@ -62,6 +62,105 @@ class FKPCatalog(MultipleSpeciesCatalog):
             BoxPad = numpy.ones(3)*BoxPad
         self.attrs['BoxPad'] = BoxPad
 
+    def assign_nz(self, fsky, cosmo, P0, bins=None, redshift='Redshift', weight=None,
+                    source='randoms', nbar='NZ', fkp_weight='FKPWeight', output=None,
+                    columns=[]):
+        r"""
+        Compute :math:`n(z)` and add the number density and FKP weight
+        columns to the ``data`` and ``randoms``.
+
+        The :math:`n(z)` of the ``source`` catalog is computed with a
+        streaming :class:`~nbodykit.algorithms.zhist.RedshiftHistogram`,
+        in a single pass over the ``source``, normalized to the number
+        density of the ``data``, and tabulated
+        as a :class:`~nbodykit.algorithms.zhist.NZTable`. The ``nbar``
+        column is the table evaluated at the redshifts, and the
+        ``fkp_weight`` column is :math:`w_\mathrm{FKP} = 1 / (1 + n(z) P_0)`;
+        both columns are evaluated lazily, chunk by chunk, when accessed.
+
+        If ``output`` is provided, the new columns, and ``columns``, are
+        saved with :func:`~nbodykit.base.catalog.CatalogSource.save` to
+        the ``data/`` and ``randoms/`` datasets of ``output``, reading the
+        redshifts of each catalog once. The saved columns can be read with
+        :class:`~nbodykit.source.catalog.file.BigFileCatalog` and
+        ``dataset='data'`` or ``dataset='randoms'``.
+
+        .. note::
+            This is a collective operation.
+
+        Parameters
+        ----------
+        fsky : float
+            the sky area fraction, used to compute the volume of the
+            redshift shells
+        cosmo : :class:`~nbodykit.cosmology.cosmology.Cosmology`
+            the cosmology used to compute the volume of the redshift shells
+        P0 : float
+            the value of the power spectrum of the FKP weights, in units
+            of :math:`(\mathrm{Mpc}/h)^3`
+        bins : int, str, or sequence of scalars, optional
+            the redshift bins; see
+            :class:`~nbodykit.algorithms.zhist.RedshiftHistogram`
+        redshift : str, optional
+            the name of the redshift column of both catalogs
+        weight : str, optional
+            the name of the completeness weight column of both catalogs,
+            which weights the histogram and the normalization
+        source : 'randoms', 'data'
+            the catalog to compute :math:`n(z)` from; if 'randoms', it is
+            rescaled by the ratio of the (weighted) size of the ``data`` to
+            the (weighted) number of ``randoms`` in the histogram
+        nbar : str, optional
+            the name of the number density column to add
+        fkp_weight : str, optional
+            the name of the FKP weight column to add
+        output : str, optional
+            the name of the file to save the new columns to
+        columns : list of str, optional
+            the other columns to save to ``output``
+
+        Returns
+        -------
+        table : :class:`~nbodykit.algorithms.zhist.NZTable`
+            the table of :math:`n(z)` used to compute the new columns
+        """
+        from nbodykit.algorithms.zhist import RedshiftHistogram
+
+        if source not in self.species:
+            raise ValueError("'source' should be one of %s" % str(self.species))
+        for name in self.species:
+            for col in [redshift, weight] + list(columns):
+                if col is not None and col not in self[name]:
+                    raise ValueError("the '%s' species is missing the '%s' column" %(name, col))
+
+        # n(z) of the source, normalized to the number density of the data
+        zhist = RedshiftHistogram(self[source], fsky, cosmo, bins=bins, redshift=redshift,
+                                    weight=weight, stream=True)
+        table = zhist.nofz.tabulate()
+        if source != 'data':
+            # the (weighted) size of the source is the sum of the histogram
+            if weight is None:
+                size = self['data'].csize
+            else:
+                size = self.comm.allreduce(self['data'].compute(self['data'][weight].sum()))
+            table = table * (1. * size / (zhist.nbar * zhist.dV).sum())
+
+        for name in self.species:
+            nz = table(self[name][redshift])
+            self['%s/%s' %(name, nbar)] = nz
+            self['%s/%s' %(name, fkp_weight)] = 1. / (1. + nz * P0)
+
+            if self.comm.rank == 0:
+                self.logger.info("added '%s' and '%s' columns to '%s'" %(nbar, fkp_weight, name))
+
+            if output is not None:
+                cols = [nbar, fkp_weight] + [col for col in columns if col not in [nbar, fkp_weight]]
+                self[name].save(output, cols, datasets=['%s/%s' %(name, col) for col in cols],
+                                header='%s/Header' % name)
+
+        self.attrs['P0_FKP'] = P0
+        return table
+
     def _define_cartesian_box(self, position, selection):
         """
         Internal function to put the :attr:`randoms` CatalogSource in a
@@ -1,6 +1,5 @@
 from .array import ArrayCatalog
 from nbodykit import CurrentMPIComm, transform
-from nbodykit.utils import GatherArray, ScatterArray
 from nbodykit.base.catalog import CatalogSourceBase, CatalogSource, column
 
 import numpy
@@ -200,11 +199,17 @@ class HaloCatalog(CatalogSource):
 
     def populate(self, model, BoxSize=None, seed=None, **params):
         """
-        Populate the HaloCatalog using a :mod:`halotools` model.
-
-        The model can be a built-in model from :mod:`nbodykit.hod` (which
-        will be converted to a Halotools model) or directly a Halotools model
-        instance.
+        Populate the HaloCatalog using a built-in model from
+        :mod:`nbodykit.hod` or a :mod:`halotools` model.
+
+        Each rank populates its own halos, without gathering the halos
+        to a single rank. Models from :mod:`nbodykit.hod` with a native
+        implementation (e.g., :class:`~nbodykit.hod.Zheng07Model`) are
+        populated with :mod:`numpy`, using random streams keyed by the
+        global index of each halo, such that the galaxies are identical
+        for any number of ranks. Other models from :mod:`nbodykit.hod`
+        are converted to Halotools models. Halotools models populate the
+        local halos on each rank, with a seed that depends on the rank.
 
         This assumes that this is the first time this catalog has been
         populated with the input model. To re-populate using the same
@@ -214,8 +219,7 @@ class HaloCatalog(CatalogSource):
         Parameters
         ----------
         model : :class:`nbodykit.hod.HODModel` or halotools model object
-            the model instance to use to populate; model types from
-            :mod:`nbodykit.hod` will automatically be converted
+            the model class or instance to use to populate
         BoxSize : float, 3-vector, optional
             the box size of the catalog; this must be supplied if 'BoxSize'
             is not in :attr:`attrs`
@@ -246,31 +250,32 @@ class HaloCatalog(CatalogSource):
         >>> galcat.repopulate(alpha=0.9, logMmin=13.5, seed=42)
         """
         from nbodykit.hod import HODModel
-        from halotools.empirical_models import ModelFactory
-        from halotools.sim_manager import UserSuppliedHaloCatalog
 
         # handle builtin model types
-        if isinstance(model, (type, HODModel)) and issubclass(model, HODModel):
-            model = model.to_halotools(self.cosmo, self.attrs['redshift'],
-                                        self.attrs['mdef'], concentration_key='halo_nfw_conc')
-
-        # check model type
-        if not isinstance(model, ModelFactory):
-            raise TypeError("model for populating mocks should be a Halotools ModelFactory")
-
-        # make halotools catalog
-        halocat = self.to_halotools(BoxSize=BoxSize)
-
-        # gather the halo data to root
-        all_halos = GatherArray(halocat.halo_table.as_array(), self.comm, root=0)
+        if isinstance(model, type) and issubclass(model, HODModel):
+            if model.defaults is not None:
+                model = model()
+            else:
+                model = model.to_halotools(self.cosmo, self.attrs['redshift'],
+                                            self.attrs['mdef'], concentration_key='halo_nfw_conc')
 
-        # only the root rank needs to store the halo data
-        if self.comm.rank == 0:
-            data = {col:all_halos[col] for col in all_halos.dtype.names}
-            data.update({col:getattr(halocat, col) for col in ['Lbox', 'redshift', 'particle_mass']})
-            halocat = UserSuppliedHaloCatalog(**data)
+        halocat = None
+        if isinstance(model, HODModel):
+            model.load_halos(self, BoxSize=BoxSize)
         else:
-            halocat = None
+            # check model type
+            from halotools.empirical_models import ModelFactory
+            if not isinstance(model, ModelFactory):
+                raise TypeError("model for populating mocks should be a HODModel or a Halotools ModelFactory")
+
+            # make halotools catalog of the local halos, if any
+            exception = None
+            try:
+                if self.size or self.csize == 0:
+                    halocat = self.to_halotools(BoxSize=BoxSize)
+            except Exception as e:
+                exception = e
+            _raise_any(self.comm, exception)
 
         # cache the model so we have option to call repopulate later
         self.model = model
@@ -293,7 +298,7 @@ class PopulatedHaloCatalog(ArrayCatalog):
     data : structured numpy.ndarray
         the data of the populated objects
     model :
-        the Halotools model instance
+        the :class:`~nbodykit.hod.HODModel` or Halotools model instance
     cosmo : :class:`nbodykit.cosmology.cosmology.Cosmology`
         the cosmology instance
     """
@@ -329,12 +334,13 @@ class PopulatedHaloCatalog(ArrayCatalog):
 def _populate_mock(cat, model, seed=None, halocat=None, inplace=False, **params):
     """
     Internal function to perform the mock population on a HaloCatalog, given
-    a :mod:`halotools` model.
+    a :class:`~nbodykit.hod.HODModel` instance or a :mod:`halotools` model.
 
-    The implementation is not massively parallel. The data is gathered to
-    the root rank, mock population is performed, and then the data is
-    re-scattered evenly across ranks.
+    Each rank populates its local halos. Halotools models are populated
+    with a different seed on each rank, derived from ``seed``.
     """
+    from nbodykit.hod import HODModel
+
     # verify input params
     valid = sorted(model.param_dict)
     missing = set(params) - set(valid)
@@ -354,41 +360,26 @@ def _populate_mock(cat, model, seed=None, halocat=None, inplace=False, **params)
     gal_types = getattr(model, 'gal_types', [])
 
     exception = None
+    data = None
     try:
-        # the root will do the mock population
-        if cat.comm.rank == 0:
-
-            # re-populate the mock (without halo catalog pre-processing)
-            kws = {'seed':seed, 'Num_ptcl_requirement':0, 'halo_mass_column_key':cat.attrs['halo_mass_key']}
-            if hasattr(model, 'mock'):
-                model.mock.populate(**kws)
-            # populating model for the first time (initialization costs)
-            else:
-                if halocat is None:
-                    raise ValueError("halocat cannot be None if we are populating for the first time")
-                model.populate_mock(halocat=halocat, **kws)
-
-            # enumerate gal types as integers
-            # NOTE: necessary to avoid "O" type columns
-            _enum_gal_types(model.mock.galaxy_table, gal_types)
-
-            # crash if any object dtypes
-            # NOTE: we cannot use GatherArray/ScatterArray on objects
-            data = _test_for_objects(model.mock.galaxy_table).as_array()
-
+        if isinstance(model, HODModel):
+            data = model.populate(seed)
+            Nhalos = len(model.halos['Index'])
         else:
-            data = None
-
+            data = _populate_halotools(model, seed, halocat, cat.comm, cat.attrs['halo_mass_key'])
+            Nhalos = len(model.mock.halo_table) if data is not None else 0
     except Exception as e:
         exception = e
 
-    # re-raise the error
-    exception = cat.comm.bcast(exception, root=0)
-    if exception is not None:
-        raise exception
+    # re-raise the error on all ranks
+    _raise_any(cat.comm, exception)
 
-    # re-scatter the data evenly
-    data = ScatterArray(data, cat.comm, root=0)
+    # ranks without halos have no galaxies, with the data type of the other ranks
+    dtypes = [d for d in cat.comm.allgather(None if data is None else data.dtype) if d is not None]
+    if not len(dtypes):
+        raise ValueError("no particles in catalog after populating halo catalog; no rank has halos")
+    if data is None:
+        data = numpy.empty(0, dtype=dtypes[0])
 
     # re-initialize with new source
     if inplace:
@@ -416,18 +407,50 @@ def _populate_mock(cat, model, seed=None, halocat=None, inplace=False, **params)
     galcat.attrs['seed'] = seed
     galcat.attrs['gal_types'] = {t:i for i,t in enumerate(gal_types)}
 
-    # propagate total number of halos for logging
-    if galcat.comm.rank == 0:
-        Nhalos = len(galcat.model.mock.halo_table)
-    else:
-        Nhalos = None
-    Nhalos = galcat.comm.bcast(Nhalos, root=0)
-
     # and log some info
-    _log_populated_stats(galcat, Nhalos)
+    _log_populated_stats(galcat, galcat.comm.allreduce(Nhalos))
 
     return galcat
 
+def _populate_halotools(model, seed, halocat, comm, halo_mass_key):
+    """
+    Internal function to populate the local halos with a :mod:`halotools`
+    model, returning the galaxies as a structured array, or ``None`` if
+    there are no local halos.
+    """
+    # re-populate the mock (without halo catalog pre-processing)
+    if hasattr(model, 'mock'):
+        if not len(model.mock.halo_table):
+            return None
+    elif halocat is None:
+        return None
+
+    # a different seed on each rank
+    seed = numpy.random.RandomState(seed).randint(0, 4294967295, size=comm.size)[comm.rank]
+
+    kws = {'seed':seed, 'Num_ptcl_requirement':0, 'halo_mass_column_key':halo_mass_key}
+    if hasattr(model, 'mock'):
+        model.mock.populate(**kws)
+    # populating model for the first time (initialization costs)
+    else:
+        model.populate_mock(halocat=halocat, **kws)
+
+    # enumerate gal types as integers
+    # NOTE: necessary to avoid "O" type columns
+    _enum_gal_types(model.mock.galaxy_table, getattr(model, 'gal_types', []))
+
+    # crash if any object dtypes
+    return _test_for_objects(model.mock.galaxy_table).as_array()
+
+def _raise_any(comm, exception):
+    """
+    Internal function to raise the first of the exceptions raised on any
+    of the ranks of ``comm``, on all ranks.
+    """
+    exceptions = [e for e in comm.allgather(exception) if e is not None]
+    if len(exceptions):
+        raise exceptions[0]
+
 def _log_populated_stats(cat, Nhalos):
     """
     Internal function to log statistics of a populated catalog. It logs
@@ -0,0 +1,258 @@
+from nbodykit.base.catalog import CatalogSource, CatalogSourceBase, column
+from nbodykit import transform
+
+import numpy
+import logging
+
+class LightConeCatalog(CatalogSource):
+    """
+    A CatalogSource of the objects of a periodic box that are in a
+    light cone, i.e., within a redshift range and a sky footprint seen
+    by an observer, using the periodic replicas of the box.
+
+    Only the replicas of the box that intersect the light cone are
+    considered, and the positions of the box are read chunk by chunk,
+    keeping only the objects in the light cone. The selection does not
+    depend on the number of ranks or on the chunks: the objects are
+    ordered by their row in ``source``, and then by replica.
+
+    The ``Position`` column holds the position of the objects in the
+    replicas, in the frame of the box; the ``RA``, ``DEC`` and ``Redshift``
+    columns are computed from it when accessed, using the
+    :class:`~nbodykit.cosmology.background.BackgroundTable` of ``cosmo``.
+    The other columns of ``source`` (e.g., ``Velocity``) are read for the
+    selected rows when accessed.
+
+    Parameters
+    ----------
+    source : CatalogSource
+        the objects in the periodic box
+    cosmo : :class:`~nbodykit.cosmology.cosmology.Cosmology`
+        the cosmology used to convert redshift to comoving distance
+    zmin : float
+        the minimum (cosmological) redshift of the light cone
+    zmax : float
+        the maximum (cosmological) redshift of the light cone
+    observer : array_like, optional
+        the position of the observer, in the frame of the box
+    ra : tuple, optional
+        the range ``(ramin, ramax)`` of right ascension of the footprint,
+        in degrees; if ``ramin > ramax``, the range wraps around 0
+    dec : tuple, optional
+        the range ``(decmin, decmax)`` of declination of the footprint,
+        in degrees
+    BoxSize : float, 3-vector, optional
+        the size of the box; default is the 'BoxSize' of ``source``
+    position : str, optional
+        the column name specifying the position in the box
+    """
+    logger = logging.getLogger("LightConeCatalog")
+
+    def __repr__(self):
+        args = (self.size, len(self.replicas))
+        return "LightConeCatalog(size=%d, replicas=%d)" % args
+
+    def __init__(self, source, cosmo, zmin, zmax, observer=[0, 0, 0], ra=(0., 360.),
+                    dec=(-90., 90.), BoxSize=None, position='Position'):
+        from nbodykit.cosmology.background import get_background_table
+
+        if not isinstance(source, CatalogSourceBase):
+            raise TypeError("input source to LightConeCatalog should be a CatalogSource")
+        if position not in source:
+            raise ValueError("input source is missing the position column '%s'" % position)
+        if not 0 <= zmin < zmax:
+            raise ValueError("the redshift range should satisfy 0 <= zmin < zmax")
+        if not -90. <= dec[0] < dec[1] <= 90.:
+            raise ValueError("the declination range should satisfy -90 <= decmin < decmax <= 90")
+
+        if BoxSize is None:
+            BoxSize = source.attrs.get('BoxSize', None)
+        if BoxSize is None:
+            raise ValueError("please specify a 'BoxSize' to replicate the box")
+
+        comm = source.comm
+        self._source = source
+        self.cosmo = cosmo
+
+        # the source meta-data, except the size of the (replicated) box
+        self.attrs.update((k, v) for k, v in source.attrs.items() if k != 'BoxSize')
+        self.attrs['cosmo'] = dict(cosmo)
+        self.attrs['zmin'] = zmin
+        self.attrs['zmax'] = zmax
+        self.attrs['observer'] = numpy.array(observer, dtype='f8')
+        self.attrs['ra'] = numpy.array(ra, dtype='f8')
+        self.attrs['dec'] = numpy.array(dec, dtype='f8')
+        self.attrs['ReplicaSize'] = numpy.ones(3) * BoxSize
+
+        # the comoving distances of the redshift range
+        self._table = get_background_table(cosmo, zmax=max(100., zmax))
+        rmin, rmax = self._table.comoving_distance([zmin, zmax])
+        self.attrs['rmin'], self.attrs['rmax'] = rmin, rmax
+
+        # the replicas that intersect the light cone
+        self.replicas = self._find_replicas()
+        if comm.rank == 0:
+            self.logger.info("%d replicas of the box intersect the light cone" % len(self.replicas))
+
+        # select the objects in the light cone, chunk by chunk
+        rows, replica, selected = [], [], []
+        for start, p in source.compute_chunks(source[position]):
+            for i, shift in enumerate(self.replicas * self.attrs['ReplicaSize']):
+                index = numpy.flatnonzero(self._in_light_cone(p + shift))
+                rows.append(index + start)
+                replica.append(numpy.repeat(i, len(index)))
+                selected.append(p[index] + shift)
+
+        # order by row, and then by replica
+        rows = numpy.concatenate(rows).astype('i8')
+        replica = numpy.concatenate(replica).astype('i4')
+        order = numpy.lexsort([replica, rows])
+        self._rows, self._replica = rows[order], replica[order]
+        self._pos = numpy.concatenate(selected, axis=0)[order] if len(order) else numpy.empty((0, 3))
+        self._size = len(self._rows)
+
+        CatalogSource.__init__(self, comm=comm)
+
+        if self.comm.rank == 0:
+            self.logger.info("selected %d objects in the light cone" % self.csize)
+
+    def _in_footprint(self, ra, dec):
+        """
+        Internal function to return whether the sky coordinates ``ra`` and
+        ``dec`` (in degrees) are in the footprint.
+        """
+        (ramin, ramax), (decmin, decmax) = self.attrs['ra'], self.attrs['dec']
+        width = 360. if ramax - ramin >= 360. else (ramax - ramin) % 360.
+        return (dec >= decmin) & (dec <= decmax) & ((ra - ramin) % 360. <= width)
+
+    def _in_light_cone(self, pos):
+        """
+        Internal function to return whether the positions ``pos`` are in
+        the light cone.
+        """
+        pos = pos - self.attrs['observer']
+        r2 = numpy.einsum('ij,ij->i', pos, pos)
+        mask = (r2 >= self.attrs['rmin']**2) & (r2 <= self.attrs['rmax']**2)
+
+        (ramin, ramax), (decmin, decmax) = self.attrs['ra'], self.attrs['dec']
+        if ramax - ramin < 360. or decmin > -90. or decmax < 90.:
+            p = pos[mask]
+            ra = numpy.rad2deg(numpy.arctan2(p[:,1], p[:,0])) % 360.
+            dec = numpy.rad2deg(numpy.arctan2(p[:,2], numpy.hypot(p[:,0], p[:,1])))
+            mask[mask] = self._in_footprint(ra, dec)
+        return mask
+
+    def _find_replicas(self):
+        """
+        Internal function to return the integer offsets of the replicas
+        of the box that can intersect the light cone.
+
+        Replicas are kept if they intersect the spherical shell of the
+        redshift range, and if the cone enclosing the replica, as seen from
+        the observer, intersects the footprint.
+        """
+        L = self.attrs['ReplicaSize']
+        observer = self.attrs['observer']
+        rmin, rmax = self.attrs['rmin'], self.attrs['rmax']
+
+        # all replicas within rmax along each axis
+        nmin = numpy.floor((observer - rmax) / L).astype(int)
+        nmax = numpy.floor((observer + rmax) / L).astype(int)
+        grid = numpy.meshgrid(*[numpy.arange(a, b+1) for a, b in zip(nmin, nmax)], indexing='ij')
+        n = numpy.stack([g.ravel() for g in grid], axis=-1)
+
+        # the nearest and farthest distance of each replica to the observer
+        lo = n * L - observer
+        hi = lo + L
+        dmin = numpy.linalg.norm(numpy.clip(0., lo, hi), axis=-1)
+        dmax = numpy.linalg.norm(numpy.maximum(abs(lo), abs(hi)), axis=-1)
+        n = n[(dmin <= rmax) & (dmax >= rmin)]
+
+        (ramin, ramax), (decmin, decmax) = self.attrs['ra'], self.attrs['dec']
+        if ramax - ramin >= 360. and decmin <= -90. and decmax >= 90.:
+            return n
+
+        # the angular radius of the cone enclosing each replica
+        center = (n + 0.5) * L - observer
+        d = numpy.linalg.norm(center, axis=-1)
+        R = 0.5 * numpy.linalg.norm(L)
+        inside = d <= R
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            angle = numpy.rad2deg(numpy.arcsin(numpy.minimum(R / d, 1.)))
+            ra = numpy.rad2deg(numpy.arctan2(center[:,1], center[:,0])) % 360.
+            dec = numpy.rad2deg(numpy.arcsin(numpy.clip(center[:,2] / d, -1., 1.)))
+
+            # the range of RA of the cone
+            pole = abs(dec) + angle >= 90.
+            halfwidth = numpy.rad2deg(numpy.arcsin(numpy.minimum(
+                            numpy.sin(numpy.deg2rad(angle)) / numpy.cos(numpy.deg2rad(dec)), 1.)))
+        halfwidth[pole] = 180.
+
+        # overlap of the declination ranges, and of the RA arcs
+        keep = (dec - angle <= decmax) & (dec + angle >= decmin)
+        width = 360. if ramax - ramin >= 360. else (ramax - ramin) % 360.
+        start = ra - halfwidth
+        keep &= ((ramin - start) % 360. <= 2 * halfwidth) | ((start - ramin) % 360. <= width) | (halfwidth >= 180.)
+
+        return n[keep | inside]
+
+    @property
+    def hardcolumns(self):
+        """
+        The columns of the light cone, and the columns of the source.
+        """
+        defaults = CatalogSource.hardcolumns.fget(self)
+        exclude = set(defaults) | set(self._defaults)
+        return [col for col in self._source.columns if col not in exclude] + defaults
+
+    def get_hardcolumn(self, col):
+        """
+        Return a column of the light cone, or a column of the source
+        in the rows of the selected objects.
+        """
+        if col in self._hardcolumns:
+            return CatalogSource.get_hardcolumn(self, col)
+
+        # read the unique rows, and repeat them for each replica
+        rows, index = numpy.unique(self._rows, return_inverse=True)
+        return self._source.get_column_rows(col, rows)[index]
+
+    @column
+    def Position(self):
+        r"""
+        The position of the objects in the replicas of the box, in the
+        frame of the box, in units of :math:`\mathrm{Mpc}/h`.
+        """
+        return self.make_column(self._pos)
+
+    @column
+    def Replica(self):
+        """
+        The integer offsets, in units of the box size, of the replica of
+        each object.
+        """
+        return self.make_column(self.replicas[self._replica])
+
+    @column
+    def RA(self):
+        """
+        The right ascension of the objects, in degrees.
+        """
+        return transform.CartesianToEquatorial(self['Position'], observer=self.attrs['observer'])[0]
+
+    @column
+    def DEC(self):
+        """
+        The declination of the objects, in degrees.
+        """
+        return transform.CartesianToEquatorial(self['Position'], observer=self.attrs['observer'])[1]
+
+    @column
+    def Redshift(self):
+        """
+        The cosmological redshift of the objects, interpolated from the
+        comoving distance to the observer.
+        """
+        pos = self['Position'] - self.attrs['observer']
+        r = (pos**2).sum(axis=-1)**0.5
+        return r.map_blocks(self._table.redshift, dtype=r.dtype)
@@ -4,6 +4,8 @@ from nbodykit.utils import attrs_to_dict
 from nbodykit import CurrentMPIComm
 
 import numpy
+import logging
+import time
 
 class LogNormalCatalog(CatalogSource):
     """
@@ -32,6 +34,10 @@ class LogNormalCatalog(CatalogSource):
         this must be supplied if ``Plin`` does not carry ``cosmo`` attribute
     redshift : float, optional
         this must be supplied if ``Plin`` does not carry a ``redshift`` attribute
+    transfer : :class:`~nbodykit.mockmaker.LinearTransfer`, optional
+        the factor :math:`(P(k) / V)^{1/2}` of ``Plin``, precomputed on a
+        mesh with ``BoxSize`` and ``Nmesh``; this mesh is used, and the
+        power spectrum is not evaluated again. See :class:`LogNormalEnsemble`.
     comm : MPI Communicator, optional
         the MPI communicator instance; default (``None``) sets to the
         current communicator
@@ -47,7 +53,8 @@ class LogNormalCatalog(CatalogSource):
     @CurrentMPIComm.enable
     def __init__(self, Plin, nbar, BoxSize, Nmesh, bias=2., seed=None,
                     cosmo=None, redshift=None,
-                    unitary_amplitude=False, inverted_phase=False, comm=None):
+                    unitary_amplitude=False, inverted_phase=False,
+                    transfer=None, comm=None):
 
         self.comm = comm
         self.Plin = Plin
@@ -84,7 +91,7 @@ class LogNormalCatalog(CatalogSource):
         self.attrs['seed'] = seed
 
         # make the actual source
-        self._source, pm = self._makesource(BoxSize=BoxSize, Nmesh=Nmesh)
+        self._source, pm = self._makesource(BoxSize=BoxSize, Nmesh=Nmesh, transfer=transfer)
         self.attrs['Nmesh'] = pm.Nmesh.copy()
         self.attrs['BoxSize'] = pm.BoxSize.copy()
 
@@ -119,7 +126,7 @@ class LogNormalCatalog(CatalogSource):
         """
         return self.make_column(self._source['VelocityOffset'])
 
-    def _makesource(self, BoxSize, Nmesh):
+    def _makesource(self, BoxSize, Nmesh, transfer=None):
 
         from nbodykit import mockmaker
         from pmesh.pm import ParticleMesh
@@ -127,7 +134,12 @@ class LogNormalCatalog(CatalogSource):
         # the particle mesh for gridding purposes
         _Nmesh = numpy.empty(3, dtype='i8')
         _Nmesh[:] = Nmesh
-        pm = ParticleMesh(BoxSize=BoxSize, Nmesh=_Nmesh, dtype='f4', comm=self.comm)
+        if transfer is None:
+            pm = ParticleMesh(BoxSize=BoxSize, Nmesh=_Nmesh, dtype='f4', comm=self.comm)
+        else:
+            pm = transfer.pm
+            if (pm.Nmesh != _Nmesh).any() or not numpy.allclose(pm.BoxSize, BoxSize):
+                raise ValueError("the mesh of `transfer` does not match `BoxSize` and `Nmesh`")
 
         # growth rate to do RSD in the Zel'dovich approx
         f = self.cosmo.scale_independent_growth_rate(self.attrs['redshift'])
@@ -136,7 +148,7 @@ class LogNormalCatalog(CatalogSource):
         delta, disp = mockmaker.gaussian_real_fields(pm, self.Plin, self.attrs['seed'],
                     unitary_amplitude=self.attrs['unitary_amplitude'],
                     inverted_phase=self.attrs['inverted_phase'],
-                    compute_displacement=True)
+                    compute_displacement=True, transfer=transfer)
 
         # poisson sample to points
         # this returns position and velocity offsets
@@ -164,3 +176,170 @@ class LogNormalCatalog(CatalogSource):
         source['VelocityOffset'][:] = f*disp[:] # in Mpc/h
 
         return source, pm
+
+
+class LogNormalEnsemble(object):
+    """
+    Generate an ensemble of :class:`LogNormalCatalog` realizations with
+    different seeds, sharing the setup of the mesh and of the power
+    spectrum on the mesh.
+
+    The mesh and the factor :math:`(P(k) / V)^{1/2}` (see
+    :class:`~nbodykit.mockmaker.LinearTransfer`) are computed once, and
+    each realization then only draws and transforms the random fields.
+
+    Parameters
+    ----------
+    Plin : callable
+        callable specifying the linear power spectrum
+    nbar : float
+        the number density of the particles in the box
+    BoxSize : float, 3-vector of floats
+        the size of the box to generate the grid on
+    Nmesh : int
+        the mesh size to use when generating the density and displacement
+        fields
+    comm : MPI Communicator, optional
+        the MPI communicator instance; default (``None``) sets to the
+        current communicator
+    **kwargs :
+        additional keywords passed to :class:`LogNormalCatalog`, e.g.,
+        ``bias``, ``cosmo``, or ``redshift``
+
+    Examples
+    --------
+    >>> ensemble = LogNormalEnsemble(Plin, nbar=3e-4, BoxSize=1380., Nmesh=256)
+    >>> for cat in ensemble.generate(range(100), output='mocks/lognormal-%d'):
+    ...     r = FFTPower(cat, mode='1d')
+    """
+    logger = logging.getLogger('LogNormalEnsemble')
+
+    @CurrentMPIComm.enable
+    def __init__(self, Plin, nbar, BoxSize, Nmesh, comm=None, **kwargs):
+
+        from nbodykit.mockmaker import LinearTransfer
+        from pmesh.pm import ParticleMesh
+
+        self.comm = comm
+        self.Plin = Plin
+        self.nbar = nbar
+        self.kwargs = kwargs
+
+        # the shared mesh and power spectrum on the mesh
+        _Nmesh = numpy.empty(3, dtype='i8')
+        _Nmesh[:] = Nmesh
+        pm = ParticleMesh(BoxSize=BoxSize, Nmesh=_Nmesh, dtype='f4', comm=self.comm)
+        self.transfer = LinearTransfer(pm, Plin)
+
+        #: the throughput of :func:`generate`, in mocks per hour
+        self.mocks_per_hour = None
+
+    @property
+    def pm(self):
+        """
+        The :class:`pmesh.pm.ParticleMesh` shared by the realizations.
+        """
+        return self.transfer.pm
+
+    def realization(self, seed):
+        """
+        Return the :class:`LogNormalCatalog` realization with seed ``seed``.
+        """
+        return LogNormalCatalog(Plin=self.Plin, nbar=self.nbar, BoxSize=self.pm.BoxSize,
+                                Nmesh=self.pm.Nmesh, seed=seed, transfer=self.transfer,
+                                comm=self.comm, **self.kwargs)
+
+    def generate(self, seeds, output=None, columns=['Position', 'Velocity', 'VelocityOffset'],
+                    header='Header'):
+        """
+        Iterate over the realizations of the seeds ``seeds``, yielding a
+        :class:`LogNormalCatalog` for each seed.
+
+        If ``output`` is given, each catalog is saved to a
+        :class:`bigfile.BigFile`. The data is written by a background
+        thread while the next realization is generated; only the creation
+        and closing of the files are collective. The throughput is logged
+        after each realization and stored in :attr:`mocks_per_hour`.
+
+        Parameters
+        ----------
+        seeds : iterable of int
+            the random seeds of the realizations
+        output : str, optional
+            the name of the file of each realization, formatted with
+            the seed, e.g., ``'mocks/lognormal-%d'``
+        columns : list of str, optional
+            the columns to save
+        header : str, optional
+            the name of the data set holding :attr:`attrs` in each file
+        """
+        writer = None
+        start = time.time()
+        try:
+            for i, seed in enumerate(seeds):
+                cat = self.realization(seed)
+
+                if output is not None:
+                    if writer is not None:
+                        writer.close()
+                    writer = _CatalogWriter(cat, output % seed, columns, header)
+
+                yield cat
+
+                self.mocks_per_hour = (i + 1) / (time.time() - start) * 3600.
+                if self.comm.rank == 0:
+                    args = (i + 1, self.mocks_per_hour)
+                    self.logger.info("generated %d mocks, %.1f mocks per hour" % args)
+        finally:
+            if writer is not None:
+                writer.close()
+
+class _CatalogWriter(object):
+    """
+    Internal class to save the columns of a catalog to a
+    :class:`bigfile.BigFile`, writing the data in a background thread.
+
+    The file, header and blocks are created collectively on construction;
+    :func:`close` waits for the data to be written and closes the blocks
+    collectively.
+    """
+    def __init__(self, cat, output, columns, header):
+        import bigfile
+        import threading
+        from nbodykit.base.catalog import _write_header
+
+        comm = cat.comm
+        data = cat.compute(*[cat[col] for col in columns])
+        if len(columns) == 1: data = [data]
+
+        sizes = comm.allgather(cat.size)
+        offset = sum(sizes[:comm.rank])
+
+        self.ff = bigfile.BigFileMPI(comm=comm, filename=output, create=True)
+        _write_header(self.ff, header, cat.attrs)
+
+        # sane value -- 32 million items per physical file
+        Nfile = max((sum(sizes) + 32 * 1024 * 1024 - 1) // (32 * 1024 * 1024), 1)
+        self.blocks = []
+        for col, d in zip(columns, data):
+            dtype = numpy.dtype((d.dtype, d.shape[1:]))
+            self.blocks.append((self.ff.create(col, dtype, sum(sizes), Nfile), d))
+
+        self.error = None
+        def write():
+            try:
+                for block, d in self.blocks:
+                    block.write(offset, numpy.ascontiguousarray(d))
+            except Exception as e:
+                self.error = e
+
+        self.thread = threading.Thread(target=write)
+        self.thread.start()
+
+    def close(self):
+        self.thread.join()
+        for block, d in self.blocks:
+            block.close()
+        self.ff.close()
+        if self.error is not None:
+            raise self.error
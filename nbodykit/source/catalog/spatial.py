@@ -0,0 +1,416 @@
+from nbodykit.source.catalog.file import FileCatalogBase
+from nbodykit import CurrentMPIComm, io
+from nbodykit.io.bigfile import Automatic
+import numpy
+import os
+
+# the maximum number of bits per dimension that fit in a 63-bit key
+MAX_BITS = 21
+
+def _spread_bits(x):
+    """
+    Internal function to spread the lowest 21 bits of ``x`` such that
+    there are two zero bits between each bit.
+    """
+    x = numpy.asarray(x, dtype='u8') & numpy.uint64(0x1fffff)
+    x = (x | x << numpy.uint64(32)) & numpy.uint64(0x1f00000000ffff)
+    x = (x | x << numpy.uint64(16)) & numpy.uint64(0x1f0000ff0000ff)
+    x = (x | x << numpy.uint64(8)) & numpy.uint64(0x100f00f00f00f00f)
+    x = (x | x << numpy.uint64(4)) & numpy.uint64(0x10c30c30c30c30c3)
+    x = (x | x << numpy.uint64(2)) & numpy.uint64(0x1249249249249249)
+    return x
+
+def morton_key(ipos, nbits):
+    """
+    Return the Morton (Z-order) key of the integer coordinates ``ipos``.
+
+    Parameters
+    ----------
+    ipos : array_like
+        the integer coordinates, of shape ``(N, 3)``, between 0 and
+        ``2**nbits``
+    nbits : int
+        the number of bits per dimension; at most 21
+
+    Returns
+    -------
+    key : array_like
+        the ``i8`` key of each point, between 0 and ``2**(3*nbits)``
+    """
+    if nbits > MAX_BITS:
+        raise ValueError("at most %d bits per dimension are supported" %MAX_BITS)
+    ipos = numpy.asarray(ipos, dtype='u8')
+    key = _spread_bits(ipos[..., 0]) << numpy.uint64(2)
+    key |= _spread_bits(ipos[..., 1]) << numpy.uint64(1)
+    key |= _spread_bits(ipos[..., 2])
+    return key.astype('i8')
+
+def hilbert_key(ipos, nbits):
+    """
+    Return the Peano-Hilbert key of the integer coordinates ``ipos``.
+
+    This follows the algorithm of Skilling 2004, AIP Conference
+    Proceedings 707, 381. Points that are nearby along the curve are
+    nearby in space, and the key of a cell at a coarser level is the
+    prefix of the keys of all points inside the cell.
+
+    Parameters
+    ----------
+    ipos : array_like
+        the integer coordinates, of shape ``(N, 3)``, between 0 and
+        ``2**nbits``
+    nbits : int
+        the number of bits per dimension; at most 21
+
+    Returns
+    -------
+    key : array_like
+        the ``i8`` key of each point, between 0 and ``2**(3*nbits)``
+    """
+    if nbits > MAX_BITS:
+        raise ValueError("at most %d bits per dimension are supported" %MAX_BITS)
+    ipos = numpy.asarray(ipos, dtype='u8')
+    X = [ipos[..., i].copy() for i in range(3)]
+
+    # inverse undo excess work
+    Q = 1 << (nbits - 1) if nbits > 0 else 0
+    while Q > 1:
+        P = numpy.uint64(Q - 1)
+        for i in range(3):
+            cond = (X[i] & numpy.uint64(Q)) != 0
+            if i == 0:
+                X[0] = numpy.where(cond, X[0] ^ P, X[0])
+            else:
+                t = (X[0] ^ X[i]) & P
+                X[0] = numpy.where(cond, X[0] ^ P, X[0] ^ t)
+                X[i] = numpy.where(cond, X[i], X[i] ^ t)
+        Q >>= 1
+
+    # gray encode
+    for i in range(1, 3):
+        X[i] ^= X[i-1]
+    t = numpy.zeros_like(X[0])
+    Q = 1 << (nbits - 1) if nbits > 0 else 0
+    while Q > 1:
+        t = numpy.where((X[2] & numpy.uint64(Q)) != 0, t ^ numpy.uint64(Q - 1), t)
+        Q >>= 1
+    for i in range(3):
+        X[i] ^= t
+
+    # interleave the transposed coordinates
+    return morton_key(numpy.stack(X, axis=-1), nbits)
+
+CURVES = {'morton' : morton_key, 'hilbert' : hilbert_key}
+
+def spatial_key(pos, BoxSize, nbits, curve='hilbert'):
+    """
+    Return the space-filling curve key of the positions ``pos``, which are
+    wrapped periodically into the box ``[0, BoxSize)``.
+
+    Parameters
+    ----------
+    pos : array_like
+        the positions, of shape ``(N, 3)``
+    BoxSize : float, array_like
+        the size of the box
+    nbits : int
+        the number of bits per dimension of the key
+    curve : 'hilbert', 'morton'
+        the space-filling curve to use
+    """
+    if curve not in CURVES:
+        raise ValueError("'curve' should be one of %s, not '%s'" %(str(sorted(CURVES)), curve))
+    BoxSize = _as_boxsize(BoxSize)
+    ipos = numpy.floor(numpy.remainder(pos, BoxSize) / BoxSize * 2**nbits).astype('i8')
+    ipos = numpy.clip(ipos, 0, 2**nbits - 1)
+    return CURVES[curve](ipos, nbits)
+
+def _as_boxsize(BoxSize):
+    """
+    Internal function to return ``BoxSize`` as an array of length 3.
+    """
+    toret = numpy.empty(3, dtype='f8')
+    toret[:] = BoxSize
+    return toret
+
+class SpatialIndex(object):
+    """
+    An index mapping the cells of a regular grid to the ranges of rows of
+    a file sorted along a space-filling curve.
+
+    The box is divided into ``2**level`` cells per side; since all points
+    in a cell are contiguous along the curve, the rows in each cell form a
+    single range, ``offsets[key]`` to ``offsets[key+1]``, where ``key``
+    is the key of the cell at ``level``.
+
+    Parameters
+    ----------
+    offsets : array_like
+        the ``8**level + 1`` row offsets of the cells, in the order of
+        the curve
+    BoxSize : float, array_like
+        the size of the box
+    curve : 'hilbert', 'morton'
+        the space-filling curve used to sort the rows
+    nbits : int
+        the number of bits per dimension of the sort key
+    """
+    def __init__(self, offsets, BoxSize, curve, nbits):
+
+        self.offsets = numpy.asarray(offsets, dtype='i8')
+        self.BoxSize = _as_boxsize(BoxSize)
+        self.curve = str(curve)
+        self.nbits = int(nbits)
+
+        level = int(round(numpy.log2(len(self.offsets) - 1) / 3.))
+        if 8**level + 1 != len(self.offsets):
+            raise ValueError("the number of offsets should be 8**level + 1")
+        self.level = level
+
+    def __repr__(self):
+        return "SpatialIndex(curve='%s', level=%d, size=%d)" %(self.curve, self.level, self.size)
+
+    @property
+    def size(self):
+        """
+        The total number of rows covered by the index.
+        """
+        return int(self.offsets[-1])
+
+    @classmethod
+    def build(cls, keys, BoxSize, curve, nbits, level, comm=None):
+        """
+        Build the index from the sorted curve keys of the rows, which may be
+        distributed across the ranks of ``comm`` in order.
+        """
+        cells = numpy.asarray(keys, dtype='i8') >> (3 * (nbits - level))
+        counts = numpy.bincount(cells, minlength=8**level)
+        if comm is not None:
+            counts = comm.allreduce(counts)
+        offsets = numpy.concatenate([[0], numpy.cumsum(counts)])
+        return cls(offsets, BoxSize, curve, nbits)
+
+    def save(self, filename):
+        """
+        Save the index to a ``.npz`` file.
+        """
+        with open(filename, 'wb') as ff:
+            numpy.savez(ff, offsets=self.offsets, BoxSize=self.BoxSize,
+                        curve=self.curve, nbits=self.nbits)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Load the index from a ``.npz`` file written by :func:`save`.
+        """
+        with numpy.load(filename) as ff:
+            return cls(ff['offsets'], ff['BoxSize'], str(ff['curve']), int(ff['nbits']))
+
+    def cells(self, lower, upper):
+        """
+        Return the sorted keys of the cells that intersect the box
+        ``[lower, upper)``, which should lie inside ``[0, BoxSize]``.
+        """
+        ncells = 2**self.level
+        lower = numpy.floor(numpy.asarray(lower) / self.BoxSize * ncells).astype('i8')
+        upper = numpy.ceil(numpy.asarray(upper) / self.BoxSize * ncells).astype('i8')
+        lower = numpy.clip(lower, 0, ncells)
+        upper = numpy.clip(upper, 0, ncells)
+        if (upper <= lower).any():
+            return numpy.empty(0, dtype='i8')
+
+        ipos = numpy.stack(numpy.meshgrid(*[numpy.arange(l, u) for l, u in zip(lower, upper)],
+                                          indexing='ij'), axis=-1).reshape(-1, 3)
+        return numpy.sort(CURVES[self.curve](ipos, self.level))
+
+    def ranges(self, cells):
+        """
+        Return the ``(start, stop)`` ranges of the rows in ``cells``,
+        merging the ranges of consecutive cells.
+        """
+        cells = numpy.unique(cells)
+        starts = self.offsets[cells]
+        stops = self.offsets[cells + 1]
+
+        toret = []
+        for start, stop in zip(starts, stops):
+            if stop == start: continue
+            if len(toret) and toret[-1][1] == start:
+                toret[-1] = (toret[-1][0], stop)
+            else:
+                toret.append((start, stop))
+        return toret
+
+def index_path(path):
+    """
+    The path of the spatial index stored in the BigFile directory ``path``.
+    """
+    return os.path.join(path, 'SpatialIndex.npz')
+
+def domain_boxes(domain, rank):
+    """
+    Return the list of ``(lower, upper)`` boxes of the domain
+    decomposition ``domain`` that are assigned to ``rank``.
+
+    Parameters
+    ----------
+    domain : :class:`pmesh.domain.GridND`
+        the domain decomposition
+    rank : int
+        the rank to return the boxes of
+    """
+    grid = [numpy.asarray(g) for g in domain.grid]
+    dims = [len(g) - 1 for g in grid]
+    assign = getattr(domain, 'DomainAssign', None)
+    if assign is None:
+        assign = numpy.arange(numpy.prod(dims))
+
+    boxes = []
+    for i in numpy.nonzero(numpy.asarray(assign).ravel() == rank)[0]:
+        index = numpy.unravel_index(i, dims)
+        lower = numpy.array([g[j] for g, j in zip(grid, index)])
+        upper = numpy.array([g[j+1] for g, j in zip(grid, index)])
+        boxes.append((lower, upper))
+    return boxes
+
+class SpatialBigFileCatalog(FileCatalogBase):
+    """
+    A CatalogSource that reads a spatial region of a :mod:`bigfile`
+    file written by :func:`~nbodykit.base.catalog.CatalogSource.save_spatial`.
+
+    The rows of the file are sorted along a space-filling curve, and the
+    spatial index stored with the file is used to read only the rows
+    inside the requested region; the positions of these rows are then
+    checked exactly.
+
+    If ``domain`` is given, each rank reads the rows inside the parts of
+    the domain decomposition assigned to it, such that the data
+    is already decomposed, e.g., for painting or pair counting. If
+    ``region`` is given, the rows inside the box are divided evenly
+    between the ranks. If neither is given, all rows are read and
+    divided evenly.
+
+    Parameters
+    ----------
+    path : str
+        the name of the directory holding the bigfile data
+    region : tuple of array_like, optional
+        the ``(lower, upper)`` corners of the box to read
+    domain : :class:`pmesh.domain.GridND`, optional
+        the domain decomposition to read the data in; the grid should
+        cover the box ``[0, BoxSize]``
+    position : str, optional
+        the name of the position column
+    dataset : str, optional
+        load a specific dataset from the bigfile; default is to starting
+        from the root
+    header : str, optional
+        the path to the header
+    comm : MPI Communicator, optional
+        the MPI communicator instance; default (``None``) sets to the
+        current communicator
+    attrs : dict, optional
+        dictionary of meta-data to store in :attr:`attrs`
+    """
+    @CurrentMPIComm.enable
+    def __init__(self, path, region=None, domain=None, position='Position',
+                    dataset='./', header=Automatic, comm=None, attrs={}):
+
+        if region is not None and domain is not None:
+            raise ValueError("only one of 'region' and 'domain' can be given")
+
+        kwargs = {'dataset':dataset, 'header':header}
+        FileCatalogBase.__init__(self, filetype=io.BigFile, args=(path,), kwargs=kwargs, comm=comm)
+        self.attrs.update(attrs)
+
+        # load the spatial index on the root
+        index = None
+        if self.comm.rank == 0:
+            if not os.path.exists(index_path(path)):
+                index = ValueError("no spatial index found in '%s'; write the file with "
+                                   "CatalogSource.save_spatial" %path)
+            else:
+                index = SpatialIndex.load(index_path(path))
+        self.index = self.comm.bcast(index)
+        if isinstance(self.index, Exception):
+            raise self.index
+        if self.index.size != self._source.size:
+            raise ValueError("size mismatch between the spatial index and the file")
+
+        # the boxes and the row ranges to read on this rank
+        if domain is not None:
+            boxes = domain_boxes(domain, self.comm.rank)
+            cells = [self.index.cells(lower, upper) for lower, upper in boxes]
+            cells = numpy.concatenate(cells) if len(cells) else numpy.empty(0, dtype='i8')
+            ranges = self.index.ranges(cells)
+        elif region is not None:
+            boxes = [tuple(numpy.asarray(r, dtype='f8') for r in region)]
+            ranges = _split_ranges(self.index.ranges(self.index.cells(*boxes[0])), self.comm)
+        else:
+            boxes = None
+            start = self.comm.rank * self._source.size // self.comm.size
+            end = (self.comm.rank  + 1) * self._source.size // self.comm.size
+            ranges = [(start, end)] if end > start else []
+        self._ranges = ranges
+
+        # select the rows inside the boxes exactly
+        self._index = None
+        if boxes is not None:
+            pos = self.compute(self.get_hardcolumn(position))
+            pos = numpy.remainder(pos, self.index.BoxSize)
+            index = numpy.zeros(len(pos), dtype='?')
+            for lower, upper in boxes:
+                index |= ((pos >= lower) & (pos < upper)).all(axis=-1)
+            self._index = index
+            self._size = int(index.sum())
+        else:
+            self._size = sum(stop - start for start, stop in ranges)
+        self._csize = self.comm.allreduce(self._size)
+
+        if self.comm.rank == 0:
+            args = (sum(stop - start for start, stop in ranges), self._source.size)
+            self.logger.info("reading %d out of %d rows on rank 0" % args)
+
+    def _can_pushdown(self, sel):
+        # zone maps assume the default partitioning of the rows
+        return False
+
+    def get_hardcolumn(self, col):
+        """
+        Return a column from the rows of the file inside the region
+        read by this rank.
+
+        Columns are returned as dask arrays.
+        """
+        if col in self._source.dtype.names:
+            import dask.array as da
+            if len(self._ranges):
+                full = self._source.get_dask(col)
+                data = da.concatenate([full[start:stop] for start, stop in self._ranges], axis=0)
+            else:
+                dt = self._source.dtype[col]
+                data = self.make_column(numpy.empty((0,) + dt.shape, dtype=dt.base))
+            if self._index is not None:
+                data = data[self._index]
+            return data
+        else:
+            return FileCatalogBase.get_hardcolumn(self, col)
+
+def _split_ranges(ranges, comm):
+    """
+    Internal function to divide the rows in ``ranges`` evenly between the
+    ranks of ``comm``, returning the ranges of the local rank.
+    """
+    sizes = numpy.array([stop - start for start, stop in ranges], dtype='i8')
+    total = sizes.sum()
+    lo = comm.rank * total // comm.size
+    hi = (comm.rank + 1) * total // comm.size
+
+    toret = []
+    offset = 0
+    for (start, stop), size in zip(ranges, sizes):
+        s, e = max(lo - offset, 0), min(hi - offset, size)
+        if e > s:
+            toret.append((start + s, start + e))
+        offset += size
+    return toret
@@ -146,6 +146,7 @@ class MultipleSpeciesCatalog(CatalogSourceBase):
                 raise ValueError("error setting '%s' column, data must be array of size %d, not %d" % args)
 
         # add the column to the CatalogSource in "_sources"
+        self._modified()
         return CatalogSourceBase.__setitem__(self._sources[species], subcol, value)
 
     def __delitem__(self, col):
@@ -153,6 +154,7 @@ class MultipleSpeciesCatalog(CatalogSourceBase):
         Delete a column of the form ``species/column``
         """
         species, subcol = split_column(col, self.species)
+        self._modified()
         return CatalogSourceBase.__delitem__(self._sources[species], subcol)
 
 
@@ -113,3 +113,81 @@ def test_stack_list(comm):
 
     os.unlink(tmpfile1)
     os.unlink(tmpfile2)
+
+@MPITest([1, 4])
+def test_zonemap_selection(comm):
+
+    CurrentMPIComm.set(comm)
+
+    # write sorted redshifts to a binary file on the root
+    if comm.rank == 0:
+        tmpfile = tempfile.mkstemp()[1]
+        z = numpy.sort(numpy.random.random(size=1000))
+        mass = numpy.random.random(size=1000)
+        with open(tmpfile, 'wb') as ff:
+            z.tofile(ff); mass.tofile(ff)
+
+        # build the zone map
+        f = IO.BinaryFile(tmpfile, dtype=[('Redshift', 'f8'), ('Mass', 'f8')])
+        f.build_zonemap(['Redshift'], blocksize=50, bins=4)
+    else:
+        tmpfile = z = mass = None
+    tmpfile, z, mass = comm.bcast((tmpfile, z, mass))
+
+    source = BinaryCatalog(tmpfile, dtype=[('Redshift', 'f8'), ('Mass', 'f8')])
+
+    # the range predicate is pushed down to the file
+    sel = (source['Redshift'] > 0.2) & (source['Redshift'] <= 0.6)
+    assert sel.predicate is not None
+    subset = source[sel]
+
+    index = (z > 0.2) & (z <= 0.6)
+    assert subset.csize == index.sum()
+    assert_allclose(numpy.concatenate(comm.allgather(subset['Mass'].compute())), mass[index])
+
+    # not a range predicate
+    subset = source[abs(source['Redshift'] - 0.5) < 0.1]
+    assert subset.csize == (abs(z - 0.5) < 0.1).sum()
+
+    comm.barrier()
+    if comm.rank == 0:
+        os.unlink(tmpfile)
+        os.unlink(tmpfile + '.zonemap.npz')
+
+@MPITest([1, 4])
+def test_sparse_selection(comm):
+    from nbodykit import set_options
+
+    CurrentMPIComm.set(comm)
+
+    # write a binary file on the root
+    if comm.rank == 0:
+        tmpfile = tempfile.mkstemp()[1]
+        pos = numpy.random.uniform(0, 100., size=(2000, 3))
+        mass = numpy.random.random(size=2000)
+        with open(tmpfile, 'wb') as ff:
+            pos.tofile(ff); mass.tofile(ff)
+    else:
+        tmpfile = pos = mass = None
+    tmpfile, pos, mass = comm.bcast((tmpfile, pos, mass))
+
+    with set_options(dask_chunk_size=100):
+        source = BinaryCatalog(tmpfile, dtype=[('Position', ('f8', 3)), ('Mass', 'f8')])
+        source['Selection'] = source['Mass'] < 0.05
+
+        # only the selected rows are read, in few chunks
+        subset = source[source['Selection']]
+        assert subset.csize == (mass < 0.05).sum()
+        assert_allclose(numpy.concatenate(comm.allgather(subset['Mass'].compute())), mass[mass < 0.05])
+        assert_allclose(numpy.concatenate(comm.allgather(subset['Position'].compute())), pos[mass < 0.05])
+        assert subset['Mass'].npartitions <= subset.size // 100 + 1
+
+        # painting with a selection only paints the selected rows
+        real1 = source.to_mesh(Nmesh=16, BoxSize=100.).paint(mode='real')
+        real2 = subset.to_mesh(Nmesh=16, BoxSize=100.).paint(mode='real')
+        assert real1.attrs['N'] == subset.csize
+        assert_allclose(real1, real2)
+
+    comm.barrier()
+    if comm.rank == 0:
+        os.unlink(tmpfile)
@@ -45,3 +45,50 @@ def test_boxsize(comm):
 
     # check boxsize
     assert_allclose(mesh.attrs['BoxSize'], numpy.ceil(1.02*512.))
+
+@MPITest([1, 4])
+def test_assign_nz(comm):
+
+    import tempfile
+    import shutil
+
+    CurrentMPIComm.set(comm)
+    cosmo = cosmology.Planck15
+
+    # data and randoms, with 10 times more randoms
+    data = RandomCatalog(1000, seed=42)
+    data['Redshift'] = data.rng.normal(loc=0.5, scale=0.1, size=data.size)
+    randoms = RandomCatalog(10000, seed=84)
+    randoms['Redshift'] = randoms.rng.normal(loc=0.5, scale=0.1, size=randoms.size)
+
+    # initialize an output directory
+    if comm.rank == 0:
+        tmpfile = tempfile.mkdtemp()
+    else:
+        tmpfile = None
+    tmpfile = comm.bcast(tmpfile)
+
+    def allconcat(data):
+        return numpy.concatenate(comm.allgather(data), axis=0)
+
+    fkp = FKPCatalog(data, randoms)
+    table = fkp.assign_nz(1.0, cosmo, 1e4, bins=20, output=tmpfile, columns=['Redshift'])
+
+    # compare to the spline of n(z) of the randoms, rescaled to the data
+    zhist = RedshiftHistogram(randoms, 1.0, cosmo, bins=20, stream=True)
+    norm = data.csize / (zhist.nbar * zhist.dV).sum()
+    assert_allclose(norm, 0.1)
+    for name in fkp.species:
+        z = fkp[name]['Redshift'].compute()
+        nz = norm * zhist.nofz(z)
+        assert_allclose(fkp[name]['NZ'], nz, rtol=1e-4, atol=1e-6 * nz.max())
+        assert_allclose(fkp[name]['FKPWeight'], 1. / (1. + 1e4 * fkp[name]['NZ'].compute()))
+
+        # load the saved columns
+        cat = BigFileCatalog(tmpfile, dataset=name)
+        for col in ['NZ', 'FKPWeight', 'Redshift']:
+            assert_allclose(allconcat(cat[col].compute()), allconcat(fkp[name][col].compute()))
+
+    comm.barrier()
+    if comm.rank == 0:
+        shutil.rmtree(tmpfile)
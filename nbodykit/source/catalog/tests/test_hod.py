@@ -2,6 +2,7 @@ from runtests.mpi import MPITest
 from nbodykit.lab import *
 from nbodykit.tutorials import DemoHaloCatalog
 from nbodykit import setup_logging
+import numpy
 import shutil
 import pytest
 
@@ -182,3 +183,60 @@ def test_save(comm):
         comm.barrier()
         if comm.rank == 0:
             shutil.rmtree('tmp-hod.bigfile')
+
+@MPITest([1, 4])
+def test_native_rank_invariance(comm):
+
+    from mpi4py import MPI
+    CurrentMPIComm.set(comm)
+
+    # the same halos for any number of ranks
+    source = UniformCatalog(nbar=4e-5, BoxSize=500., seed=42)
+    source['Mass'] = 10**source.rng.uniform(12, 15, size=source.size)
+    halos = HaloCatalog(source, cosmo=cosmology.Planck15, redshift=0.55)
+    hod = halos.populate(Zheng07Model, seed=42)
+
+    # populate all of the halos on a single rank
+    source1 = UniformCatalog(nbar=4e-5, BoxSize=500., seed=42, comm=MPI.COMM_SELF)
+    source1['Mass'] = 10**source1.rng.uniform(12, 15, size=source1.size)
+    halos1 = HaloCatalog(source1, cosmo=cosmology.Planck15, redshift=0.55)
+    hod1 = halos1.populate(Zheng07Model, seed=42)
+
+    # same galaxies, in the same order
+    for col in ['Position', 'Velocity', 'gal_type', 'halo_id']:
+        value = numpy.concatenate(comm.allgather(hod[col].compute()))
+        numpy.testing.assert_array_equal(value, hod1[col].compute())
+
+    # the galaxies are in the box, and the satellite fraction is sensible
+    pos = hod['Position'].compute()
+    assert ((pos >= 0) & (pos < 500.)).all()
+    assert 0 < hod.attrs['fsat'] < 1
+
+    # bad params
+    with pytest.raises(ValueError):
+        hod.repopulate(seed=42, bad_param_name=1.0)
+
+@MPITest([4])
+def test_native_repopulate(comm):
+
+    CurrentMPIComm.set(comm)
+
+    source = UniformCatalog(nbar=4e-5, BoxSize=500., seed=42)
+    source['Mass'] = 10**source.rng.uniform(12, 15, size=source.size)
+    halos = HaloCatalog(source, cosmo=cosmology.Planck15, redshift=0.55)
+    hod = halos.populate(Zheng07Model, seed=42)
+    pos = hod['Position'].compute()
+
+    # repopulating with the cached draws
+    hod.repopulate(seed=42, alpha=1.3, logM1=13.)
+    hod.repopulate(seed=42, alpha=Zheng07Model.defaults['alpha'], logM1=Zheng07Model.defaults['logM1'])
+    numpy.testing.assert_array_equal(hod['Position'].compute(), pos)
+
+    # same result as populating from scratch
+    hod.repopulate(seed=42, alpha=1.3)
+    hod2 = halos.populate(Zheng07Model, seed=42, alpha=1.3)
+    numpy.testing.assert_array_equal(hod['Position'].compute(), hod2['Position'].compute())
+
+    # a new seed
+    hod.repopulate(seed=43)
+    assert hod.attrs['seed'] == 43
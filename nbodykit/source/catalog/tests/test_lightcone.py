@@ -0,0 +1,63 @@
+from runtests.mpi import MPITest
+from nbodykit.lab import *
+from nbodykit import setup_logging
+from numpy.testing import assert_allclose, assert_array_equal
+import numpy
+import pytest
+
+setup_logging()
+
+@MPITest([1, 4])
+def test_lightcone(comm):
+
+    CurrentMPIComm.set(comm)
+    source = UniformCatalog(nbar=2.5e-3, BoxSize=200., seed=42)
+    cosmo = cosmology.Planck15
+
+    lc = LightConeCatalog(source, cosmo, 0.05, 0.15, observer=[100, 100, 100],
+                            ra=(340., 60.), dec=(-20., 30.))
+
+    # brute force: all replicas, selecting on the sky coordinates
+    ra, dec, z = [], [], []
+    pos = source['Position'].compute()
+    for n in numpy.ndindex(9, 9, 9):
+        cat = ArrayCatalog({'Position': pos + (numpy.array(n) - 4) * 200.}, comm=comm)
+        sky = transform.CartesianToSky(cat['Position'], cosmo, observer=[100, 100, 100])
+        r, d, zz = cat.compute(*sky)
+        valid = (zz >= 0.05) & (zz <= 0.15) & (d >= -20) & (d <= 30) & ((r >= 340) | (r <= 60))
+        ra.append(r[valid]); dec.append(d[valid]); z.append(zz[valid])
+
+    ra, dec, z = [numpy.concatenate(comm.allgather(numpy.concatenate(x))) for x in [ra, dec, z]]
+    assert lc.csize == len(z)
+
+    # same objects
+    z1 = numpy.concatenate(comm.allgather(lc['Redshift'].compute()))
+    assert_allclose(numpy.sort(z1), numpy.sort(z), rtol=1e-6)
+    ra1 = numpy.concatenate(comm.allgather(lc['RA'].compute()))
+    assert_allclose(numpy.sort(ra1), numpy.sort(ra), rtol=1e-6)
+
+    # the source columns follow the selected objects
+    vel = lc['Velocity'].compute()
+    assert_array_equal(vel, source['Velocity'].compute()[lc._rows])
+    assert 'BoxSize' not in lc.attrs
+
+@MPITest([4])
+def test_lightcone_rank_invariance(comm):
+
+    from mpi4py import MPI
+    CurrentMPIComm.set(comm)
+
+    # the same box for any number of ranks
+    source = UniformCatalog(nbar=2.5e-3, BoxSize=200., seed=42)
+    source1 = UniformCatalog(nbar=2.5e-3, BoxSize=200., seed=42, comm=MPI.COMM_SELF)
+
+    lc = LightConeCatalog(source, cosmology.Planck15, 0., 0.1, ra=(0., 90.))
+    lc1 = LightConeCatalog(source1, cosmology.Planck15, 0., 0.1, ra=(0., 90.))
+
+    # same objects, in the same order
+    pos = numpy.concatenate(comm.allgather(lc['Position'].compute()))
+    assert_array_equal(pos, lc1['Position'].compute())
+
+    # bad redshift range
+    with pytest.raises(ValueError):
+        LightConeCatalog(source, cosmology.Planck15, 0.2, 0.1)
@@ -3,6 +3,7 @@ from nbodykit.lab import *
 from nbodykit import setup_logging
 
 from numpy.testing import assert_allclose
+import os
 
 setup_logging("debug")
 
@@ -48,3 +49,60 @@ def test_lognormal_velocity(comm):
     velmean = velsum / source.csize
 
     assert_allclose(real.cmean(), velmean, rtol=1e-5)
+
+@MPITest([4])
+def test_lognormal_rank_invariance(comm):
+    from mpi4py import MPI
+    cosmo = cosmology.Planck15
+    CurrentMPIComm.set(comm)
+
+    Plin = cosmology.LinearPower(cosmo, redshift=0.55, transfer='EisensteinHu')
+    source = LogNormalCatalog(Plin=Plin, nbar=3e-3, BoxSize=128., Nmesh=8, seed=42)
+    pos = numpy.concatenate(comm.allgather(source['Position'].compute()))
+
+    # the same catalog on a single rank
+    single = LogNormalCatalog(Plin=Plin, nbar=3e-3, BoxSize=128., Nmesh=8, seed=42, comm=MPI.COMM_SELF)
+    pos1 = single['Position'].compute()
+
+    assert len(pos) == len(pos1)
+    assert_allclose(pos[numpy.lexsort(pos.T)], pos1[numpy.lexsort(pos1.T)], rtol=1e-5)
+
+@MPITest([1, 4])
+def test_lognormal_ensemble(comm):
+    import tempfile
+    import shutil
+    cosmo = cosmology.Planck15
+    CurrentMPIComm.set(comm)
+
+    if comm.rank == 0:
+        tmpdir = tempfile.mkdtemp()
+    else:
+        tmpdir = None
+    tmpdir = comm.bcast(tmpdir)
+
+    Plin = cosmology.LinearPower(cosmo, redshift=0.55, transfer='EisensteinHu')
+    ensemble = LogNormalEnsemble(Plin=Plin, nbar=3e-3, BoxSize=128., Nmesh=8, bias=2.)
+
+    output = os.path.join(tmpdir, 'lognormal-%d')
+    for seed, cat in zip([42, 84], ensemble.generate([42, 84], output=output)):
+
+        # same as an independent catalog
+        ref = LogNormalCatalog(Plin=Plin, nbar=3e-3, BoxSize=128., Nmesh=8, bias=2., seed=seed)
+        assert cat.csize == ref.csize
+        assert_allclose(cat['Position'], ref['Position'], rtol=1e-5)
+
+    assert ensemble.mocks_per_hour > 0
+
+    # the saved catalogs
+    for seed in [42, 84]:
+        ref = ensemble.realization(seed)
+        saved = BigFileCatalog(output % seed, header='Header')
+        assert saved.csize == ref.csize
+        assert saved.attrs['seed'] == seed
+        pos = numpy.concatenate(comm.allgather(saved['Position'].compute()))
+        pos1 = numpy.concatenate(comm.allgather(ref['Position'].compute()))
+        assert_allclose(pos, pos1)
+
+    comm.barrier()
+    if comm.rank == 0:
+        shutil.rmtree(tmpdir)
@@ -0,0 +1,108 @@
+from runtests.mpi import MPITest
+from nbodykit.lab import *
+from nbodykit import setup_logging
+from nbodykit.source.catalog.spatial import hilbert_key, morton_key, domain_boxes
+from nbodykit.utils import split_size_3d
+from numpy.testing import assert_array_equal
+import tempfile
+import shutil
+import pytest
+
+setup_logging()
+
+def test_curve_keys():
+
+    # all cells of a 16^3 grid
+    nbits = 4
+    ipos = numpy.stack(numpy.meshgrid(*[numpy.arange(16)]*3, indexing='ij'), axis=-1).reshape(-1, 3)
+
+    for func in [hilbert_key, morton_key]:
+        key = func(ipos, nbits)
+
+        # a one-to-one mapping
+        assert_array_equal(numpy.sort(key), numpy.arange(16**3))
+
+        # coarse cells are prefixes of the keys
+        for level in range(1, nbits):
+            assert_array_equal(func(ipos >> (nbits-level), level), key >> 3*(nbits-level))
+
+    # consecutive points along the Hilbert curve are neighbors
+    ipos = ipos[numpy.argsort(hilbert_key(ipos, nbits))]
+    assert (abs(numpy.diff(ipos, axis=0)).sum(axis=-1) == 1).all()
+
+@MPITest([1, 4])
+def test_region(comm):
+
+    CurrentMPIComm.set(comm)
+
+    source = UniformCatalog(nbar=3e-3, BoxSize=100., seed=42)
+    source['Mass'] = source.rng.uniform(size=source.size)
+
+    if comm.rank == 0:
+        tmpfile = tempfile.mkdtemp()
+    else:
+        tmpfile = None
+    tmpfile = comm.bcast(tmpfile)
+
+    source.save_spatial(tmpfile, ['Position', 'Mass'], level=3)
+
+    # the rows inside the box
+    lower, upper = numpy.array([10., 20., 30.]), numpy.array([50., 45., 90.])
+    pos, mass = source.compute(source['Position'], source['Mass'])
+    inside = ((pos >= lower) & (pos < upper)).all(axis=-1)
+    pos, mass = numpy.concatenate(comm.allgather(pos[inside])), numpy.concatenate(comm.allgather(mass[inside]))
+
+    region = SpatialBigFileCatalog(tmpfile, region=(lower, upper))
+    assert region.csize == len(pos)
+    assert region.csize < source.csize
+
+    # same rows, sorted by mass
+    mass2 = numpy.concatenate(comm.allgather(region['Mass'].compute()))
+    assert_array_equal(numpy.sort(mass2), numpy.sort(mass))
+
+    # the full catalog
+    full = SpatialBigFileCatalog(tmpfile)
+    assert full.csize == source.csize
+
+    # bad input
+    with pytest.raises(ValueError):
+        cat = SpatialBigFileCatalog(tmpfile, region=(lower, upper), domain=object())
+
+    comm.barrier()
+    if comm.rank == 0:
+        shutil.rmtree(tmpfile)
+
+@MPITest([1, 4])
+def test_domain(comm):
+
+    from pmesh.domain import GridND
+    CurrentMPIComm.set(comm)
+
+    source = UniformCatalog(nbar=3e-3, BoxSize=100., seed=42)
+
+    if comm.rank == 0:
+        tmpfile = tempfile.mkdtemp()
+    else:
+        tmpfile = None
+    tmpfile = comm.bcast(tmpfile)
+
+    source.save_spatial(tmpfile, ['Position'], curve='morton')
+
+    # a domain decomposition of the box
+    np = split_size_3d(comm.size)
+    grid = [numpy.linspace(0, 100., np[i] + 1, endpoint=True) for i in range(3)]
+    domain = GridND(grid, comm=comm)
+
+    cat = SpatialBigFileCatalog(tmpfile, domain=domain)
+    assert cat.csize == source.csize
+
+    # the local positions are already decomposed
+    pos = cat['Position'].compute()
+    layout = domain.decompose(pos, smoothing=0)
+    assert len(layout.exchange(pos)) == len(pos)
+    for lower, upper in domain_boxes(domain, comm.rank):
+        assert ((pos >= lower) & (pos < upper)).all()
+
+    comm.barrier()
+    if comm.rank == 0:
+        shutil.rmtree(tmpfile)
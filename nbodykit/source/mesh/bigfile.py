@@ -3,8 +3,8 @@ from __future__ import absolute_import
 # import this module itself. Due to the unfortnate name conflict!
 
 from nbodykit.base.mesh import MeshSource
-from nbodykit import CurrentMPIComm
-from nbodykit.utils import JSONDecoder
+from nbodykit import CurrentMPIComm, _global_options
+from nbodykit.utils import JSONDecoder, ExchangeArray
 from bigfile import BigFileMPI
 from pmesh.pm import ParticleMesh, ComplexField, RealField
 
@@ -18,6 +18,24 @@ class BigFileMesh(MeshSource):
 
     This can read meshes that have been stored with the
     :func:`~nbodykit.base.mesh.MeshSource.save` function of MeshSource objects.
+    The mesh is read in slabs of at most ``mesh_chunk_size`` cells per rank;
+    see :class:`~nbodykit.set_options`.
+
+    If ``Nmesh`` is smaller than the ``Nmesh`` of the mesh on disk,
+    only the part of the mesh needed at the lower resolution is read: the
+    Fourier modes below the new Nyquist frequency for a complex mesh, and
+    the cells of a regularly decimated grid for a real mesh. If the
+    mesh was saved with a pyramid of lower resolutions (see
+    :func:`~nbodykit.base.mesh.MeshSource.save`) including ``Nmesh``,
+    the stored lower resolution is read instead.
+
+    .. warning::
+        A real mesh is decimated without any filtering: the cells of the
+        lower resolution are a subsample of the cells on disk, and the
+        power on scales smaller than the new cell size is aliased to
+        larger scales. Save a pyramid of lower resolutions, which are
+        resampled in Fourier space, or save the mesh in complex space, to
+        read a lower resolution without aliasing.
 
     Parameters
     ----------
@@ -25,6 +43,8 @@ class BigFileMesh(MeshSource):
         the name of the file to load
     dataset : str
         the name of the dataset in the Bigfile holding the grid
+    Nmesh : int, array_like, optional
+        if given, the (smaller) number of cells per side of the mesh to load
     comm : MPI.Communicator
         the MPI communicator
     **kwargs :
@@ -35,7 +55,7 @@ class BigFileMesh(MeshSource):
         return "BigFileMesh(file=%s)" % os.path.basename(self.path)
 
     @CurrentMPIComm.enable
-    def __init__(self, path, dataset, comm=None, **kwargs):
+    def __init__(self, path, dataset, Nmesh=None, comm=None, **kwargs):
 
         self.path    = path
         self.dataset = dataset
@@ -43,7 +63,44 @@ class BigFileMesh(MeshSource):
 
         # update the meta-data
         self.attrs.update(kwargs)
-        with BigFileMPI(comm=self.comm, filename=path)[dataset] as ff:
+        dtype = self._read_attrs()
+
+        # determine Nmesh
+        if 'ndarray.shape' not in self.attrs:
+            raise ValueError("`ndarray.shape` should be stored in the Bigfile `attrs` to determine `Nmesh`")
+
+        if 'Nmesh' not in self.attrs:
+            raise ValueError("`ndarray.shape` should be stored in the Bigfile `attrs` to determine `Nmesh`")
+
+        # the Nmesh on disk and the Nmesh to load
+        self.disk_Nmesh = numpy.empty(3, dtype='i8')
+        self.disk_Nmesh[:] = self.attrs['Nmesh']
+        if Nmesh is None:
+            Nmesh = self.disk_Nmesh.copy()
+        else:
+            _Nmesh = numpy.empty(3, dtype='i8')
+            _Nmesh[:] = Nmesh
+            if (_Nmesh > self.disk_Nmesh).any():
+                raise ValueError("Nmesh can only be reduced when reading a mesh; use paint(Nmesh=...) instead")
+
+            # use the stored level of the pyramid, if available
+            levels = numpy.atleast_1d(self.attrs.get('pyramid', []))
+            if (_Nmesh == _Nmesh[0]).all() and _Nmesh[0] in levels:
+                self.dataset = '%s-%d' % (dataset, _Nmesh[0])
+                dtype = self._read_attrs()
+                self.disk_Nmesh[:] = self.attrs['Nmesh']
+            Nmesh = _Nmesh
+
+        BoxSize = self.attrs['BoxSize']
+
+        MeshSource.__init__(self, BoxSize=BoxSize, Nmesh=Nmesh, dtype=dtype, comm=comm)
+
+    def _read_attrs(self):
+        """
+        Internal function to read the attrs of the dataset into :attr:`attrs`,
+        returning the data type of the mesh.
+        """
+        with BigFileMPI(comm=self.comm, filename=self.path)[self.dataset] as ff:
             for key in ff.attrs:
                 v = ff.attrs[key]
                 if isinstance(v, string_types) and v.startswith('json://'):
@@ -64,18 +121,7 @@ class BigFileMesh(MeshSource):
                     dtype = 'f8'
                 else:
                     dtype = 'f4'
-
-        # determine Nmesh
-        if 'ndarray.shape' not in self.attrs:
-            raise ValueError("`ndarray.shape` should be stored in the Bigfile `attrs` to determine `Nmesh`")
-
-        if 'Nmesh' not in self.attrs:
-            raise ValueError("`ndarray.shape` should be stored in the Bigfile `attrs` to determine `Nmesh`")
-
-        Nmesh = self.attrs['Nmesh']
-        BoxSize = self.attrs['BoxSize']
-
-        MeshSource.__init__(self, BoxSize=BoxSize, Nmesh=Nmesh, dtype=dtype, comm=comm)
+        return dtype
 
     def to_real_field(self):
         """
@@ -100,9 +146,7 @@ class BigFileMesh(MeshSource):
             if self.comm.rank == 0:
                 self.logger.info("reading real field from %s" % self.path)
             real2 = RealField(pmread)
-            start = sum(self.comm.allgather(real2.size)[:self.comm.rank])
-            end = start + real2.size
-            real2.unsort(ds[start:end])
+            read_field(ds, real2, Nmesh=self.disk_Nmesh)
 
         return real2
 
@@ -128,9 +172,245 @@ class BigFileMesh(MeshSource):
 
         with BigFileMPI(comm=self.comm, filename=self.path)[self.dataset] as ds:
             complex2 = ComplexField(pmread)
-            assert self.comm.allreduce(complex2.size) == ds.size
-            start = sum(self.comm.allgather(complex2.size)[:self.comm.rank])
-            end = start + complex2.size
-            complex2.unsort(ds[start:end])
+            read_field(ds, complex2, Nmesh=self.disk_Nmesh)
 
         return complex2
+
+class FieldLayout(object):
+    """
+    The layout of a distributed :mod:`pmesh` Field, relating the local
+    blocks of the Field on each rank to the global C-ordered array stored
+    on disk.
+
+    The global array is processed in slabs of consecutive planes along
+    the first axis; in each slab, the flattened global array is divided
+    evenly between the ranks, such that each rank reads or writes a single
+    contiguous range of the file, and the data is exchanged with the
+    ranks holding the local blocks with a single ``Alltoallv``.
+
+    Parameters
+    ----------
+    field : :class:`pmesh.pm.RealField`, :class:`pmesh.pm.ComplexField`
+        the field
+    chunksize : int, optional
+        the maximum number of mesh cells per rank in each slab; default is
+        the ``mesh_chunk_size`` global option
+    """
+    def __init__(self, field, chunksize=None):
+
+        if chunksize is None:
+            chunksize = _global_options['mesh_chunk_size']
+
+        self.comm = field.pm.comm
+        self.cshape = numpy.array(field.cshape, dtype='i8')
+        self.start = numpy.array(field.start, dtype='i8')
+        self.shape = numpy.array(field.value.shape, dtype='i8')
+
+        # the plane edges of the local blocks along each axis
+        starts = self.comm.allgather(self.start)
+        shapes = self.comm.allgather(self.shape)
+        self.edges = [numpy.unique([s[d] for s in starts] + [0, self.cshape[d]]) for d in range(3)]
+
+        # the rank holding each cell of the grid of local blocks
+        self.table = numpy.zeros([len(e) - 1 for e in self.edges], dtype='i8')
+        for rank, (start, shape) in enumerate(zip(starts, shapes)):
+            if not numpy.prod(shape): continue
+            index = [slice(numpy.searchsorted(e, s), numpy.searchsorted(e, s + n))
+                        for e, s, n in zip(self.edges, start, shape)]
+            self.table[tuple(index)] = rank
+
+        # the number of planes in each slab
+        plane = self.cshape[1] * self.cshape[2]
+        self.nplanes = int(max(1, min(self.cshape[0], chunksize * self.comm.size // plane)))
+
+    def __iter__(self):
+        """
+        Iterate over the slabs, yielding the ``(x0, x1)`` planes of each slab.
+        """
+        for x0 in range(0, self.cshape[0], self.nplanes):
+            yield x0, min(x0 + self.nplanes, self.cshape[0])
+
+    @property
+    def nslabs(self):
+        """
+        The number of slabs.
+        """
+        return (self.cshape[0] + self.nplanes - 1) // self.nplanes
+
+    def get_range(self, x0, x1):
+        """
+        The ``(start, stop)`` range of the flattened global array
+        read or written by this rank in the slab ``[x0, x1)``.
+        """
+        plane = self.cshape[1] * self.cshape[2]
+        size = (x1 - x0) * plane
+        rank, nranks = self.comm.rank, self.comm.size
+        return x0 * plane + rank * size // nranks, x0 * plane + (rank + 1) * size // nranks
+
+    def get_local_planes(self, x0, x1):
+        """
+        The ``(start, stop)`` planes of the local block in the slab ``[x0, x1)``,
+        relative to the start of the local block.
+        """
+        lo = max(x0, self.start[0]) - self.start[0]
+        hi = min(x1, self.start[0] + self.shape[0]) - self.start[0]
+        return lo, max(lo, hi)
+
+    def get_owner(self, start, stop):
+        """
+        The rank holding each cell in the range ``[start, stop)`` of the
+        flattened global array.
+        """
+        index = numpy.unravel_index(numpy.arange(start, stop, dtype='i8'), self.cshape)
+        cell = [numpy.searchsorted(e, i, side='right') - 1 for e, i in zip(self.edges, index)]
+        return self.table[tuple(cell)]
+
+    def get_writer(self, x0, x1):
+        """
+        The rank writing each cell of the local block in the slab ``[x0, x1)``,
+        in C order.
+        """
+        lo, hi = self.get_local_planes(x0, x1)
+        i = numpy.arange(lo, hi, dtype='i8')[:, None, None] + self.start[0]
+        j = numpy.arange(self.shape[1], dtype='i8')[None, :, None] + self.start[1]
+        k = numpy.arange(self.shape[2], dtype='i8')[None, None, :] + self.start[2]
+        flat = ((i * self.cshape[1] + j) * self.cshape[2] + k).ravel()
+
+        plane = self.cshape[1] * self.cshape[2]
+        size = (x1 - x0) * plane
+        bounds = x0 * plane + numpy.arange(self.comm.size + 1, dtype='i8') * size // self.comm.size
+        return numpy.searchsorted(bounds, flat, side='right') - 1
+
+def write_field(block, field, dtype=None, chunksize=None):
+    """
+    Write a :mod:`pmesh` Field to the open :mod:`bigfile` block ``block``,
+    as a flattened, C-ordered global array.
+
+    The field is written in slabs of at most ``chunksize`` cells per rank
+    (see :class:`FieldLayout`), such that no full-size temporary copy
+    of the field is allocated.
+
+    Parameters
+    ----------
+    block : :class:`bigfile.BigBlock`
+        the block to write to, of size ``field.csize``
+    field : :class:`pmesh.pm.RealField`, :class:`pmesh.pm.ComplexField`
+        the field to write
+    dtype : str, optional
+        the data type stored in the file; default is the data type
+        of the field
+    chunksize : int, optional
+        the maximum number of mesh cells per rank in each slab
+    """
+    layout = FieldLayout(field, chunksize=chunksize)
+    if dtype is None: dtype = field.dtype
+
+    for x0, x1 in layout:
+        lo, hi = layout.get_local_planes(x0, x1)
+        local = numpy.ascontiguousarray(field.value[lo:hi]).ravel()
+        recv = ExchangeArray(local, layout.get_writer(x0, x1), layout.comm)
+
+        # the items received are sorted by the rank holding them
+        start, stop = layout.get_range(x0, x1)
+        order = numpy.argsort(layout.get_owner(start, stop), kind='stable')
+        data = numpy.empty(stop - start, dtype=dtype)
+        data[order] = recv
+        block.write(start, data)
+
+def read_field(block, field, Nmesh=None, chunksize=None):
+    """
+    Read a :mod:`pmesh` Field from the open :mod:`bigfile` block ``block``,
+    holding the flattened, C-ordered global array.
+
+    The field is read in slabs of at most ``chunksize`` cells per rank
+    (see :class:`FieldLayout`), such that no full-size temporary copy
+    of the field is allocated.
+
+    If the field on disk has a larger ``Nmesh`` than ``field``, only the
+    needed part of the field on disk is read: the Fourier modes below the
+    Nyquist frequency of ``field`` for a complex field, and the rows of
+    every ``Nmesh / field.Nmesh`` plane and row for a real field, from
+    which every ``Nmesh / field.Nmesh`` cell is kept. A real field is
+    subsampled without any filtering, i.e., small-scale power is aliased.
+
+    Parameters
+    ----------
+    block : :class:`bigfile.BigBlock`
+        the block to read from
+    field : :class:`pmesh.pm.RealField`, :class:`pmesh.pm.ComplexField`
+        the field to read into
+    Nmesh : int, array_like, optional
+        the ``Nmesh`` of the field on disk; default is the ``Nmesh`` of
+        ``field``
+    chunksize : int, optional
+        the maximum number of mesh cells per rank in each slab
+    """
+    layout = FieldLayout(field, chunksize=chunksize)
+    if chunksize is None:
+        chunksize = _global_options['mesh_chunk_size']
+
+    # the shape of the field on disk
+    cshape = numpy.array(layout.cshape)
+    if Nmesh is not None:
+        cshape[:] = Nmesh
+        if isinstance(field, ComplexField):
+            cshape[-1] = cshape[-1] // 2 + 1
+    if block.size != numpy.prod(cshape):
+        raise ValueError("size mismatch between the field on disk and the mesh")
+    if (cshape < layout.cshape).any():
+        raise ValueError("the mesh on disk is smaller than the requested mesh")
+
+    # the planes, rows, and columns on disk of the field
+    if isinstance(field, ComplexField):
+        index = [_fourier_index(t, s) for t, s in zip(layout.cshape[:-1], cshape[:-1])]
+        index.append(numpy.arange(layout.cshape[-1]))
+    else:
+        index = [numpy.arange(t) * s // t for t, s in zip(layout.cshape, cshape)]
+
+    for x0, x1 in layout:
+        start, stop = layout.get_range(x0, x1)
+        if (cshape == layout.cshape).all():
+            data = block[start:stop]
+        else:
+            rowlen = layout.cshape[-1]
+            r0, r1 = start // rowlen, (stop + rowlen - 1) // rowlen
+            i, j = numpy.divmod(numpy.arange(r0, r1, dtype='i8'), layout.cshape[1])
+            rows = index[0][i] * cshape[1] + index[1][j]
+            data = _read_rows(block, rows, cshape[-1], index[2], chunksize)
+            data = data.ravel()[start - r0 * rowlen:stop - r0 * rowlen]
+        data = data.astype(field.dtype)
+        recv = ExchangeArray(data, layout.get_owner(start, stop), layout.comm)
+
+        # the items received are in C order of the local block
+        lo, hi = layout.get_local_planes(x0, x1)
+        field.value[lo:hi] = recv.reshape((hi - lo,) + tuple(layout.shape[1:]))
+
+def _fourier_index(n, N):
+    """
+    Internal function to return the index of the ``n`` Fourier modes
+    along an axis of a mesh of size ``n`` in a mesh of size ``N``.
+    """
+    i = numpy.arange(n)
+    return numpy.where(i < (n + 1) // 2, i, i + N - n)
+
+def _read_rows(block, rows, rowlen, cols, maxsize):
+    """
+    Internal function to read the columns ``cols`` of the rows ``rows``
+    of length ``rowlen`` from ``block``.
+
+    Consecutive rows are read in a single call, reading at most
+    ``maxsize`` items at once; the other rows on disk are not read.
+    """
+    maxrows = max(1, maxsize // rowlen)
+    toret = numpy.empty((len(rows), len(cols)), dtype=block.dtype)
+
+    i = 0
+    while i < len(rows):
+        j = i + 1
+        while j < len(rows) and rows[j] == rows[j-1] + 1 and j - i < maxrows:
+            j += 1
+        first, last = rows[i], rows[j-1]
+        data = block[first * rowlen:(last + 1) * rowlen].reshape(-1, rowlen)
+        toret[i:j] = data[rows[i:j] - first][:, cols]
+        i = j
+    return toret
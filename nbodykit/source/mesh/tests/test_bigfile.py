@@ -1,8 +1,9 @@
 from runtests.mpi import MPITest
 from nbodykit.lab import *
-from nbodykit import setup_logging
+from nbodykit import setup_logging, set_options
 
 import shutil
+import pytest
 from numpy.testing import assert_array_equal, assert_allclose
 
 setup_logging()
@@ -48,3 +49,91 @@ def test_bigfile_grid(comm):
     assert_allclose(complex, loaded_real, atol=1e-7)
     if comm.rank == 0:
         shutil.rmtree(output)
+
+@MPITest([1,4])
+def test_bigfile_streaming(comm):
+
+    import tempfile
+
+    cosmo = cosmology.Planck15
+    CurrentMPIComm.set(comm)
+
+    # input linear mesh
+    Plin = cosmology.LinearPower(cosmo, redshift=0.55, transfer='EisensteinHu')
+    source = LinearMesh(Plin, BoxSize=512, Nmesh=32, seed=42)
+
+    real = source.paint(mode='real')
+    complex = source.paint(mode="complex")
+
+    if comm.rank == 0:
+        output = tempfile.mkdtemp()
+    else:
+        output = None
+    output = comm.bcast(output)
+
+    # save both modes in small slabs, in single precision
+    with set_options(mesh_chunk_size=1000):
+        source.save(output, dataset='Field', mode=['real', 'complex'], precision='f4')
+
+        real2 = BigFileMesh(path=output, dataset='Field/real')
+        complex2 = BigFileMesh(path=output, dataset='Field/complex')
+        assert real2.attrs['precision'] == 'f4'
+        assert complex2.attrs['precision'] == 'f4'
+
+        assert_allclose(real, real2.paint(mode='real'), rtol=1e-6)
+        assert_allclose(complex, complex2.paint(mode='complex'), rtol=1e-5, atol=1e-7)
+
+    # bad input
+    with pytest.raises(ValueError):
+        source.save(output, dataset=['Field'], mode=['real', 'complex'])
+
+    comm.barrier()
+    if comm.rank == 0:
+        shutil.rmtree(output)
+
+@MPITest([1,4])
+def test_bigfile_resolution_on_read(comm):
+
+    import tempfile
+
+    cosmo = cosmology.Planck15
+    CurrentMPIComm.set(comm)
+
+    # input linear mesh
+    Plin = cosmology.LinearPower(cosmo, redshift=0.55, transfer='EisensteinHu')
+    source = LinearMesh(Plin, BoxSize=512, Nmesh=32, seed=42)
+
+    if comm.rank == 0:
+        output = tempfile.mkdtemp()
+    else:
+        output = None
+    output = comm.bcast(output)
+
+    source.save(output, dataset='Field', mode=['real', 'complex'], pyramid=[16])
+
+    # real: decimated on read
+    full = BigFileMesh(path=output, dataset='Field/real').preview()
+    with set_options(mesh_chunk_size=100):
+        coarse = BigFileMesh(path=output, dataset='Field/real', Nmesh=8)
+        assert_array_equal(coarse.pm.Nmesh, [8, 8, 8])
+        assert_array_equal(coarse.preview(), full[::4, ::4, ::4])
+
+    # complex: truncated on read, or read from the pyramid
+    truncated = BigFileMesh(path=output, dataset='Field/complex', Nmesh=8)
+    stored = BigFileMesh(path=output, dataset='Field/complex', Nmesh=16)
+    assert stored.dataset == 'Field/complex-16'
+    assert_array_equal(stored.pm.Nmesh, [16, 16, 16])
+
+    # the same low-k power
+    r1 = FFTPower(truncated, mode='1d').power
+    r2 = FFTPower(source, mode='1d').power
+    valid = r1['k'] < 0.5 * numpy.pi * 8 / 512.
+    assert_allclose(r1['power'][valid], r2['power'][:len(valid)][valid], rtol=1e-5)
+
+    # cannot increase the resolution on read
+    with pytest.raises(ValueError):
+        BigFileMesh(path=output, dataset='Field/real', Nmesh=64)
+
+    comm.barrier()
+    if comm.rank == 0:
+        shutil.rmtree(output)
@@ -1,6 +1,6 @@
 from runtests.mpi import MPITest
 from nbodykit.lab import *
-from nbodykit import setup_logging
+from nbodykit import setup_logging, set_options
 
 from numpy.testing import assert_allclose
 
@@ -33,3 +33,18 @@ def test_paint(comm):
 
     # make sure it is less than 1.5 (should be ~1)
     assert red_chisq < 1.5, "reduced chi sq of linear grid measurement = %.3f" %red_chisq
+
+@MPITest([1,4])
+def test_power_mesh_shells(comm):
+
+    cosmo = cosmology.Planck15
+    CurrentMPIComm.set(comm)
+
+    Plin = cosmology.LinearPower(cosmo, redshift=0.55, transfer='EisensteinHu')
+    source = LinearMesh(Plin, Nmesh=32, BoxSize=512, seed=42)
+    real = source.to_real_field()
+
+    # the power evaluated once per shell of |k|^2 gives the same field
+    with set_options(power_mesh_shells=True):
+        source = LinearMesh(Plin, Nmesh=32, BoxSize=512, seed=42)
+        assert_allclose(source.to_real_field(), real, rtol=1e-5, atol=1e-8)
@@ -1,7 +1,8 @@
 from runtests.mpi import MPITest
 from nbodykit.lab import *
 from nbodykit import setup_logging
-from nbodykit.utils import ScatterArray, GatherArray
+from nbodykit.utils import ScatterArray, GatherArray, GatherArrayToFile, ExchangeArray
+from nbodykit.utils import uniform_from_counter, poisson_from_uniform
 
 import os
 import pytest
@@ -158,3 +159,84 @@ def test_scatter_wrong_counts(comm):
     # wrong counts sum
     with pytest.raises(ValueError):
         data = ScatterArray(data, comm, root=0, counts=[5, 7])
+
+@MPITest([1, 4])
+def test_gather_scatter_chunked(comm):
+    import tempfile
+    CurrentMPIComm.set(comm)
+
+    # structured data of different lengths on each rank
+    size = 10 + 3 * comm.rank
+    data = numpy.empty(size, dtype=[('a', 'f8'), ('b', ('i4', 3))])
+    data['a'] = numpy.random.random(size=size)
+    data['b'] = numpy.arange(3 * size).reshape(size, 3) + 100 * comm.rank
+    full = numpy.concatenate(comm.allgather(data))
+
+    # a few rows per round
+    for root in [0, comm.size - 1]:
+        alldata = GatherArray(data, comm, root=root, chunksize=64)
+        if comm.rank == root:
+            numpy.testing.assert_array_equal(alldata, full)
+        else:
+            assert alldata is None
+
+        local = ScatterArray(alldata, comm, root=root, chunksize=64)
+        numpy.testing.assert_array_equal(local, numpy.array_split(full, comm.size)[comm.rank])
+
+    # stream to a file on root, and scatter from the memory-mapped file
+    if comm.rank == 0:
+        filename = tempfile.mkstemp(suffix='.npy')[1]
+    else:
+        filename = None
+    filename = comm.bcast(filename)
+
+    shape = GatherArrayToFile(data, comm, filename, chunksize=64)
+    assert shape == full.shape
+
+    alldata = numpy.load(filename, mmap_mode='r') if comm.rank == 0 else None
+    local = ScatterArray(alldata, comm, chunksize=64)
+    numpy.testing.assert_array_equal(local, numpy.array_split(full, comm.size)[comm.rank])
+
+    del alldata
+    comm.barrier()
+    if comm.rank == 0:
+        os.remove(filename)
+
+@MPITest([1, 4])
+def test_exchange_chunked(comm):
+    CurrentMPIComm.set(comm)
+
+    # structured data of different lengths on each rank
+    size = 10 + 3 * comm.rank
+    data = numpy.empty(size, dtype=[('a', 'f8'), ('b', ('i4', 3))])
+    data['a'] = numpy.random.random(size=size)
+    data['b'] = numpy.arange(3 * size).reshape(size, 3) + 100 * comm.rank
+    dest = numpy.random.randint(comm.size, size=size)
+
+    # the rows sent to this rank, in order of the sender
+    alldata = comm.allgather(data)
+    alldest = comm.allgather(dest)
+    expected = numpy.concatenate([d[t == comm.rank] for d, t in zip(alldata, alldest)])
+
+    # a few rows per round
+    for chunksize in [None, 64]:
+        recv = ExchangeArray(data, dest, comm, chunksize=chunksize)
+        numpy.testing.assert_array_equal(recv, expected)
+
+    # bad destinations
+    with pytest.raises(ValueError):
+        ExchangeArray(data, dest[:-1], comm)
+
+def test_poisson_from_uniform():
+    from scipy.stats import poisson
+
+    # the same numbers for any subset of the streams
+    index = numpy.arange(10000)
+    u = uniform_from_counter(42, index, 0)
+    numpy.testing.assert_array_equal(uniform_from_counter(42, index[::7], 0), u[::7])
+    assert ((u > 0) & (u < 1)).all()
+
+    # the exact inverse of the cumulative distribution, for small and large means
+    mean = numpy.concatenate([numpy.linspace(0, 50, 5000), numpy.logspace(1.5, 6, 5000)])
+    N = poisson_from_uniform(mean, u)
+    numpy.testing.assert_array_equal(N, poisson.ppf(u, mean))
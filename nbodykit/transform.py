@@ -160,6 +160,10 @@ def CartesianToSky(pos, cosmo, velocity=None, observer=[0,0,0], zmax=100.):
     Users should ensure that ``zmax`` is larger than the largest possible
     redshift being considered to avoid an interpolation exception.
 
+    The distance-redshift relation is interpolated from the
+    :class:`~nbodykit.cosmology.background.BackgroundTable` of ``cosmo``,
+    which is computed once and shared by all blocks of the arrays.
+
     .. note::
         Cartesian coordinates should be in units of Mpc/h and velocity
         should be in units of km/s.
@@ -201,7 +205,7 @@ def CartesianToSky(pos, cosmo, velocity=None, observer=[0,0,0], zmax=100.):
         If the input columns are not dask arrays
     """
     from astropy.constants import c
-    from scipy.interpolate import interp1d
+    from nbodykit.cosmology.background import get_background_table
 
     if not isinstance(pos, da.Array):
         raise TypeError("``pos`` should be a dask array")
@@ -215,14 +219,9 @@ def CartesianToSky(pos, cosmo, velocity=None, observer=[0,0,0], zmax=100.):
     # the distance from the origin
     r = da.linalg.norm(pos, axis=-1)
 
-    def z_from_comoving_distance(x):
-        zgrid = numpy.logspace(-8, numpy.log10(zmax), 1024)
-        zgrid = numpy.concatenate([[0.], zgrid])
-        rgrid = cosmo.comoving_distance(zgrid)
-        return interp1d(rgrid, zgrid)(x)
-
     # invert distance - redshift relation
-    z = r.map_blocks(z_from_comoving_distance)
+    table = get_background_table(cosmo, zmax=zmax)
+    z = r.map_blocks(table.redshift, dtype=r.dtype)
 
     # add in velocity offsets?
     if velocity is not None:
@@ -310,7 +309,9 @@ def SkyToCartesian(ra, dec, redshift, cosmo, degrees=True):
     pos = SkyToUnitSphere(ra, dec, degrees=degrees)
 
     # multiply by the comoving distance in Mpc/h
-    r = redshift.map_blocks(lambda z: cosmo.comoving_distance(z), dtype=redshift.dtype)
+    from nbodykit.cosmology.background import get_background_table
+    table = get_background_table(cosmo)
+    r = redshift.map_blocks(table.comoving_distance, dtype=redshift.dtype)
 
     return r[:,None] * pos
 
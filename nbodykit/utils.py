@@ -120,26 +120,70 @@ def deprecate(name, alternative, alt_name=None):
         return alternative(*args, **kwargs)
     return wrapper
 
-def GatherArray(data, comm, root=0):
+def _check_object_dtype(dtype):
     """
-    Gather the input data array from all ranks to the specified ``root``.
+    Internal function to check for object ('O') data types, which cannot
+    be sent as bytes.
+    """
+    if dtype.char == 'V':
+        return any(dtype[name] == 'O' for name in dtype.names)
+    return dtype == 'O'
 
-    This uses `Gatherv`, which avoids mpi4py pickling, and also
-    avoids the 2 GB mpi4py limit for bytes using a custom datatype
+def _get_chunk_length(itemsize, chunksize, comm):
+    """
+    Internal function to return the number of rows of ``itemsize`` bytes
+    sent by each rank in each round of :func:`GatherArray` and
+    :func:`ScatterArray`, such that root sends or receives at most
+    ``chunksize`` bytes per round.
+    """
+    from nbodykit import _global_options
+    if chunksize is None:
+        chunksize = _global_options['mpi_chunk_size']
+    return max(int(chunksize) // (max(itemsize, 1) * comm.size), 1)
 
-    Parameters
-    ----------
-    data : array_like
-        the data on each rank to gather
-    comm : MPI communicator
-        the MPI communicator
-    root : int
-        the rank number to gather the data to
+def _gather_into(data, comm, root, out, chunksize):
+    """
+    Internal function to gather ``data`` into the array ``out`` on root,
+    in rounds where root receives at most ``chunksize`` bytes.
+    """
+    # the row type, valid for any C-contiguous array
+    itemsize = data.dtype.itemsize * int(numpy.prod(data.shape[1:], dtype='intp'))
+    dt = MPI.BYTE.Create_contiguous(itemsize)
+    dt.Commit()
 
-    Returns
-    -------
-    recvbuffer : array_like, None
-        the gathered data on root, and `None` otherwise
+    counts = numpy.array(comm.allgather(len(data)), dtype='i8')
+    offsets = numpy.zeros_like(counts)
+    offsets[1:] = counts.cumsum()[:-1]
+
+    nrows = _get_chunk_length(itemsize, chunksize, comm)
+    nrounds = -(-counts.max() // nrows) if len(counts) else 0
+
+    for iround in range(nrounds):
+        start = numpy.minimum(iround * nrows, counts)
+        stop = numpy.minimum(start + nrows, counts)
+        sendbuf = data[start[comm.rank]:stop[comm.rank]]
+
+        if comm.rank == root:
+            recvcounts = stop - start
+            recvbuf = numpy.empty((recvcounts.sum(),) + data.shape[1:], dtype=data.dtype)
+            displs = numpy.zeros_like(recvcounts)
+            displs[1:] = recvcounts.cumsum()[:-1]
+            comm.Gatherv([sendbuf, dt], [recvbuf, (recvcounts, displs), dt], root=root)
+
+            # copy the rows to their position in the output
+            for r in range(comm.size):
+                o = offsets[r]
+                out[o+start[r]:o+stop[r]] = recvbuf[displs[r]:displs[r]+recvcounts[r]]
+        else:
+            comm.Gatherv([sendbuf, dt], None, root=root)
+
+    dt.Free()
+    return out
+
+def _check_gather_input(data, comm):
+    """
+    Internal function to verify the input of :func:`GatherArray`, returning
+    the C-contiguous data and the global shape.
     """
     if not isinstance(data, numpy.ndarray):
         raise ValueError("`data` must by numpy array in GatherArray")
@@ -147,101 +191,125 @@ def GatherArray(data, comm, root=0):
     # need C-contiguous order
     if not data.flags['C_CONTIGUOUS']:
         data = numpy.ascontiguousarray(data)
-    local_length = data.shape[0]
 
     # check dtypes and shapes
-    shapes = comm.gather(data.shape, root=root)
+    shapes = comm.allgather(data.shape)
     dtypes = comm.allgather(data.dtype)
 
-    # check for structured data
+    # check for structured data mismatch
     if dtypes[0].char == 'V':
-
-        # check for structured data mismatch
         names = set(dtypes[0].names)
-        if any(set(dt.names) != names for dt in dtypes[1:]):
+        if any(dt.names is None or set(dt.names) != names for dt in dtypes[1:]):
             raise ValueError("mismatch between data type fields in structured data")
 
-        # check for 'O' data types
-        if any(dtypes[0][name] == 'O' for name in dtypes[0].names):
-            raise ValueError("object data types ('O') not allowed in structured data in GatherArray")
-
-        # compute the new shape for each rank
-        newlength = comm.allreduce(local_length)
-        newshape = list(data.shape)
-        newshape[0] = newlength
-
-        # the return array
-        if comm.rank == root:
-            recvbuffer = numpy.empty(newshape, dtype=dtypes[0], order='C')
-        else:
-            recvbuffer = None
-
-        for name in dtypes[0].names:
-            d = GatherArray(data[name], comm, root=root)
-            if comm.rank == 0:
-                recvbuffer[name] = d
-
-        return recvbuffer
-
     # check for 'O' data types
-    if dtypes[0] == 'O':
+    if any(_check_object_dtype(dt) for dt in dtypes):
         raise ValueError("object data types ('O') not allowed in structured data in GatherArray")
 
     # check for bad dtypes and bad shapes
-    if comm.rank == root:
-        bad_shape = any(s[1:] != shapes[0][1:] for s in shapes[1:])
-        bad_dtype = any(dt != dtypes[0] for dt in dtypes[1:])
-    else:
-        bad_shape = None; bad_dtype = None
-
-    bad_shape, bad_dtype = comm.bcast((bad_shape, bad_dtype))
-    if bad_shape:
+    if any(s[1:] != shapes[0][1:] for s in shapes[1:]):
         raise ValueError("mismatch between shape[1:] across ranks in GatherArray")
-    if bad_dtype:
+    if any(dt != dtypes[0] for dt in dtypes[1:]):
         raise ValueError("mismatch between dtypes across ranks in GatherArray")
 
-    shape = data.shape
-    dtype = data.dtype
+    newshape = (sum(s[0] for s in shapes),) + tuple(data.shape[1:])
+    return data, newshape
 
-    # setup the custom dtype
-    duplicity = numpy.product(numpy.array(shape[1:], 'intp'))
-    itemsize = duplicity * dtype.itemsize
-    dt = MPI.BYTE.Create_contiguous(itemsize)
-    dt.Commit()
+def GatherArray(data, comm, root=0, chunksize=None):
+    """
+    Gather the input data array from all ranks to the specified ``root``.
+
+    This uses `Gatherv`, which avoids mpi4py pickling. Each row (including
+    the rows of structured arrays) is sent as a custom contiguous datatype,
+    and the transfer is split into rounds where root receives at most
+    ``chunksize`` bytes, such that arrays beyond the 2 GB / 2**31 element
+    limits of MPI counts can be gathered.
+
+    See :func:`GatherArrayToFile` to gather directly to a file on root.
+
+    Parameters
+    ----------
+    data : array_like
+        the data on each rank to gather
+    comm : MPI communicator
+        the MPI communicator
+    root : int
+        the rank number to gather the data to
+    chunksize : int, optional
+        the maximum number of bytes received by root per round; default
+        is the ``mpi_chunk_size`` global option
 
-    # compute the new shape for each rank
-    newlength = comm.allreduce(local_length)
-    newshape = list(shape)
-    newshape[0] = newlength
+    Returns
+    -------
+    recvbuffer : array_like, None
+        the gathered data on root, and `None` otherwise
+    """
+    data, newshape = _check_gather_input(data, comm)
 
     # the return array
     if comm.rank == root:
-        recvbuffer = numpy.empty(newshape, dtype=dtype, order='C')
+        recvbuffer = numpy.empty(newshape, dtype=data.dtype, order='C')
     else:
         recvbuffer = None
 
-    # the recv counts
-    counts = comm.allgather(local_length)
-    counts = numpy.array(counts, order='C')
+    return _gather_into(data, comm, root, recvbuffer, chunksize)
 
-    # the recv offsets
-    offsets = numpy.zeros_like(counts, order='C')
-    offsets[1:] = counts.cumsum()[:-1]
+def GatherArrayToFile(data, comm, filename, root=0, chunksize=None):
+    """
+    Gather the input data array from all ranks to a ``.npy`` file written
+    by ``root``.
 
-    # gather to root
-    comm.Barrier()
-    comm.Gatherv([data, dt], [recvbuffer, (counts, offsets), dt], root=root)
-    dt.Free()
+    This is the same as :func:`GatherArray`, but the root writes the rows
+    received in each round to a memory-mapped file, such that it never
+    holds the full array in memory. The file can be read with
+    :func:`numpy.load`, e.g., with ``mmap_mode='r'``.
 
-    return recvbuffer
+    Parameters
+    ----------
+    data : array_like
+        the data on each rank to gather
+    comm : MPI communicator
+        the MPI communicator
+    filename : str
+        the name of the ``.npy`` file to write on root
+    root : int
+        the rank number writing the file
+    chunksize : int, optional
+        the maximum number of bytes received by root per round; default
+        is the ``mpi_chunk_size`` global option
+
+    Returns
+    -------
+    shape : tuple
+        the shape of the gathered array
+    """
+    data, newshape = _check_gather_input(data, comm)
+
+    if comm.rank == root:
+        out = numpy.lib.format.open_memmap(filename, mode='w+', dtype=data.dtype, shape=newshape)
+    else:
+        out = None
+
+    _gather_into(data, comm, root, out, chunksize)
+    if out is not None:
+        out.flush()
+        del out
+
+    comm.barrier()
+    return newshape
 
-def ScatterArray(data, comm, root=0, counts=None):
+def ScatterArray(data, comm, root=0, counts=None, chunksize=None):
     """
     Scatter the input data array across all ranks, assuming `data` is
     initially only on `root` (and `None` on other ranks).
 
-    This uses ``Scatterv``, which avoids mpi4py pickling, and also
-    avoids the 2 GB mpi4py limit for bytes using a custom datatype
+    This uses ``Scatterv``, which avoids mpi4py pickling. Each row is sent
+    as a custom contiguous datatype, and the transfer is split into rounds
+    where root sends at most ``chunksize`` bytes, such that arrays
+    beyond the 2 GB / 2**31 element limits of MPI counts can be scattered.
+    ``data`` can be a memory-mapped array (e.g., from
+    :func:`GatherArrayToFile`), in which case root only reads one round
+    at a time.
 
     Parameters
     ----------
@@ -253,14 +321,15 @@ def ScatterArray(data, comm, root=0, counts=None):
         the rank number that initially has the data
     counts : list of int
         list of the lengths of data to send to each rank
+    chunksize : int, optional
+        the maximum number of bytes sent by root per round; default
+        is the ``mpi_chunk_size`` global option
 
     Returns
     -------
     recvbuffer : array_like
         the chunk of `data` that each rank gets
     """
-    import logging
-
     if counts is not None:
         counts = numpy.asarray(counts, order='C')
         if len(counts) != comm.size:
@@ -271,73 +340,243 @@ def ScatterArray(data, comm, root=0, counts=None):
         bad_input = not isinstance(data, numpy.ndarray)
     else:
         bad_input = None
-    bad_input = comm.bcast(bad_input)
+    bad_input = comm.bcast(bad_input, root=root)
     if bad_input:
         raise ValueError("`data` must by numpy array on root in ScatterArray")
 
-    if comm.rank == 0:
-        # need C-contiguous order
-        if not data.flags['C_CONTIGUOUS']:
-            data = numpy.ascontiguousarray(data)
+    if comm.rank == root:
         shape_and_dtype = (data.shape, data.dtype)
     else:
         shape_and_dtype = None
 
     # each rank needs shape/dtype of input data
-    shape, dtype = comm.bcast(shape_and_dtype)
+    shape, dtype = comm.bcast(shape_and_dtype, root=root)
 
     # object dtype is not supported
-    fail = False
-    if dtype.char == 'V':
-         fail = any(dtype[name] == 'O' for name in dtype.names)
-    else:
-        fail = dtype == 'O'
-    if fail:
+    if _check_object_dtype(dtype):
         raise ValueError("'object' data type not supported in ScatterArray; please specify specific data type")
 
-    # initialize empty data on non-root ranks
-    if comm.rank != root:
-        np_dtype = numpy.dtype((dtype, shape[1:]))
-        data = numpy.empty(0, dtype=np_dtype)
+    # the lengths on each rank
+    if counts is None:
+        counts = numpy.array([shape[0] // comm.size + (r < shape[0] % comm.size) for r in range(comm.size)])
+    elif counts.sum() != shape[0]:
+        raise ValueError("the sum of the `counts` array needs to be equal to data length")
+    counts = counts.astype('i8')
+
+    offsets = numpy.zeros_like(counts)
+    offsets[1:] = counts.cumsum()[:-1]
+
+    # the return array
+    recvbuffer = numpy.empty((counts[comm.rank],) + tuple(shape[1:]), dtype=dtype, order='C')
 
     # setup the custom dtype
-    duplicity = numpy.product(numpy.array(shape[1:], 'intp'))
-    itemsize = duplicity * dtype.itemsize
+    itemsize = dtype.itemsize * int(numpy.prod(shape[1:], dtype='intp'))
     dt = MPI.BYTE.Create_contiguous(itemsize)
     dt.Commit()
 
-    # compute the new shape for each rank
-    newshape = list(shape)
+    nrows = _get_chunk_length(itemsize, chunksize, comm)
+    nrounds = -(-counts.max() // nrows) if len(counts) else 0
 
-    if counts is None:
-        newlength = shape[0] // comm.size
-        if comm.rank < shape[0] % comm.size:
-            newlength += 1
-        newshape[0] = newlength
-    else:
-        if counts.sum() != shape[0]:
-            raise ValueError("the sum of the `counts` array needs to be equal to data length")
-        newshape[0] = counts[comm.rank]
+    for iround in range(nrounds):
+        start = numpy.minimum(iround * nrows, counts)
+        stop = numpy.minimum(start + nrows, counts)
+        recvbuf = recvbuffer[start[comm.rank]:stop[comm.rank]]
 
-    # the return array
-    recvbuffer = numpy.empty(newshape, dtype=dtype, order='C')
+        if comm.rank == root:
+            # pack the rows of this round for all ranks
+            sendcounts = stop - start
+            sendbuf = numpy.concatenate([data[o+a:o+b] for o, a, b in zip(offsets, start, stop)])
+            sendbuf = numpy.ascontiguousarray(sendbuf)
+            displs = numpy.zeros_like(sendcounts)
+            displs[1:] = sendcounts.cumsum()[:-1]
+            comm.Scatterv([sendbuf, (sendcounts, displs), dt], [recvbuf, dt], root=root)
+        else:
+            comm.Scatterv(None, [recvbuf, dt], root=root)
 
-    # the send counts, if not provided
-    if counts is None:
-        counts = comm.allgather(newlength)
-        counts = numpy.array(counts, order='C')
+    dt.Free()
+    return recvbuffer
 
-    # the send offsets
-    offsets = numpy.zeros_like(counts, order='C')
-    offsets[1:] = counts.cumsum()[:-1]
+def ExchangeArray(data, dest, comm, chunksize=None):
+    """
+    Send the rows of the input data array to the ranks ``dest``, returning
+    the rows received, ordered by the rank of the sender. The rows sent
+    to each rank keep their order.
+
+    This uses ``Alltoallv``, which avoids mpi4py pickling. Each row is sent
+    as a custom contiguous datatype, such that counts are in rows, and the
+    transfer is split into rounds where each rank receives at most
+    ``chunksize`` bytes, such that arrays beyond the 2 GB / 2**31 element
+    limits of MPI counts can be exchanged.
+
+    Parameters
+    ----------
+    data : array_like
+        the data on each rank to send
+    dest : array_like
+        the rank to send each row of ``data`` to
+    comm : MPI communicator
+        the MPI communicator
+    chunksize : int, optional
+        the maximum number of bytes received by each rank per round;
+        default is the ``mpi_chunk_size`` global option
+
+    Returns
+    -------
+    recvbuffer : array_like
+        the rows received by each rank
+    """
+    if not isinstance(data, numpy.ndarray):
+        raise ValueError("`data` must by numpy array in ExchangeArray")
+    if _check_object_dtype(data.dtype):
+        raise ValueError("'object' data type not supported in ExchangeArray; please specify specific data type")
+    dest = numpy.asarray(dest, dtype='intp')
+    if len(dest) != len(data):
+        raise ValueError("`dest` must have the same length as `data` in ExchangeArray")
+
+    # the rows sorted by destination
+    order = numpy.argsort(dest, kind='stable')
+    send = numpy.ascontiguousarray(data[order])
+    dest = dest[order]
+
+    # where the rows of each sender start in the return array
+    sendcounts = numpy.bincount(dest, minlength=comm.size).astype('i8')
+    recvcounts = numpy.array(comm.alltoall(list(sendcounts)), dtype='i8')
+    offsets = numpy.zeros_like(recvcounts)
+    offsets[1:] = recvcounts.cumsum()[:-1]
+    recvbuffer = numpy.empty((recvcounts.sum(),) + data.shape[1:], dtype=data.dtype)
+
+    # setup the custom dtype
+    itemsize = data.dtype.itemsize * int(numpy.prod(data.shape[1:], dtype='intp'))
+    dt = MPI.BYTE.Create_contiguous(itemsize)
+    dt.Commit()
+
+    nrows = _get_chunk_length(itemsize, chunksize, comm)
+    nrounds = -(-comm.allreduce(len(send), op=MPI.MAX) // nrows)
+
+    for iround in range(nrounds):
+        start = min(iround * nrows, len(send))
+        stop = min(start + nrows, len(send))
+        sendbuf = send[start:stop]
+
+        counts = numpy.bincount(dest[start:stop], minlength=comm.size).astype('i8')
+        displs = numpy.zeros_like(counts)
+        displs[1:] = counts.cumsum()[:-1]
+
+        rcounts = numpy.array(comm.alltoall(list(counts)), dtype='i8')
+        rdispls = numpy.zeros_like(rcounts)
+        rdispls[1:] = rcounts.cumsum()[:-1]
+        recvbuf = numpy.empty((rcounts.sum(),) + data.shape[1:], dtype=data.dtype)
+
+        comm.Alltoallv([sendbuf, (counts, displs), dt], [recvbuf, (rcounts, rdispls), dt])
+
+        # copy the rows to their position in the output
+        for r in range(comm.size):
+            recvbuffer[offsets[r]:offsets[r]+rcounts[r]] = recvbuf[rdispls[r]:rdispls[r]+rcounts[r]]
+        offsets += rcounts
 
-    # do the scatter
-    comm.Barrier()
-    comm.Scatterv([data, (counts, offsets), dt], [recvbuffer, dt])
     dt.Free()
     return recvbuffer
 
 
+def _mix64(x):
+    """
+    Internal function to scramble the bits of the unsigned 64-bit
+    integers ``x``, with the finalizer of the SplitMix64 generator.
+    """
+    x = (x ^ (x >> numpy.uint64(30))) * numpy.uint64(0xbf58476d1ce4e5b9)
+    x = (x ^ (x >> numpy.uint64(27))) * numpy.uint64(0x94d049bb133111eb)
+    return x ^ (x >> numpy.uint64(31))
+
+def uniform_from_counter(seed, index, counter):
+    """
+    Return uniform random numbers in ``(0, 1)`` from a counter-based
+    generator: the number depends only on ``seed``, the stream ``index``
+    and the ``counter`` in the stream, such that the numbers of an object
+    (e.g., a mesh cell or a halo) do not depend on how the objects are
+    distributed across ranks.
+
+    Parameters
+    ----------
+    seed : int
+        the random seed
+    index : array_like
+        the (non-negative) index of the stream of each number
+    counter : int, array_like
+        the position of each number in its stream
+
+    Returns
+    -------
+    u : array_like
+        the uniform random numbers, broadcast from ``index`` and ``counter``
+    """
+    index = numpy.asarray(index, dtype='u8')
+    counter = numpy.asarray(counter, dtype='u8')
+    with numpy.errstate(over='ignore'):
+        x = _mix64(index + numpy.uint64(seed) * numpy.uint64(0x9e3779b97f4a7c15))
+        x = _mix64(x ^ (counter * numpy.uint64(0xd1b54a32d192ed03) + numpy.uint64(1)))
+    return ((x >> numpy.uint64(11)).astype('f8') + 0.5) * 2.**-53
+
+def poisson_from_uniform(mean, u, threshold=50.):
+    """
+    Return Poisson random numbers with mean ``mean``, by inverting the
+    cumulative distribution at the uniform random numbers ``u``, such that
+    the result is a non-decreasing function of the mean for a given ``u``.
+
+    Below a mean of ``threshold``, the cumulative distribution is summed
+    term by term. Above, the inversion starts from the Cornish-Fisher
+    expansion of the quantile around the normal approximation, and is
+    corrected with the exact cumulative distribution, which only needs
+    a few steps for any mean.
+
+    Parameters
+    ----------
+    mean : array_like
+        the mean of each number
+    u : array_like
+        the uniform random numbers in ``(0, 1)``, one for each mean
+    threshold : float, optional
+        the mean above which to start from the normal approximation
+
+    Returns
+    -------
+    N : array_like
+        the Poisson random numbers, as integers
+    """
+    from scipy.special import gammaln, ndtri, pdtr
+
+    mean = numpy.asarray(mean, dtype='f8')
+    u = numpy.asarray(u, dtype='f8')
+    toret = numpy.zeros(len(mean), dtype='i8')
+
+    # the objects that need more iterations, and the cumulative probability
+    active = numpy.flatnonzero((mean > 0) & (mean <= threshold))
+    cdf = numpy.zeros(len(active))
+    k = 0
+    while len(active):
+        lam = mean[active]
+        cdf += numpy.exp(k * numpy.log(lam) - lam - gammaln(k+1))
+        done = (u[active] <= cdf) | (k > lam + 20 * lam**0.5 + 20) # in case of round-off
+        toret[active[done]] = k
+        active, cdf = active[~done], cdf[~done]
+        k += 1
+
+    # large means: the quantile from the normal approximation, with a
+    # skewness correction, as the first guess
+    large = numpy.flatnonzero(mean > threshold)
+    if len(large):
+        lam, ul = mean[large], u[large]
+        z = ndtri(ul)
+        k = numpy.maximum(numpy.ceil(lam + lam**0.5 * z + (z**2 - 1) / 6. - 0.5), 0)
+
+        # and the smallest k with cdf(k) >= u
+        for i in range(100):
+            up = pdtr(k, lam) < ul
+            down = (k > 0) & (pdtr(k - 1, lam) >= ul)
+            if not (up.any() or down.any()): break
+            k = k + up - down
+        toret[large] = k
+    return toret
+
 def attrs_to_dict(obj, prefix):
     if not hasattr(obj, 'attrs'):
         return {}